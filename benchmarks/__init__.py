@@ -0,0 +1,4 @@
+# __init__.py
+
+# Benchmarks for the task pipeline against local Docker and blockchain stand-ins.
+# Run with: python -m benchmarks.run --output results.json
@@ -0,0 +1,56 @@
+# compare.py
+
+import argparse
+import json
+import sys
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    Pairs results by benchmark, concurrency and policy size.
+
+    :return: Rows of (benchmark, concurrency, throughput change, p99 change, regressed)
+    """
+    previous = {_key(r): r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = previous.get(_key(result))
+        if before is None:
+            continue
+        throughput = result["throughput_per_s"] / before["throughput_per_s"] - 1 if before["throughput_per_s"] else 0.0
+        p99 = result["p99_ms"] / before["p99_ms"] - 1 if before["p99_ms"] else 0.0
+        name = result["benchmark"]
+        if result.get("policy_size") is not None:
+            name = f"{name}[{result['policy_size']}]"
+        rows.append((name, result["concurrency"], throughput, p99, throughput < -threshold or p99 > threshold))
+    return rows
+
+
+def _key(result: dict) -> tuple:
+    return result["benchmark"], result["concurrency"], result.get("policy_size")
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare",
+                                     description="Compare two benchmark reports.")
+    parser.add_argument("baseline", help="Report from the reference commit")
+    parser.add_argument("current", help="Report from the commit under test")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative throughput drop or p99 increase counted as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+    print(f"{baseline.get('commit') or 'baseline'} -> {current.get('commit') or 'current'}")
+    for benchmark, concurrency, throughput, p99, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{benchmark:24} c={concurrency:<4} throughput {throughput:+7.1%}  p99 {p99:+7.1%}{flag}")
+    sys.exit(1 if any(row[4] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# fakes.py
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sdk.docker_transport import DockerTransport, ExecResult
+from sdk.errors import ContainerError
+
+
+class FakeDockerTransport(DockerTransport):
+    """
+    In-process Docker stand-in. Every call sleeps for its configured latency, so the
+    benchmarks measure the SDK's own overhead plus a controlled amount of daemon time.
+    Exec echoes its arguments like the real `echo` task command.
+    """
+    name = "fake"
+
+    def __init__(self, start_latency: float = 0.2, exec_latency: float = 0.01, remove_latency: float = 0.05,
+                 call_latency: float = 0.001):
+        """
+        :param start_latency: Seconds to create and start a container
+        :param exec_latency: Seconds per exec
+        :param remove_latency: Seconds to remove a container
+        :param call_latency: Seconds for any other call (inspect, list, ping)
+        """
+        self.start_latency = start_latency
+        self.exec_latency = exec_latency
+        self.remove_latency = remove_latency
+        self.call_latency = call_latency
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.containers = set()
+        self.calls = {}
+
+    def ping(self) -> bool:
+        self._record("ping", self.call_latency)
+        return True
+
+    def run_container(self, image: str, network: str, command: list, labels: dict = None,
+                      cpus: float = None, memory_mb: int = None) -> str:
+        self._record("run_container", self.start_latency)
+        container_id = f"fake{next(self._ids):012d}"
+        with self._lock:
+            self.containers.add(container_id)
+        return container_id
+
+    def exec_command(self, container_id: str, command: list, timeout: float = None) -> ExecResult:
+        self._check(container_id)
+        self._record("exec", self.exec_latency)
+        return self._output(command)
+
+    async def exec_command_async(self, container_id: str, command: list, timeout: float = None) -> ExecResult:
+        self._check(container_id)
+        self._count("exec")
+        await asyncio.sleep(self.exec_latency)
+        return self._output(command)
+
+    def is_running(self, container_id: str) -> bool:
+        self._record("inspect", self.call_latency)
+        return container_id in self.containers
+
+    def remove_container(self, container_id: str):
+        self.remove_containers([container_id])
+
+    def remove_containers(self, container_ids: list):
+        self._record("remove", self.remove_latency)
+        with self._lock:
+            self.containers.difference_update(container_ids)
+
+    def list_containers(self, labels: dict) -> list:
+        self._record("list", self.call_latency)
+        return []
+
+    def put_archive(self, container_id: str, path: str, chunks):
+        self._check(container_id)
+        for _ in chunks:
+            pass
+        self._record("put_archive", self.call_latency)
+
+    def _check(self, container_id: str):
+        if container_id not in self.containers:
+            raise ContainerError(container_id, "No such container")
+
+    def _count(self, call: str):
+        with self._lock:
+            self.calls[call] = self.calls.get(call, 0) + 1
+
+    def _record(self, call: str, latency: float):
+        self._count(call)
+        if latency:
+            time.sleep(latency)
+
+    @staticmethod
+    def _output(command: list) -> ExecResult:
+        if command and command[0] == "echo":
+            return ExecResult(0, (" ".join(command[1:]) + "\n").encode("utf-8"), b"")
+        return ExecResult(0, b"", b"")
+
+
+class FakeRPCNode:
+    """
+    Local JSON-RPC node stand-in for BlockchainIntegration. Answers every POST with a
+    transaction hash (and balance lookups with a fixed balance) after `latency` seconds.
+    """
+    def __init__(self, latency: float = 0.05, address: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.requests = 0
+        node = self
+        counter = itertools.count(1)
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                node.requests += 1
+                time.sleep(node.latency)
+                if request.get("method") == "eth_getBalance":
+                    payload = {"jsonrpc": "2.0", "id": request.get("id"), "result": hex(10 ** 18)}
+                else:
+                    payload = {"transactionHash": f"0x{next(counter):064x}"}
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((address, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{address}:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-rpc-node", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,292 @@
+# run.py
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from sdk.blockchain_integration import BlockchainIntegration
+from sdk.container_manager import ContainerManager
+from sdk.container_reaper import ContainerReaper
+from sdk.orchestrator import SudoOrchestrator
+from sdk.policy_engine import PolicyEngine
+from sdk.resource_scheduler import ResourceScheduler
+from .fakes import FakeDockerTransport, FakeRPCNode
+
+TASK_NAME = "benchmark_task"
+
+POLICIES = {
+    TASK_NAME: {"restricted_parameters": ["path"], "restricted_values": {"path": ["/etc/shadow"]}},
+    "create_file": {"restricted_parameters": ["path"], "restricted_values": {"path": ["/etc/passwd"]}},
+}
+
+
+def build_policies(size: int) -> dict:
+    """
+    POLICIES with each restricted parameter padded to `size` restricted values, plus
+    `size` banned prefixes and substrings for the "command" parameter.
+    """
+    policies = json.loads(json.dumps(POLICIES))
+    for action_policy in policies.values():
+        for values in action_policy["restricted_values"].values():
+            values.extend(f"/restricted/{index}" for index in range(len(values), size))
+        action_policy["restricted_patterns"] = {"command": {
+            "prefix": [f"/opt/banned-{index}/" for index in range(size)],
+            "substring": [f"--banned-flag-{index}" for index in range(size)],
+        }}
+    return policies
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def measure(call, iterations: int, concurrency: int, warmup: int = 0) -> dict:
+    """
+    Runs `call(i)` `iterations` times from `concurrency` threads and summarizes the latencies.
+
+    :return: Throughput (calls/s) and latency statistics in milliseconds
+    """
+    def timed(index):
+        started = time.perf_counter()
+        call(index)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(warmup)))
+        started = time.perf_counter()
+        latencies = sorted(pool.map(timed, range(iterations)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "iterations": iterations,
+        "elapsed_s": elapsed,
+        "throughput_per_s": iterations / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def peak_memory(call, iterations: int, concurrency: int) -> int:
+    """
+    Peak Python heap growth (KiB) while running the workload, traced in a separate pass
+    so that tracing does not distort the timings.
+    """
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(call, range(iterations)))
+        return max(0, tracemalloc.get_traced_memory()[1] - baseline) // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def execute_task_benchmark(args, policy_file: str, state_dir: str):
+    """
+    SudoOrchestrator.execute_task through the real policy check, container pool and exec path.
+    """
+    def setup(concurrency):
+        transport = FakeDockerTransport(args.start_latency, args.exec_latency, args.remove_latency)
+        reaper = ContainerReaper(transport, state_dir=state_dir)
+        reaper.start(sweep=False)
+        container_manager = ContainerManager(
+            "benchmark:latest", transport=transport, pool_max_size=concurrency, pool_max_total=concurrency,
+            reaper=reaper, scheduler=ResourceScheduler(cpus=concurrency * 4, memory_mb=concurrency * 4096),
+        )
+        orchestrator = SudoOrchestrator(PolicyEngine(policy_file), container_manager)
+
+        def call(index):
+            result = orchestrator.execute_task(TASK_NAME, {"n": index}, "$SUDO-benchmark")
+            if isinstance(result, dict) and "error" in result:
+                raise RuntimeError(result["error"])
+
+        def teardown():
+            orchestrator.shutdown()
+            container_manager.close()
+
+        return call, teardown
+    return setup
+
+
+def validate_action_benchmark(args, policy_file: str, state_dir: str):
+    """
+    PolicyEngine.validate_action on a mix of allowed and restricted requests, run once per policy size.
+    """
+    def setup(concurrency):
+        policy_engine = PolicyEngine(policy_file)
+        requests_ = [("create_file", {"path": "/tmp/out.txt"}), ("create_file", {"path": "/etc/passwd"}),
+                     (TASK_NAME, {"path": "/srv/data"}), ("unknown_action", {}),
+                     (TASK_NAME, {"command": "/usr/bin/tool " + " ".join(f"--flag-{n}" for n in range(50))})]
+
+        def call(index):
+            action, parameters = requests_[index % len(requests_)]
+            policy_engine.validate_action(action, parameters)
+
+        return call, lambda: None
+    return setup
+
+
+def validate_actions_benchmark(args, policy_file: str, state_dir: str):
+    """
+    PolicyEngine.validate_actions on batches of --batch-size requests, one batch per call.
+    """
+    def setup(concurrency):
+        policy_engine = PolicyEngine(policy_file)
+        kinds = [("create_file", "/tmp/out-{}.txt"), ("create_file", "/etc/passwd"),
+                 (TASK_NAME, "/srv/data/{}"), ("unknown_action", "{}")]
+        batch = [(action, {"path": path.format(index % 64)})
+                 for index, (action, path) in ((index, kinds[index % len(kinds)]) for index in range(args.batch_size))]
+
+        def call(index):
+            policy_engine.validate_actions(batch)
+
+        return call, lambda: None
+    return setup
+
+
+def log_event_benchmark(args, policy_file: str, state_dir: str):
+    """
+    BlockchainIntegration.log_event against the fake JSON-RPC node.
+    """
+    def setup(concurrency):
+        node = FakeRPCNode(latency=args.rpc_latency).start()
+        blockchain = BlockchainIntegration(node.url, "0x" + "0" * 40)
+
+        def call(index):
+            result = blockchain.log_event({"task": TASK_NAME, "index": index})
+            if isinstance(result, dict) and "error" in result:
+                raise RuntimeError(result["error"])
+
+        return call, node.stop
+    return setup
+
+
+BENCHMARKS = {
+    "execute_task": execute_task_benchmark,
+    "validate_action": validate_action_benchmark,
+    "validate_actions": validate_actions_benchmark,
+    "log_event": log_event_benchmark,
+}
+
+# Benchmarks repeated for every --policy-sizes entry, to show how they scale with the policy file
+POLICY_SIZED = {"validate_action", "validate_actions"}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=10,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args) -> dict:
+    """
+    Runs the selected benchmarks at every concurrency level.
+
+    :return: The JSON-serializable report
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        policy_file = os.path.join(work_dir, "policies.json")
+        with open(policy_file, "w") as f:
+            json.dump(POLICIES, f)
+        sized_policy_files = {}
+        for size in args.policy_sizes:
+            sized_policy_files[size] = os.path.join(work_dir, f"policies-{size}.json")
+            with open(sized_policy_files[size], "w") as f:
+                json.dump(build_policies(size), f)
+        state_dir = os.path.join(work_dir, "reaper")
+
+        for name in args.benchmarks:
+            sizes = args.policy_sizes if name in POLICY_SIZED else [None]
+            for size in sizes:
+                for concurrency in args.concurrency:
+                    policies = policy_file if size is None else sized_policy_files[size]
+                    call, teardown = BENCHMARKS[name](args, policies, state_dir)(concurrency)
+                    try:
+                        stats = measure(call, args.iterations, concurrency, warmup=args.warmup or concurrency)
+                        if args.memory:
+                            stats["peak_memory_kib"] = peak_memory(call, args.iterations, concurrency)
+                    finally:
+                        teardown()
+                    result = {"benchmark": name, "concurrency": concurrency, **stats}
+                    if size is not None:
+                        result["policy_size"] = size
+                    results.append(result)
+                    label = name if size is None else f"{name}[{size}]"
+                    print(f"{label:24} c={concurrency:<4} {stats['throughput_per_s']:10.1f}/s  "
+                          f"p50 {stats['p50_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms", file=sys.stderr)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "iterations": args.iterations,
+            "start_latency": args.start_latency,
+            "exec_latency": args.exec_latency,
+            "remove_latency": args.remove_latency,
+            "rpc_latency": args.rpc_latency,
+            "policy_sizes": args.policy_sizes,
+            "batch_size": args.batch_size,
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv: list = None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run",
+                                     description="Benchmark the task pipeline against local stand-ins.")
+    parser.add_argument("--benchmarks", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 8, 32],
+                        help="Comma-separated concurrency levels (default: 1,8,32)")
+    parser.add_argument("--iterations", type=int, default=500, help="Timed calls per benchmark and level")
+    parser.add_argument("--warmup", type=int, default=0, help="Untimed calls first (default: the concurrency)")
+    parser.add_argument("--start-latency", type=float, default=0.2, help="Fake container start, in seconds")
+    parser.add_argument("--exec-latency", type=float, default=0.01, help="Fake exec, in seconds")
+    parser.add_argument("--remove-latency", type=float, default=0.05, help="Fake container removal, in seconds")
+    parser.add_argument("--rpc-latency", type=float, default=0.02, help="Fake JSON-RPC node, in seconds")
+    parser.add_argument("--policy-sizes", type=lambda v: [int(n) for n in v.split(",")], default=[10, 1000, 100000],
+                        help="Restricted values per parameter for the policy benchmarks (default: 10,1000,100000)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Requests per validate_actions call")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Skip the traced memory pass")
+    parser.add_argument("--with-logging", action="store_true",
+                        help="Keep SDK log output (off by default so console I/O does not dominate the timings)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None):
+    args = parse_args(argv)
+    if not args.with_logging:
+        logging.disable(logging.CRITICAL)
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,6 @@ from .container_manager import ContainerManager
 from .blockchain_integration import BlockchainIntegration
 from .policy_engine import PolicyEngine
 from .config import Config
-from .utils import some_util_function
 
 # Optionally, set the version of the package
 __version__ = '0.1.0'
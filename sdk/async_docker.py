@@ -0,0 +1,205 @@
+# async_docker.py
+
+import asyncio
+import json
+import struct
+from urllib.parse import urlparse
+from .errors import ContainerError
+
+# Stream IDs used by the Engine API's multiplexed exec output
+STREAM_NAMES = {1: "stdout", 2: "stderr"}
+
+
+class AsyncEngineClient:
+    """
+    Minimal asyncio client for the Docker Engine API.
+
+    Only the endpoints ContainerManager needs on its async path are implemented.
+    Idle connections are kept open and reused for subsequent requests; connections
+    hijacked by an exec stream are closed once the stream ends.
+    """
+    def __init__(self, base_url: str, api_version: str, max_connections: int = 10, timeout: float = 60.0):
+        """
+        :param base_url: Daemon URL ('unix:///var/run/docker.sock' or 'tcp://host:port')
+        :param api_version: Engine API version to use in request paths (e.g., '1.43')
+        :param max_connections: Maximum number of idle keep-alive connections kept open
+        :param timeout: Seconds to wait when opening a connection
+        """
+        parsed = urlparse(base_url)
+        if parsed.scheme not in ("unix", "tcp", "http"):
+            raise ContainerError("transport", f"Unsupported Docker host for async client: {base_url}")
+        self.base_url = base_url
+        self._parsed = parsed
+        self.api_version = api_version
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._idle = []
+
+    async def exec_run(self, container_id: str, command: list) -> tuple:
+        """
+        Creates and runs an exec, collecting its output.
+
+        :param container_id: The ID of the container
+        :param command: The command to run (argv list)
+        :return: A tuple (exit_code, stdout, stderr)
+        """
+        created = await self.request_json("POST", f"/containers/{container_id}/exec", {
+            "Cmd": list(command), "AttachStdout": True, "AttachStderr": True, "Tty": False,
+        })
+        exec_id = created["Id"]
+
+        stdout, stderr = [], []
+        async for stream, data in self.exec_start(exec_id):
+            (stdout if stream == "stdout" else stderr).append(data)
+
+        inspected = await self.request_json("GET", f"/exec/{exec_id}/json")
+        return inspected["ExitCode"], b"".join(stdout), b"".join(stderr)
+
+    async def exec_start(self, exec_id: str):
+        """
+        Starts an exec and yields (stream, data) frames from its multiplexed output.
+
+        :param exec_id: The ID of a created exec
+        """
+        reader, writer = await self._open()
+        try:
+            body = json.dumps({"Detach": False, "Tty": False}).encode('utf-8')
+            await self._send(writer, "POST", f"/exec/{exec_id}/start", body,
+                             extra_headers={"Connection": "Upgrade", "Upgrade": "tcp"})
+            status, headers = await self._read_head(reader)
+            if status not in (101, 200):
+                details = (await self._read_body(reader, headers, status)).decode('utf-8', 'replace')
+                raise ContainerError(exec_id, f"Exec start failed with status {status}: {details}")
+            while True:
+                try:
+                    header = await reader.readexactly(8)
+                except asyncio.IncompleteReadError:
+                    return
+                stream_id, size = struct.unpack('>BxxxL', header)
+                data = await reader.readexactly(size)
+                yield STREAM_NAMES.get(stream_id, "stdout"), data
+        finally:
+            writer.close()
+
+    async def request_json(self, method: str, path: str, payload: dict = None, allow_empty: bool = False):
+        """
+        Sends a request and decodes the JSON response.
+
+        :param method: HTTP method
+        :param path: API path without the version prefix (e.g., '/containers/json')
+        :param payload: Optional JSON body
+        :param allow_empty: Return None instead of failing on an empty response body
+        :return: The decoded JSON response
+        """
+        status, body = await self.request(method, path, payload)
+        if status >= 400:
+            raise ContainerError("engine", f"{method} {path} failed with status {status}: "
+                                           f"{body.decode('utf-8', 'replace')}")
+        if not body:
+            if allow_empty:
+                return None
+            raise ContainerError("engine", f"{method} {path} returned an empty response")
+        return json.loads(body)
+
+    async def request(self, method: str, path: str, payload: dict = None) -> tuple:
+        """
+        Sends a request over a pooled keep-alive connection.
+
+        :return: A tuple (status, body bytes)
+        """
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b""
+        reader, writer = await self._acquire()
+        reusable = False
+        try:
+            await self._send(writer, method, path, body)
+            status, headers = await self._read_head(reader)
+            data = await self._read_body(reader, headers, status)
+            reusable = headers.get("connection", "").lower() != "close"
+            return status, data
+        finally:
+            if reusable and len(self._idle) < self.max_connections:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+
+    async def close(self):
+        """
+        Closes all idle connections.
+        """
+        self.close_nowait()
+
+    def close_nowait(self):
+        """
+        Closes all idle connections without awaiting. Safe to call after the client's
+        event loop has been closed; the sockets are then released with their transports.
+        """
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            try:
+                writer.close()
+            except RuntimeError:
+                # The loop is closed already
+                pass
+
+    async def _acquire(self):
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return await self._open()
+
+    async def _open(self):
+        if self._parsed.scheme == "unix":
+            connect = asyncio.open_unix_connection(self._parsed.path)
+        else:
+            connect = asyncio.open_connection(self._parsed.hostname, self._parsed.port or 2375)
+        try:
+            return await asyncio.wait_for(connect, self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ContainerError("engine", f"Failed to connect to Docker Engine at {self.base_url}: {str(e)}")
+
+    async def _send(self, writer, method: str, path: str, body: bytes, extra_headers: dict = None):
+        headers = {
+            "Host": "docker",
+            "Content-Type": "application/json",
+            "Content-Length": str(len(body)),
+        }
+        headers.update(extra_headers or {})
+        head = f"{method} /v{self.api_version}{path} HTTP/1.1\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode('latin-1') + b"\r\n" + body)
+        await writer.drain()
+
+    @staticmethod
+    async def _read_head(reader) -> tuple:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ContainerError("engine", "Connection closed by Docker Engine")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    @staticmethod
+    async def _read_body(reader, headers: dict, status: int) -> bytes:
+        if status in (204, 304) or status < 200:
+            return b""
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    return b"".join(chunks)
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+        if "content-length" in headers:
+            return await reader.readexactly(int(headers["content-length"]))
+        headers["connection"] = "close"
+        return await reader.read()
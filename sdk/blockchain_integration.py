@@ -3,6 +3,7 @@
 import requests
 import json
 from .logging_config import logger
+from .metrics import metrics
 
 class BlockchainIntegration:
     def __init__(self, blockchain_url: str, token_contract_address: str):
@@ -25,6 +26,7 @@ class BlockchainIntegration:
         :param private_key: The private key of the sender to sign the transaction
         :return: The transaction hash or an error message
         """
+        span = metrics.span("blockchain_transaction").start()
         try:
             # Construct the transaction data
             transaction_data = {
@@ -39,11 +41,13 @@ class BlockchainIntegration:
             # Sign and send the transaction (simplified example)
             signed_transaction = self._sign_transaction(transaction_data, private_key)
             transaction_hash = self._send_raw_transaction(signed_transaction)
+            span.stop()
 
             logger.info(f"Transaction sent successfully. Hash: {transaction_hash}")
             return transaction_hash
 
         except Exception as e:
+            span.stop(failed=True)
             logger.error(f"Error in sending transaction: {str(e)}")
             return {"error": str(e)}
 
@@ -122,6 +126,7 @@ class BlockchainIntegration:
         :param event_data: The event data to log on-chain (e.g., task completed, governance decision)
         :return: The transaction hash for the logged event
         """
+        span = metrics.span("blockchain_log").start()
         try:
             # Event data would be a custom structure for your use case (simplified example)
             event_data["eventTimestamp"] = self._get_current_timestamp()
@@ -133,10 +138,12 @@ class BlockchainIntegration:
                 amount=0,  # No tokens involved in the logging, just an event
                 private_key="your_private_key_here"
             )
+            span.stop(failed=isinstance(transaction_hash, dict))
 
             logger.info(f"Event logged successfully. Transaction Hash: {transaction_hash}")
             return transaction_hash
         except Exception as e:
+            span.stop(failed=True)
             logger.error(f"Error in logging event: {str(e)}")
             return {"error": str(e)}
 
@@ -1,6 +1,7 @@
 # config.py
 
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from a .env file if it exists
@@ -20,6 +21,76 @@ class Config:
     # Container settings
     CONTAINER_IMAGE = os.getenv("CONTAINER_IMAGE", "sudoai/container:latest")
     CONTAINER_TIMEOUT = int(os.getenv("CONTAINER_TIMEOUT", 3600))  # in seconds
+    CONTAINER_POOL_MIN_SIZE = int(os.getenv("CONTAINER_POOL_MIN_SIZE", 0))
+    CONTAINER_POOL_MAX_SIZE = int(os.getenv("CONTAINER_POOL_MAX_SIZE", 4))
+    CONTAINER_POOL_IDLE_TIMEOUT = int(os.getenv("CONTAINER_POOL_IDLE_TIMEOUT", 300))  # in seconds
+    # Containers kept over all images, networks, resource limits and hosts (0 for no overall limit)
+    CONTAINER_POOL_MAX_TOTAL = int(os.getenv("CONTAINER_POOL_MAX_TOTAL", 16))
+    # Capacity of each Docker host shared by running tasks (HOST_MEMORY_MB=0 detects physical memory)
+    HOST_CPUS = float(os.getenv("HOST_CPUS", os.cpu_count() or 1))
+    HOST_MEMORY_MB = int(os.getenv("HOST_MEMORY_MB", 0))
+    # Resources (and container cgroup limits) for tasks that do not declare any
+    TASK_DEFAULT_CPUS = float(os.getenv("TASK_DEFAULT_CPUS", 0.5))
+    TASK_DEFAULT_MEMORY_MB = int(os.getenv("TASK_DEFAULT_MEMORY_MB", 256))
+    CONTAINER_REAPER_STATE_DIR = os.getenv("CONTAINER_REAPER_STATE_DIR", os.path.join(tempfile.gettempdir(), "sudo-sdk"))
+    CONTAINER_USE_AGENT = os.getenv("CONTAINER_USE_AGENT", "False") == "True"
+    CONTAINER_AGENT_PYTHON = os.getenv("CONTAINER_AGENT_PYTHON", "python3")
+    MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS", 256))  # per event loop, async API only
+
+    # Docker connection settings ('api' for the Engine API, 'cli' for the docker CLI, 'auto' to pick)
+    DOCKER_BACKEND = os.getenv("DOCKER_BACKEND", "auto")
+    DOCKER_HOST = os.getenv("DOCKER_HOST", "unix:///var/run/docker.sock")
+    DOCKER_MAX_POOL_SIZE = int(os.getenv("DOCKER_MAX_POOL_SIZE", 10))
+    # Comma-separated daemon URLs; with more than one, containers are spread over the hosts
+    DOCKER_HOSTS = [url.strip() for url in os.getenv("DOCKER_HOSTS", "").split(",") if url.strip()]
+    DOCKER_HOST_FAILURE_THRESHOLD = int(os.getenv("DOCKER_HOST_FAILURE_THRESHOLD", 3))
+    DOCKER_HOST_DRAIN_INTERVAL = int(os.getenv("DOCKER_HOST_DRAIN_INTERVAL", 30))  # in seconds
+
+    # Orchestrator worker pool used by SudoOrchestrator.submit()
+    ORCHESTRATOR_WORKERS = int(os.getenv("ORCHESTRATOR_WORKERS", 8))
+    ORCHESTRATOR_QUEUE_SIZE = int(os.getenv("ORCHESTRATOR_QUEUE_SIZE", 1000))
+    # Per-user quotas for submit(), keyed by user token (0 means no limit)
+    USER_MAX_CONCURRENT_TASKS = int(os.getenv("USER_MAX_CONCURRENT_TASKS", 0))
+    USER_MAX_QUEUED_TASKS = int(os.getenv("USER_MAX_QUEUED_TASKS", 0))
+    USER_RATE_LIMIT = float(os.getenv("USER_RATE_LIMIT", 0))  # tasks started per second
+    USER_RATE_BURST = float(os.getenv("USER_RATE_BURST", 10))
+    # Fair-share weights as comma-separated token=weight pairs (default weight 1)
+    USER_WEIGHTS = {
+        token.strip(): float(weight)
+        for token, _, weight in (pair.partition("=") for pair in os.getenv("USER_WEIGHTS", "").split(","))
+        if token.strip() and weight.strip()
+    }
+    # Acquire containers during the permission check and store results in the background
+    ORCHESTRATOR_PIPELINED = os.getenv("ORCHESTRATOR_PIPELINED", "False") == "True"
+    # Run identical tasks that are in flight at the same time only once (only safe for idempotent tasks)
+    COALESCE_IDENTICAL_TASKS = os.getenv("COALESCE_IDENTICAL_TASKS", "False") == "True"
+    WORKFLOW_MAX_PARALLEL = int(os.getenv("WORKFLOW_MAX_PARALLEL", 8))  # steps running at once per workflow
+
+    # Durable task queue and the sudo-worker processes that run it
+    TASK_QUEUE_PATH = os.getenv("TASK_QUEUE_PATH", os.path.join(tempfile.gettempdir(), "sudo-sdk", "tasks.db"))
+    TASK_QUEUE_LEASE_TIMEOUT = float(os.getenv("TASK_QUEUE_LEASE_TIMEOUT", CONTAINER_TIMEOUT + 60))  # in seconds
+    TASK_QUEUE_MAX_ATTEMPTS = int(os.getenv("TASK_QUEUE_MAX_ATTEMPTS", 5))
+    TASK_QUEUE_BACKOFF_BASE = float(os.getenv("TASK_QUEUE_BACKOFF_BASE", 1))  # first retry delay, in seconds
+    TASK_QUEUE_BACKOFF_MAX = float(os.getenv("TASK_QUEUE_BACKOFF_MAX", 300))  # in seconds
+    WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", os.cpu_count() or 1))
+    WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", 0.5))  # in seconds
+
+    # Result cache for deterministic tasks ('memory' or 'sqlite'; empty disables it)
+    RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "")
+    RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join(tempfile.gettempdir(), "sudo-sdk", "results.db"))
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 1024))
+    RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", 0))  # in seconds; 0 caches only tasks in RESULT_CACHE_TTLS
+    # Per-task TTLs as comma-separated task=seconds pairs, e.g. "hash_file=3600,list_dir=0"
+    RESULT_CACHE_TTLS = {
+        name.strip(): float(ttl)
+        for name, _, ttl in (pair.partition("=") for pair in os.getenv("RESULT_CACHE_TTLS", "").split(","))
+        if name.strip() and ttl.strip()
+    }
+
+    # Per-stage latency metrics, exported in the Prometheus text format
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "False") == "True"
+    METRICS_PORT = int(os.getenv("METRICS_PORT", 9464))
+    METRICS_ADDRESS = os.getenv("METRICS_ADDRESS", "127.0.0.1")
 
     # API settings
     API_URL = os.getenv("API_URL", "https://api.sudoai.com")
@@ -31,6 +102,11 @@ class Config:
 
     # Policy settings
     POLICY_FILE = os.getenv("POLICY_FILE", "policies.json")
+    # Reload the policy file when it changes (inotify on Linux, otherwise polled every interval)
+    POLICY_HOT_RELOAD = os.getenv("POLICY_HOT_RELOAD", "False") == "True"
+    POLICY_RELOAD_INTERVAL = float(os.getenv("POLICY_RELOAD_INTERVAL", 2))  # in seconds
+    # Policy decisions remembered per snapshot (0 disables the cache)
+    POLICY_DECISION_CACHE_SIZE = int(os.getenv("POLICY_DECISION_CACHE_SIZE", 4096))
 
     @staticmethod
     def get_env():
@@ -0,0 +1,148 @@
+# container_agent.py
+
+import base64
+import json
+import struct
+import threading
+from .docker_transport import ExecResult
+from .errors import ContainerError, TaskTimeoutError
+from .logging_config import logger
+
+# Frames are a 4-byte big-endian length followed by a UTF-8 JSON payload
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+
+# Agent started inside the container with `python3 -c AGENT_SOURCE`. It reads
+# task frames from stdin, runs each command and writes one result frame back.
+AGENT_SOURCE = r'''
+import base64, json, struct, subprocess, sys
+inp, out = sys.stdin.buffer, sys.stdout.buffer
+def read_exactly(size):
+    data = b""
+    while len(data) < size:
+        chunk = inp.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+while True:
+    header = read_exactly(4)
+    if header is None:
+        break
+    request = json.loads(read_exactly(struct.unpack(">I", header)[0]).decode("utf-8"))
+    try:
+        done = subprocess.run(request["argv"], stdin=subprocess.DEVNULL,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        exit_code, stdout, stderr = done.returncode, done.stdout, done.stderr
+    except Exception as e:
+        exit_code, stdout, stderr = 127, b"", str(e).encode("utf-8")
+    payload = json.dumps({
+        "id": request["id"], "exit_code": exit_code,
+        "stdout": base64.b64encode(stdout).decode("ascii"),
+        "stderr": base64.b64encode(stderr).decode("ascii"),
+    }).encode("utf-8")
+    out.write(struct.pack(">I", len(payload)) + payload)
+    out.flush()
+'''
+
+
+def encode_frame(message: dict) -> bytes:
+    """
+    Encodes a message as a length-prefixed JSON frame.
+
+    :param message: The message to encode
+    :return: The frame bytes
+    """
+    payload = json.dumps(message).encode('utf-8')
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def decode_frame(recv_exactly) -> dict:
+    """
+    Reads one length-prefixed JSON frame.
+
+    :param recv_exactly: Callable (size) -> bytes returning exactly `size` bytes
+    :return: The decoded message
+    """
+    (size,) = FRAME_HEADER.unpack(recv_exactly(FRAME_HEADER.size))
+    if size > MAX_FRAME_SIZE:
+        raise ValueError(f"Agent frame of {size} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+    return json.loads(recv_exactly(size).decode('utf-8'))
+
+
+class ContainerAgent:
+    """
+    Host side of the long-lived agent process running inside a container.
+
+    Tasks are sent as frames over one attached stdin/stdout channel, so each
+    task costs a round trip on an open stream instead of a new exec.
+    """
+    def __init__(self, transport, container_id: str, python: str = "python3"):
+        """
+        Starts the agent inside the container.
+
+        :param transport: The DockerTransport used to attach to the container
+        :param container_id: The ID of the container
+        :param python: Python interpreter available inside the container image
+        """
+        self.container_id = container_id
+        self.channel = transport.open_channel(container_id, [python, "-u", "-c", AGENT_SOURCE])
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.served = 0
+
+    def run(self, command: list, timeout: float = None) -> ExecResult:
+        """
+        Runs a command through the agent and waits for its result.
+
+        :param command: The command to run (argv list)
+        :param timeout: Seconds to wait for the result (None waits forever). On expiry the
+                        channel is aborted and TaskTimeoutError is raised; the agent is unusable afterwards.
+        :return: An ExecResult with the exit code and captured output
+        """
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            expired = threading.Event()
+            watchdog = None
+            if timeout is not None:
+                watchdog = threading.Timer(timeout, lambda: (expired.set(), self.channel.abort()))
+                watchdog.daemon = True
+                watchdog.start()
+            try:
+                self.channel.send(encode_frame({"id": request_id, "argv": list(command)}))
+                response = decode_frame(self.channel.recv_exactly)
+            except Exception as e:
+                self.close()
+                if expired.is_set():
+                    raise TaskTimeoutError(self.container_id, timeout)
+                raise ContainerError(self.container_id, f"Agent channel failed: {str(e)}")
+            finally:
+                if watchdog is not None:
+                    watchdog.cancel()
+            if expired.is_set():
+                # The watchdog fired just after the answer arrived; the channel is no longer usable
+                self.close()
+
+        if response.get("id") != request_id:
+            self.close()
+            raise ContainerError(self.container_id, f"Agent answered request {response.get('id')}, expected {request_id}")
+        self.served += 1
+        return ExecResult(
+            response["exit_code"],
+            base64.b64decode(response["stdout"]),
+            base64.b64decode(response["stderr"]),
+        )
+
+    @property
+    def alive(self) -> bool:
+        return not self.channel.closed
+
+    def close(self):
+        """
+        Closes the channel, which ends the agent process.
+        """
+        try:
+            self.channel.close()
+        except Exception as e:
+            logger.warning(f"Failed to close agent channel for container {self.container_id}: {str(e)}")
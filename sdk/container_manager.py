@@ -1,97 +1,817 @@
 # container_manager.py
 
-import subprocess
+import asyncio
+import functools
 import os
+import re
+import shlex
+import threading
+import time
+import uuid
+from .config import Config
+from .container_agent import ContainerAgent
+from .container_pool import ContainerPool
+from .container_reaper import ContainerReaper
+from .docker_transport import DockerTransport, ExecResult, ExecStream, create_transport
+from .errors import ContainerError, TaskTimeoutError
+from .file_transfer import extract_tar_stream, tar_stream
 from .logging_config import logger
+from .metrics import metrics
+from .multi_host import MultiHostTransport, create_multi_host_transport
+from .resource_scheduler import Placement, Reservation, ResourceRequest, ResourceScheduler, host_memory_mb, parse_resources
+
+# Task input files land here; the default reset command wipes it between tasks
+TASK_FILES_DIR = "/tmp"
+
+# Clears task scratch files so a pooled container can be handed to the next task
+DEFAULT_RESET_COMMAND = ["sh", "-c", "rm -rf /tmp/* /tmp/.[!.]* 2>/dev/null; true"]
+
+# Containers of one image in which the task agent must fail before the image is run with exec only
+AGENT_IMAGE_FAILURE_LIMIT = 3
+
+
+class _Deadline:
+    """
+    Absolute deadline of a task, fixed when the task is submitted.
+    """
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires_at = None if timeout is None else time.monotonic() + timeout
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def remaining(self, container_id: str = "task") -> float:
+        """
+        Returns the seconds left (None without a deadline), raising TaskTimeoutError once it has passed.
+        """
+        if self.expires_at is None:
+            return None
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise TaskTimeoutError(container_id, self.timeout)
+        return remaining
+
+
+class TaskLease:
+    """
+    Host capacity and a pooled container held for one task that has not run yet.
+    """
+    def __init__(self, manager, task: dict, deadline: _Deadline, reservation=None, container_id: str = None,
+                 error: Exception = None):
+        self.manager = manager
+        self.task = task
+        self.deadline = deadline
+        self.reservation = reservation
+        self.container_id = container_id
+        self.error = error          # why the container could not be acquired, if it was not
+        self._claimed = False
+        self._lock = threading.Lock()
+
+    def claim(self) -> bool:
+        """
+        Marks the lease as used; returns False if it was used or released before.
+        """
+        with self._lock:
+            claimed, self._claimed = self._claimed, True
+        return not claimed
+
+    def release(self):
+        """
+        Gives back a lease that will not be used. The container is still clean and skips the reset.
+        """
+        if not self.claim() or self.error is not None:
+            return
+        self.manager.pool.release(self.container_id, reset=False)
+        self.reservation.release()
+
 
 class ContainerManager:
-    def __init__(self, container_image: str, container_network: str = 'host'):
+    def __init__(self, container_image: str, container_network: str = 'host',
+                 pool_min_size: int = Config.CONTAINER_POOL_MIN_SIZE,
+                 pool_max_size: int = Config.CONTAINER_POOL_MAX_SIZE,
+                 pool_idle_timeout: float = Config.CONTAINER_POOL_IDLE_TIMEOUT,
+                 reset_command: list = None, transport: DockerTransport = None,
+                 max_concurrency: int = Config.MAX_CONCURRENT_TASKS,
+                 use_agent: bool = Config.CONTAINER_USE_AGENT,
+                 agent_python: str = Config.CONTAINER_AGENT_PYTHON,
+                 reaper: ContainerReaper = None, scheduler: ResourceScheduler = None,
+                 default_resources: ResourceRequest = None,
+                 task_timeout: float = Config.CONTAINER_TIMEOUT,
+                 pool_max_total: int = Config.CONTAINER_POOL_MAX_TOTAL):
         """
         Initializes the container manager with the desired image and network.
         
         :param container_image: The container image to use (e.g., 'python:3.9-slim')
         :param container_network: The network mode for the container (default: 'host')
+        :param pool_min_size: Number of warm containers kept per image and network
+        :param pool_max_size: Maximum number of containers per image and network
+        :param pool_idle_timeout: Seconds an idle container above pool_min_size is kept
+        :param reset_command: Command run inside a container before it is reused (default: clear /tmp)
+        :param transport: Docker transport to use (default: built from DOCKER_BACKEND and DOCKER_HOSTS,
+                          or DOCKER_HOST when no host list is set)
+        :param max_concurrency: Maximum number of tasks the async API runs at once
+        :param use_agent: Run tasks through a persistent agent process inside each container
+                          instead of one exec per command (requires Python in the image)
+        :param agent_python: Python interpreter used to start the agent inside the container
+        :param reaper: Background remover for discarded containers (default: one persisting to
+                       CONTAINER_REAPER_STATE_DIR, started with an orphan sweep)
+        :param scheduler: Admits tasks onto host capacity (default: HOST_CPUS / HOST_MEMORY_MB
+                          on each Docker host)
+        :param default_resources: Resources for tasks without a "resources" entry
+                                  (default: TASK_DEFAULT_CPUS / TASK_DEFAULT_MEMORY_MB)
+        :param task_timeout: Deadline in seconds for tasks without a "timeout" entry, covering
+                             queueing and execution (0 or None disables it)
+        :param pool_max_total: Maximum number of pooled containers overall (0 or None for no limit)
         """
         self.container_image = container_image
         self.container_network = container_network
+        self.reset_command = reset_command or DEFAULT_RESET_COMMAND
+        if transport is None and Config.DOCKER_HOSTS:
+            transport = create_multi_host_transport(
+                Config.DOCKER_HOSTS, Config.DOCKER_BACKEND, Config.DOCKER_MAX_POOL_SIZE,
+                failure_threshold=Config.DOCKER_HOST_FAILURE_THRESHOLD,
+                drain_interval=Config.DOCKER_HOST_DRAIN_INTERVAL,
+            )
+        self.transport = transport or create_transport(
+            Config.DOCKER_BACKEND, Config.DOCKER_HOST, Config.DOCKER_MAX_POOL_SIZE
+        )
+        if reaper is None:
+            reaper = ContainerReaper(self.transport, state_dir=Config.CONTAINER_REAPER_STATE_DIR)
+            reaper.start()
+        self.reaper = reaper
+        # HOST_CPUS / HOST_MEMORY_MB describe one Docker host; each endpoint gets that capacity,
+        # and tasks are reserved on the healthy endpoint the transport ranks best
+        multi_host = isinstance(self.transport, MultiHostTransport)
+        self.scheduler = scheduler or ResourceScheduler(
+            Config.HOST_CPUS, Config.HOST_MEMORY_MB or host_memory_mb() or 1024,
+            hosts=[e.url for e in self.transport.endpoints] if multi_host else None,
+            host_loads=self.transport.host_loads if multi_host else None,
+        )
+        self.default_resources = default_resources or ResourceRequest(
+            Config.TASK_DEFAULT_CPUS, Config.TASK_DEFAULT_MEMORY_MB
+        )
+        self.pool = ContainerPool(
+            start_container=self._start_container,
+            teardown_container=self._teardown_container,
+            health_check=self._is_container_running,
+            reset_container=self._reset_container,
+            min_size=pool_min_size,
+            max_size=pool_max_size,
+            idle_timeout=pool_idle_timeout,
+            max_total=pool_max_total or None,
+        )
+        self.task_timeout = task_timeout
+        self.max_concurrency = max_concurrency
+        self._async_semaphore = None
+        self.use_agent = use_agent
+        self.agent_python = agent_python
+        self._agents = {}
+        self._agentless = set()      # containers in which the agent failed to start or answer
+        self._agent_failures = {}    # image -> containers of that image in which the agent failed
+        self._agents_lock = threading.Lock()
     
     def execute_in_container(self, task: dict):
         """
         Executes a task in a container.
         
         :param task: The task to execute, which includes task name and parameters
-        :return: The result of the task execution
+                     and optionally a "timeout" in seconds
+        :return: The result of the task execution, or {"error": ..., "timed_out": True}
+                 if the deadline passed; a timed-out container is discarded, which kills the task
+        """
+        return self.execute_leased(self.lease_for_task(task))
+
+    def lease_for_task(self, task: dict) -> "TaskLease":
         """
+        Reserves host capacity and leases a warm container for a task without running it,
+        so the container can be acquired while other work (e.g., the permission check) is
+        still in progress. The task's deadline starts now.
+        
+        Never raises: a failed acquisition is recorded in the lease and reported by execute_leased().
+        
+        :param task: The task the container is for
+        :return: A TaskLease to pass to execute_leased() or to release() unused
+        """
+        deadline = None
+        reservation = None
         try:
-            # Start the container if it's not already running (simplified version)
-            container_id = self._start_container()
-            
-            # Execute the task inside the container
-            result = self._run_task_in_container(container_id, task)
-            
-            # Clean up the container after execution
-            self._teardown_container(container_id)
+            deadline = self._task_deadline(task)
+            resources = self._task_resources(task)
+            # Wait for host capacity, then lease a warm container with matching limits
+            with metrics.span("capacity_wait"):
+                reservation = self.scheduler.acquire(resources, timeout=deadline.remaining())
+            with metrics.span("container_acquire"):
+                container_id = self._lease_reserved(reservation, deadline.remaining())
+        except Exception as e:
+            if reservation is not None:
+                reservation.release()
+            return TaskLease(self, task, deadline, error=e)
+        return TaskLease(self, task, deadline, reservation, container_id)
+
+    def execute_leased(self, lease: "TaskLease"):
+        """
+        Runs a task in the container leased for it by lease_for_task(), then resets the
+        container and returns it to the pool.
+        
+        :param lease: The lease returned by lease_for_task()
+        :return: The result of the task execution, or an error result as for execute_in_container()
+        """
+        task, deadline = lease.task, lease.deadline
+        try:
+            if not lease.claim():
+                raise ContainerError(str(lease.container_id), "Lease was already used or released")
+            if lease.error is not None:
+                raise lease.error
+            healthy = False
+            try:
+                result = self._run_task_in_container(lease.container_id, task, deadline)
+                healthy = True
+            finally:
+                # A failed or timed-out container is discarded rather than reused
+                self.pool.release(lease.container_id, healthy=healthy)
+                lease.reservation.release()
             
             return result
 
         except Exception as e:
+            if self._timed_out(e, deadline):
+                return self._timeout_result(task, deadline)
             logger.error(f"Error during container execution: {str(e)}")
             return {"error": str(e)}
 
-    def _start_container(self):
+    def execute_batch(self, tasks: list) -> list:
+        """
+        Executes several tasks in one container session.
+        
+        All tasks share one leased container. Without the agent they are packed into a
+        single exec; with the agent they are sent over its channel one after another.
+        A failing task does not stop the others, but the tasks share the container's
+        filesystem: files one task writes stay visible to the tasks after it. The
+        container is only reset when the batch is done, so batch together only tasks
+        that may see each other's files, e.g. one user's tasks.
+        
+        :param tasks: The tasks to execute, each with a task name and parameters
+        :return: One result per task, in the same order (output string or {"error": ...})
+        """
+        if not tasks:
+            return []
+        deadline = None
+        try:
+            # The batch shares one deadline: the longest of its tasks' timeouts
+            timeouts = [self._task_deadline(task).timeout for task in tasks]
+            deadline = _Deadline(None if None in timeouts else max(timeouts))
+            # Tasks run one after another, so the container needs the largest request of the batch
+            requests = [self._task_resources(task) for task in tasks]
+            resources = ResourceRequest(max(r.cpus for r in requests), max(r.memory_mb for r in requests))
+            with self.scheduler.acquire(resources, timeout=deadline.remaining()) as reservation:
+                container_id = self._lease_reserved(reservation, deadline.remaining())
+                healthy = False
+                try:
+                    outputs = self._run_batch_in_container(container_id, tasks, deadline)
+                    # A timed-out task may still be running; do not reuse its container
+                    healthy = not any(isinstance(output, TaskTimeoutError) for output in outputs)
+                finally:
+                    self.pool.release(container_id, healthy=healthy)
+        except Exception as e:
+            if self._timed_out(e, deadline):
+                return [self._timeout_result(task, deadline) for task in tasks]
+            logger.error(f"Error during batch container execution: {str(e)}")
+            return [{"error": str(e)} for _ in tasks]
+
+        results = []
+        for task, output in zip(tasks, outputs):
+            if isinstance(output, TaskTimeoutError):
+                results.append(self._timeout_result(task, deadline))
+            elif isinstance(output, Exception):
+                results.append({"error": str(output)})
+            elif output.exit_code != 0:
+                details = output.stderr.decode('utf-8', 'replace').strip()
+                results.append({"error": f"Task '{task['name']}' exited with {output.exit_code}: {details}"})
+            else:
+                results.append(output.stdout.decode('utf-8').strip())
+        logger.info(f"Batch of {len(tasks)} tasks executed in container {container_id}.")
+        return results
+
+    async def execute_in_container_async(self, task: dict):
         """
-        Starts a container using the configured image and network mode.
+        Async counterpart of execute_in_container.
+        
+        The exec runs over non-blocking process or socket I/O, and at most
+        max_concurrency tasks are in flight at once on the event loop.
         
+        :param task: The task to execute, which includes task name and parameters
+                     and optionally a "timeout" in seconds
+        :return: The result of the task execution, or {"error": ..., "timed_out": True}
+        """
+        deadline = None
+        try:
+            deadline = self._task_deadline(task)
+            resources = self._task_resources(task)
+            async with self._get_async_semaphore():
+                reservation = await asyncio.wait_for(self.scheduler.acquire_async(resources), deadline.remaining())
+                with reservation:
+                    loop = asyncio.get_running_loop()
+                    container_id = await self._lease_async(reservation, deadline)
+                    try:
+                        result = await self._run_task_in_container_async(container_id, task, deadline)
+                    except BaseException:
+                        # Shielded so that a second cancellation cannot skip the release
+                        await asyncio.shield(loop.run_in_executor(
+                            None, functools.partial(self.pool.release, container_id, healthy=False)
+                        ))
+                        raise
+                    await self._release_async(container_id)
+                    return result
+
+        except Exception as e:
+            if self._timed_out(e, deadline):
+                return self._timeout_result(task, deadline)
+            logger.error(f"Error during container execution: {str(e)}")
+            return {"error": str(e)}
+
+    def stream_task(self, task: dict) -> ExecStream:
+        """
+        Runs a task in a pooled container and streams its output as it is produced.
+        
+        The returned ExecStream yields OutputChunk(stream, data) items and exposes the
+        task's exit_code once exhausted. The container goes back to the pool when the
+        stream is exhausted or closed; closing it early stops the task.
+        
+        :param task: The task to execute, which includes task name and parameters
+        :return: An ExecStream over the task's stdout and stderr
+        """
+        resources = self._task_resources(task)
+        reservation = self.scheduler.acquire(resources)
+        try:
+            container_id = self._lease_reserved(reservation)
+        except Exception:
+            reservation.release()
+            raise
+        try:
+            if task.get("files"):
+                self.put_files(container_id, task["files"])
+            stream = self.transport.exec_stream(container_id, self._task_command(task))
+        except Exception:
+            self.pool.release(container_id, healthy=False)
+            reservation.release()
+            raise
+
+        def on_close(completed):
+            try:
+                self.pool.release(container_id, healthy=completed)
+            finally:
+                reservation.release()
+
+        stream.on_close = on_close
+        return stream
+
+    def put_files(self, container_id: str, files: dict, dest_dir: str = TASK_FILES_DIR):
+        """
+        Copies files into a container as one tar stream through the archive endpoint.
+        
+        Content is streamed, so large files are never held in memory as a whole.
+        
+        :param container_id: The ID of the container
+        :param files: Mapping of relative path to content: bytes, a host file path, or
+                      a (size, chunks) tuple with an iterable of bytes chunks
+        :param dest_dir: Directory in the container the paths are relative to (created if missing)
+        """
+        self._exec_checked(container_id, ["mkdir", "-p", dest_dir])
+        self.transport.put_archive(container_id, dest_dir, tar_stream(files))
+        logger.info(f"Copied {len(files)} files into container {container_id}:{dest_dir}.")
+
+    def get_files(self, container_id: str, path: str, dest_dir: str = None):
+        """
+        Copies a file or directory out of a container as a tar stream.
+        
+        :param container_id: The ID of the container
+        :param path: Path in the container
+        :param dest_dir: Host directory to extract into. When omitted, the tar archive
+                         is returned as an iterator of bytes chunks instead.
+        :return: The extracted paths, or the archive chunks when dest_dir is None
+        """
+        chunks = self.transport.get_archive(container_id, path)
+        if dest_dir is None:
+            return chunks
+        return extract_tar_stream(chunks, dest_dir)
+
+    def close(self):
+        """
+        Removes the idle containers held by the pool, waits for pending removals
+        and closes the Docker transport.
+        """
+        self.pool.close()
+        self.reaper.close()
+        self.transport.close()
+
+    def _start_container(self, image: str = None, network: str = None, resources: tuple = None):
+        """
+        Starts a container using the given (or configured) image and network mode.
+        
+        :param image: The container image (default: the manager's image)
+        :param network: The network mode (default: the manager's network)
+        :param resources: CPU and memory limits for the container's cgroup (default: no limits);
+                          a Placement also names the Docker host to start it on
         :return: The container ID of the started container
         """
         try:
+            # Pin the container to the host its capacity was reserved on
+            placement = {"host": resources.host} if isinstance(resources, Placement) else {}
             # Run a container and get the container ID
-            command = [
-                "docker", "run", "-d", "--network", self.container_network,
-                self.container_image, "sleep", "infinity"
-            ]
-            container_id = subprocess.check_output(command).decode('utf-8').strip()
+            with metrics.span("container_start"):
+                container_id = self.transport.run_container(
+                    image or self.container_image, network or self.container_network, ["sleep", "infinity"],
+                    labels=self.reaper.labels,
+                    cpus=resources.cpus if resources else None,
+                    memory_mb=resources.memory_mb if resources else None,
+                    **placement
+                )
             logger.info(f"Started container with ID: {container_id}")
             return container_id
-        except subprocess.CalledProcessError as e:
+        except ContainerError as e:
             logger.error(f"Failed to start container: {str(e)}")
             raise Exception("Failed to start container")
     
-    def _run_task_in_container(self, container_id: str, task: dict):
+    def _run_task_in_container(self, container_id: str, task: dict, deadline: _Deadline = None):
         """
         Runs the given task in the container.
         
         :param container_id: The ID of the running container
         :param task: The task to run inside the container
+        :param deadline: The task's deadline; TaskTimeoutError is raised once it passes
         :return: The result of the task execution
         """
         try:
-            # Example: Run a Python script to execute the task (this could be any command)
-            task_command = f'echo "{task["params"]}" > /tmp/task_output.txt'
-            
-            # Run the task inside the container
-            command = ["docker", "exec", container_id, "bash", "-c", task_command]
-            subprocess.check_output(command)
+            if task.get("files"):
+                self.put_files(container_id, task["files"])
+            timeout = deadline.remaining(container_id) if deadline else None
+            # Run the task and collect its output in a single exec (or agent round trip)
+            with metrics.span("exec"):
+                output = self._run_command(container_id, self._task_command(task), timeout)
+            if output.exit_code != 0:
+                details = output.stderr.decode('utf-8', 'replace').strip()
+                raise ContainerError(container_id, f"Task exited with {output.exit_code}: {details}")
+            result = output.stdout.decode('utf-8').strip()
             
-            # Retrieve the output from the container
-            result_command = ["docker", "exec", container_id, "cat", "/tmp/task_output.txt"]
-            result = subprocess.check_output(result_command).decode('utf-8').strip()
+            logger.info(f"Task executed successfully with result: {result}")
+            return result
+        except TaskTimeoutError:
+            raise
+        except ContainerError as e:
+            logger.error(f"Failed to run task inside container: {str(e)}")
+            raise Exception("Failed to run task inside container")
+
+    def _run_batch_in_container(self, container_id: str, tasks: list, deadline: _Deadline = None) -> list:
+        """
+        Runs a batch of tasks in one container.
+        
+        :param container_id: The ID of the running container
+        :param tasks: The tasks to run
+        :param deadline: Deadline of the whole batch; tasks still unfinished when it passes
+                         get a TaskTimeoutError
+        :return: One ExecResult (or the Exception that prevented the task from running) per task
+        """
+        commands = [self._task_command(task) for task in tasks]
+        paths = [path for task in tasks for path in (task.get("files") or {})]
+        # Tasks whose input files share a path must each see their own copy, so they run one at a time
+        if self.use_agent or len(paths) != len(set(paths)):
+            outputs = []
+            for task, command in zip(tasks, commands):
+                try:
+                    timeout = deadline.remaining(container_id) if deadline else None
+                    if task.get("files"):
+                        self.put_files(container_id, task["files"])
+                    outputs.append(self._run_command(container_id, command, timeout))
+                except TaskTimeoutError as e:
+                    outputs.extend([e] * (len(commands) - len(outputs)))
+                    break
+                except ContainerError as e:
+                    outputs.append(e)
+            return outputs
+
+        outputs = [None] * len(tasks)
+        runnable = []
+        for index, task in enumerate(tasks):
+            try:
+                if task.get("files"):
+                    self.put_files(container_id, task["files"])
+                runnable.append(index)
+            except ContainerError as e:
+                outputs[index] = e
+        if not runnable:
+            return outputs
+
+        # Markers carry a random token so task output cannot forge them
+        token = uuid.uuid4().hex
+        script = "\n".join(
+            f"printf '{token}:{index}:start\\n'; printf '{token}:{index}:start\\n' >&2; "
+            f"( {' '.join(shlex.quote(arg) for arg in commands[task_index])} ) </dev/null; "
+            f"printf '\\n{token}:{index}:end:%d\\n' $?"
+            for index, task_index in enumerate(runnable)
+        )
+        try:
+            timeout = deadline.remaining(container_id) if deadline else None
+            output = self.transport.exec_command(container_id, ["sh", "-c", script], timeout=timeout)
+            results = self._split_batch_output(container_id, token, len(runnable), output)
+        except TaskTimeoutError as e:
+            results = [e] * len(runnable)
+        for task_index, result in zip(runnable, results):
+            outputs[task_index] = result
+        return outputs
+
+    @staticmethod
+    def _split_batch_output(container_id: str, token: str, count: int, output: ExecResult) -> list:
+        """
+        Splits the combined output of a packed batch exec into per-task results.
+        """
+        marker = re.escape(token.encode('ascii'))
+        stdout = {
+            int(match.group(1)): (match.group(2), int(match.group(3)))
+            for match in re.finditer(marker + rb":(\d+):start\n(.*?)\n" + marker + rb":\1:end:(\d+)\n",
+                                     output.stdout, re.DOTALL)
+        }
+        stderr = {}
+        parts = re.split(marker + rb":(\d+):start\n", output.stderr)
+        for index, data in zip(parts[1::2], parts[2::2]):
+            stderr[int(index)] = data
+
+        results = []
+        for index in range(count):
+            if index not in stdout:
+                details = output.stderr.decode('utf-8', 'replace').strip()
+                results.append(ContainerError(container_id, f"Batch exec ended before task {index} finished: {details}"))
+                continue
+            data, exit_code = stdout[index]
+            results.append(ExecResult(exit_code, data, stderr.get(index, b"")))
+        return results
+
+    async def _lease_async(self, reservation: Reservation, deadline: _Deadline) -> str:
+        """
+        Leases a container on the default executor without blocking the event loop.
+
+        The lease itself cannot be interrupted, so if the caller is cancelled while it is
+        in progress, the container is returned to the pool once the lease completes.
+
+        :param reservation: The capacity reserved for the task
+        :param deadline: The task's deadline, bounding the wait for a container
+        :return: The ID of the leased container
+        """
+        loop = asyncio.get_running_loop()
+        lease = loop.run_in_executor(None, self._lease_reserved, reservation, deadline.remaining())
+        try:
+            return await asyncio.shield(lease)
+        except asyncio.CancelledError:
+            lease.add_done_callback(self._release_abandoned_lease)
+            raise
+
+    def _lease_reserved(self, reservation: Reservation, timeout: float = None) -> str:
+        """
+        Leases a container matching a reservation. If the transport had to start it on
+        another Docker host than the one reserved, the reservation and the pooled container
+        are moved to that host, so capacity is counted where the task actually runs.
+
+        :param reservation: The capacity reserved for the task
+        :param timeout: Seconds to wait for a free container
+        :return: The ID of the leased container
+        """
+        container_id = self.pool.lease(self.container_image, self.container_network,
+                                       timeout=timeout, resources=reservation.placement)
+        if reservation.host is not None and isinstance(self.transport, MultiHostTransport):
+            host = self.transport.host_of(container_id)
+            if host != reservation.host:
+                logger.info(f"Container {container_id} runs on {host} instead of {reservation.host}; "
+                            f"moving its reservation.")
+                self.scheduler.relocate(reservation, host)
+                self.pool.relocate(container_id, reservation.placement)
+        return container_id
+
+    def _release_abandoned_lease(self, lease: asyncio.Future):
+        """
+        Returns a container leased for a caller that was cancelled in the meantime.
+        """
+        if lease.cancelled() or lease.exception() is not None:
+            return
+        self.pool.release(lease.result(), reset=False)
+
+    async def _run_task_in_container_async(self, container_id: str, task: dict, deadline: _Deadline = None):
+        """
+        Async counterpart of _run_task_in_container.
+        
+        :param container_id: The ID of the running container
+        :param task: The task to run inside the container
+        :param deadline: The task's deadline; TaskTimeoutError is raised once it passes
+        :return: The result of the task execution
+        """
+        try:
+            if task.get("files"):
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self.put_files, container_id, task["files"])
+            timeout = deadline.remaining(container_id) if deadline else None
+            with metrics.span("exec"):
+                output = await self.transport.exec_command_async(container_id, self._task_command(task),
+                                                                 timeout=timeout)
+            if output.exit_code != 0:
+                details = output.stderr.decode('utf-8', 'replace').strip()
+                raise ContainerError(container_id, f"Task exited with {output.exit_code}: {details}")
+            result = output.stdout.decode('utf-8').strip()
             
             logger.info(f"Task executed successfully with result: {result}")
             return result
-        except subprocess.CalledProcessError as e:
+        except TaskTimeoutError:
+            raise
+        except ContainerError as e:
             logger.error(f"Failed to run task inside container: {str(e)}")
             raise Exception("Failed to run task inside container")
 
+    async def _release_async(self, container_id: str):
+        """
+        Resets a container without blocking the event loop and returns it to the pool.
+        
+        :param container_id: The ID of the container to release
+        """
+        if self.pool.reset_workers:
+            # The pool resets it on its own threads; release() only queues it
+            self.pool.release(container_id)
+            return
+        try:
+            result = await self.transport.exec_command_async(container_id, self.reset_command)
+            healthy = result.exit_code == 0
+        except ContainerError as e:
+            logger.warning(f"Failed to reset pooled container {container_id}: {str(e)}")
+            healthy = False
+        if healthy:
+            self.pool.release(container_id, reset=False)
+        else:
+            # Removing the container blocks, so keep it off the event loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, functools.partial(self.pool.release, container_id, healthy=False))
+
+    def _get_async_semaphore(self) -> asyncio.Semaphore:
+        """
+        Returns the semaphore bounding async concurrency, creating it inside the running loop.
+        """
+        if self._async_semaphore is None:
+            self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._async_semaphore
+
+    def _task_resources(self, task: dict) -> ResourceRequest:
+        """
+        Returns the resources a task declared, or the manager's default request.
+        
+        :param task: The task, optionally with a "resources" dict ("cpus", "memory_mb")
+        :return: The task's ResourceRequest
+        """
+        return parse_resources(task.get("resources"), self.default_resources)
+
+    def _task_deadline(self, task: dict) -> _Deadline:
+        """
+        Starts the deadline of a task from its "timeout" entry or the manager's task_timeout.
+        
+        :param task: The task, optionally with a "timeout" in seconds
+        :return: The task's deadline
+        """
+        timeout = task.get("timeout", self.task_timeout)
+        return _Deadline(float(timeout) if timeout else None)
+
+    @staticmethod
+    def _timed_out(error: Exception, deadline: _Deadline) -> bool:
+        """
+        Returns True if the error was caused by the task's deadline passing, wherever it was waiting.
+        """
+        if isinstance(error, TaskTimeoutError):
+            return True
+        return deadline is not None and deadline.expired
+
+    @staticmethod
+    def _timeout_result(task: dict, deadline: _Deadline) -> dict:
+        message = f"Task '{task.get('name')}' exceeded its deadline of {deadline.timeout:g}s"
+        logger.warning(message)
+        return {"error": message, "timed_out": True}
+
+    def _task_command(self, task: dict) -> list:
+        """
+        Builds the command that runs a task inside a container.
+        
+        :param task: The task to run
+        :return: The command as an argv list (no shell involved)
+        """
+        return ["echo", str(task["params"])]
+
     def _teardown_container(self, container_id: str):
         """
         Teardown (stop and remove) the container after execution.
         
+        Removal is handed to the background reaper, so the caller does not wait for it.
+        
         :param container_id: The ID of the container to remove
         """
+        with self._agents_lock:
+            agent = self._agents.pop(container_id, None)
+            self._agentless.discard(container_id)
+        if agent is not None:
+            agent.close()
+        self.reaper.schedule(container_id)
+        logger.info(f"Container {container_id} scheduled for removal.")
+
+    def _is_container_running(self, container_id: str) -> bool:
+        """
+        Health check used by the pool before reusing an idle container.
+        
+        :param container_id: The ID of the container to check
+        :return: True if the container is still running
+        """
+        return self.transport.is_running(container_id)
+
+    def _reset_container(self, container_id: str):
+        """
+        Cleans up task state inside a container before the pool reuses it.
+        
+        :param container_id: The ID of the container to reset
+        """
+        with metrics.span("container_reset"):
+            self._exec_checked(container_id, self.reset_command)
+
+    def _exec_checked(self, container_id: str, command: list) -> bytes:
+        """
+        Runs a command in the container and returns its stdout, raising on a non-zero exit code.
+        
+        :param container_id: The ID of the container
+        :param command: The command to run (argv list)
+        :return: The command's stdout
+        """
+        result = self._run_command(container_id, command)
+        if result.exit_code != 0:
+            details = result.stderr.decode('utf-8', 'replace').strip()
+            raise ContainerError(container_id, f"Command {command[0]!r} exited with {result.exit_code}: {details}")
+        return result.stdout
+
+    def _run_command(self, container_id: str, command: list, timeout: float = None) -> ExecResult:
+        """
+        Runs a command in the container through its agent when enabled, otherwise with one exec.
+        
+        :param container_id: The ID of the container
+        :param command: The command to run (argv list)
+        :param timeout: Seconds before TaskTimeoutError is raised (None waits forever)
+        :return: An ExecResult with the exit code and captured output
+        """
+        agent = self._get_agent(container_id) if self.use_agent else None
+        if agent is None:
+            return self.transport.exec_command(container_id, command, timeout=timeout)
         try:
-            # Stop and remove the container
-            subprocess.check_output(["docker", "rm", "-f", container_id])
-            logger.info(f"Container {container_id} stopped and removed.")
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Failed to teardown container {container_id}: {str(e)}")
+            return agent.run(command, timeout=timeout)
+        except TaskTimeoutError:
+            raise
+        except ContainerError as e:
+            if agent.served:
+                raise
+            # The agent never answered (e.g., no Python in the image); stop trying in this container
+            logger.warning(f"Task agent unavailable in container {container_id}, falling back to exec: {str(e)}")
+            self._agent_failed(container_id)
+            return self.transport.exec_command(container_id, command, timeout=timeout)
+
+    def _get_agent(self, container_id: str):
+        """
+        Returns the running agent for a container, starting one if needed.
+        
+        :param container_id: The ID of the container
+        :return: A ContainerAgent, or None if it could not be started
+        """
+        with self._agents_lock:
+            if container_id in self._agentless or not self._agent_supported_locked(self.container_image):
+                return None
+            agent = self._agents.get(container_id)
+        if agent is not None and agent.alive:
+            return agent
+        try:
+            agent = ContainerAgent(self.transport, container_id, self.agent_python)
+        except ContainerError as e:
+            logger.warning(f"Failed to start task agent in container {container_id}: {str(e)}")
+            self._agent_failed(container_id)
+            return None
+        with self._agents_lock:
+            self._agents[container_id] = agent
+        return agent
+
+    def _agent_supported_locked(self, image: str) -> bool:
+        return len(self._agent_failures.get(image, ())) < AGENT_IMAGE_FAILURE_LIMIT
+
+    def _agent_failed(self, container_id: str):
+        """
+        Records that the agent could not be used in a container, so later tasks in it use
+        exec directly. Once the agent has failed in AGENT_IMAGE_FAILURE_LIMIT containers of
+        the same image, it is no longer tried for that image.
+
+        :param container_id: The ID of the container
+        """
+        image = self.container_image
+        with self._agents_lock:
+            self._agents.pop(container_id, None)
+            self._agentless.add(container_id)
+            failed = self._agent_failures.setdefault(image, set())
+            failed.add(container_id)
+            disabled = len(failed) == AGENT_IMAGE_FAILURE_LIMIT
+        if disabled:
+            logger.warning(f"Task agent failed in {AGENT_IMAGE_FAILURE_LIMIT} containers of {image}; "
+                           f"running its tasks with exec.")
@@ -0,0 +1,434 @@
+# container_pool.py
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from .errors import ContainerError
+from .logging_config import logger
+
+# Tells a maintenance thread to exit
+_STOP = object()
+
+
+class PooledContainer:
+    """
+    Bookkeeping record for a container owned by a ContainerPool.
+    """
+    def __init__(self, container_id: str, key: tuple):
+        self.container_id = container_id
+        self.key = key
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+        self.uses = 0
+
+
+class ContainerPool:
+    def __init__(self, start_container, teardown_container, health_check=None, reset_container=None,
+                 min_size: int = 0, max_size: int = 4, idle_timeout: float = 300.0,
+                 health_check_interval: float = 30.0, lease_timeout: float = None, max_total: int = None,
+                 reset_workers: int = 2, evict_interval: float = 30.0):
+        """
+        Initializes a pool of pre-started containers, keyed by (image, network) and,
+        when given, the containers' resource limits.
+
+        The pool does not talk to Docker itself; the container lifecycle is delegated
+        to the callables it is given, so it works with any ContainerManager backend.
+
+        :param start_container: Callable (image, network[, resources]) -> container_id that starts a new container
+        :param teardown_container: Callable (container_id) that stops and removes a container
+        :param health_check: Optional callable (container_id) -> bool run before an idle container is leased
+        :param reset_container: Optional callable (container_id) that cleans a container between uses
+        :param min_size: Number of containers per key kept warm even when idle
+        :param max_size: Maximum number of containers (idle + leased) per key
+        :param idle_timeout: Seconds an idle container above min_size is kept before eviction
+        :param health_check_interval: Seconds an idle container may go without a health check
+        :param lease_timeout: Default seconds to wait for a free container when the pool is full (None waits forever)
+        :param max_total: Maximum number of containers over all keys (None: only max_size per key applies).
+                          When it is reached, the least recently used idle container of another key is
+                          evicted to make room.
+        :param reset_workers: Background threads resetting released containers, so release() does
+                              not wait for the reset (0 resets in the caller's thread)
+        :param evict_interval: Seconds between background sweeps for idle containers past idle_timeout
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Container pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        if max_total is not None and max_total < 1:
+            raise ValueError("Container pool max_total must be at least 1")
+
+        self.start_container = start_container
+        self.teardown_container = teardown_container
+        self.health_check = health_check
+        self.reset_container = reset_container
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.lease_timeout = lease_timeout
+        self.max_total = max_total
+        self.reset_workers = reset_workers
+        self.evict_interval = evict_interval
+
+        self._cond = threading.Condition()
+        self._idle = {}     # key -> list of PooledContainer, most recently used last
+        self._leased = {}   # container_id -> PooledContainer
+        self._sizes = {}    # key -> containers owned (idle + leased + starting + resetting)
+        self._closed = False
+        self._resets = queue.Queue()    # released containers waiting for their reset
+        self._pending_resets = 0
+        self._resetting = {}    # key -> containers of the key in _resets
+        self._workers = []
+        self._last_eviction = time.monotonic()
+
+    def lease(self, image: str, network: str, timeout: float = None, resources: tuple = None) -> str:
+        """
+        Leases a container for the given image and network, starting one if none is idle.
+
+        :param image: The container image
+        :param network: The network mode of the container
+        :param timeout: Seconds to wait for a free container when the pool is full
+        :param resources: Optional resource limits; containers are only shared between equal limits
+        :return: The ID of the leased container
+        """
+        key = self._key(image, network, resources)
+        timeout = self.lease_timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            entry = None
+            with self._cond:
+                expired = self._collect_idle_locked()
+                while True:
+                    if self._closed:
+                        raise ContainerError("pool", "Container pool is closed")
+                    idle = self._idle.get(key)
+                    if idle:
+                        entry = idle.pop()
+                        self._leased[entry.container_id] = entry
+                        break
+                    # A container being reset is available within milliseconds; starting one takes far longer
+                    if (not self._resetting.get(key) and self._sizes.get(key, 0) < self.max_size
+                            and self._make_room_locked(key, expired)):
+                        self._sizes[key] = self._sizes.get(key, 0) + 1
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise ContainerError("pool", f"Timed out waiting for a container for image '{image}'")
+                    self._cond.wait(remaining)
+
+            self._teardown_all(expired)
+
+            if entry is None:
+                return self._start(key)
+
+            if self._needs_health_check(entry) and not self._is_healthy(entry):
+                logger.warning(f"Pooled container {entry.container_id} failed its health check; replacing it.")
+                self._destroy(entry)
+                continue
+
+            return entry.container_id
+
+    def release(self, container_id: str, healthy: bool = True, reset: bool = True):
+        """
+        Returns a leased container to the pool.
+
+        The container is reset before it becomes available again; with reset_workers, the
+        reset runs on a background thread and this returns at once. Unhealthy containers,
+        containers that fail to reset and containers returned after close() are removed.
+
+        :param container_id: The ID of the container to return
+        :param healthy: False if the task left the container in an unknown state
+        :param reset: False if the caller has already reset the container
+        """
+        with self._cond:
+            entry = self._leased.pop(container_id, None)
+            if entry is None:
+                logger.warning(f"Container {container_id} is not leased from this pool.")
+                return
+            entry.uses += 1
+            if not self._closed:
+                self._start_workers_locked()
+            # A container returned after close() is removed without a reset
+            needs_reset = healthy and reset and self.reset_container is not None and not self._closed
+            if needs_reset and self.reset_workers:
+                self._pending_resets += 1
+                self._resetting[entry.key] = self._resetting.get(entry.key, 0) + 1
+                self._resets.put(entry)
+                return
+        self._return(entry, healthy, needs_reset)
+
+    def relocate(self, container_id: str, resources: tuple):
+        """
+        Files a leased container under other resource limits, e.g. the Placement of the
+        host it was actually started on, so it is reused for requests of that key.
+
+        :param container_id: The ID of the leased container
+        :param resources: The container's actual resource limits
+        """
+        with self._cond:
+            entry = self._leased.get(container_id)
+            if entry is None:
+                return
+            key = self._key(entry.key[0], entry.key[1], resources)
+            if key == entry.key:
+                return
+            self._sizes[entry.key] -= 1
+            self._sizes[key] = self._sizes.get(key, 0) + 1
+            entry.key = key
+            self._cond.notify_all()
+
+    def wait_for_resets(self, timeout: float = None) -> bool:
+        """
+        Waits until every container handed to the background reset is back in the pool or removed.
+
+        :param timeout: Seconds to wait (None waits forever)
+        :return: True if no reset is pending
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending_resets == 0, timeout)
+
+    def _return(self, entry: PooledContainer, healthy: bool, reset: bool):
+        """
+        Resets a released container if asked to, then makes it idle or removes it.
+        """
+        if reset:
+            try:
+                self.reset_container(entry.container_id)
+            except Exception as e:
+                logger.warning(f"Failed to reset pooled container {entry.container_id}: {str(e)}")
+                healthy = False
+
+        with self._cond:
+            if healthy and not self._closed:
+                entry.last_used = time.monotonic()
+                self._idle.setdefault(entry.key, []).append(entry)
+                # Waiters for other keys may evict it to stay under max_total
+                self._cond.notify_all()
+                return
+
+        self._destroy(entry)
+
+    @contextmanager
+    def leased(self, image: str, network: str, timeout: float = None, resources: tuple = None):
+        """
+        Context manager that leases a container and returns it on exit.
+
+        The container is discarded instead of reused if the block raises.
+
+        :param image: The container image
+        :param network: The network mode of the container
+        :param timeout: Seconds to wait for a free container when the pool is full
+        :param resources: Optional resource limits of the container
+        """
+        container_id = self.lease(image, network, timeout, resources)
+        healthy = False
+        try:
+            yield container_id
+            healthy = True
+        finally:
+            self.release(container_id, healthy=healthy)
+
+    def prewarm(self, image: str, network: str, count: int = None, resources: tuple = None):
+        """
+        Starts containers for the given key until it holds `count` (default: min_size) containers.
+
+        :param image: The container image
+        :param network: The network mode of the container
+        :param count: Target number of containers for the key
+        :param resources: Optional resource limits of the containers
+        """
+        key = self._key(image, network, resources)
+        target = min(self.min_size if count is None else count, self.max_size)
+        while True:
+            with self._cond:
+                if self._closed or self._sizes.get(key, 0) >= target or not self._below_total_locked():
+                    return
+                self._sizes[key] = self._sizes.get(key, 0) + 1
+            container_id = self._start(key)
+            self.release(container_id)
+
+    def evict_idle(self) -> int:
+        """
+        Removes containers that have been idle longer than idle_timeout, keeping min_size per key.
+
+        :return: The number of containers evicted
+        """
+        with self._cond:
+            expired = self._collect_idle_locked()
+        self._teardown_all(expired)
+        return len(expired)
+
+    def close(self, timeout: float = 30.0):
+        """
+        Removes all idle containers and stops handing out new leases.
+
+        Containers still being reset are removed by the maintenance threads, which close()
+        waits for; containers that are still leased are removed when they come back.
+
+        :param timeout: Seconds to wait for the maintenance threads to finish
+        """
+        with self._cond:
+            self._closed = True
+            entries = [entry for idle in self._idle.values() for entry in idle]
+            self._idle.clear()
+            for entry in entries:
+                self._sizes[entry.key] -= 1
+            workers, self._workers = self._workers, []
+            self._cond.notify_all()
+        for _ in workers:
+            self._resets.put(_STOP)
+        for entry in entries:
+            self._teardown(entry.container_id)
+        # Pending resets are queued ahead of the stop markers, so joining waits for their teardown
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            if worker is not threading.current_thread():
+                worker.join(max(0.0, deadline - time.monotonic()))
+        if any(worker.is_alive() for worker in workers):
+            logger.warning(f"Container pool maintenance threads did not stop within {timeout} seconds.")
+
+    def stats(self) -> dict:
+        """
+        Returns the number of idle and leased containers per pool key.
+
+        :return: A dictionary mapping each key to its idle, leased and total counts
+        """
+        with self._cond:
+            leased = {}
+            for entry in self._leased.values():
+                leased[entry.key] = leased.get(entry.key, 0) + 1
+            return {
+                key: {
+                    "idle": len(self._idle.get(key, [])),
+                    "leased": leased.get(key, 0),
+                    "total": total,
+                }
+                for key, total in self._sizes.items()
+            }
+
+    @staticmethod
+    def _key(image: str, network: str, resources: tuple = None) -> tuple:
+        return (image, network) if resources is None else (image, network, resources)
+
+    def _start_workers_locked(self):
+        """
+        Starts the maintenance threads on first use: they reset released containers and
+        evict idle ones every evict_interval, even while no lease comes in.
+        """
+        if self._workers:
+            return
+        for index in range(max(1, self.reset_workers)):
+            worker = threading.Thread(target=self._maintain, name=f"sudo-pool-maintenance-{index}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _maintain(self):
+        while True:
+            try:
+                entry = self._resets.get(timeout=self.evict_interval)
+            except queue.Empty:
+                entry = None
+            if entry is _STOP:
+                return
+            if entry is not None:
+                try:
+                    self._return(entry, True, True)
+                finally:
+                    with self._cond:
+                        self._pending_resets -= 1
+                        self._resetting[entry.key] -= 1
+                        self._cond.notify_all()
+            with self._cond:
+                due = time.monotonic() - self._last_eviction >= self.evict_interval
+                if due:
+                    self._last_eviction = time.monotonic()
+            if due:
+                self.evict_idle()
+
+    def _below_total_locked(self) -> bool:
+        return self.max_total is None or sum(self._sizes.values()) < self.max_total
+
+    def _make_room_locked(self, key: tuple, evicted: list) -> bool:
+        """
+        Checks that one more container fits under max_total, evicting the least recently
+        used idle container of another key if not. Evicted containers are appended to
+        `evicted` for the caller to tear down after releasing the lock.
+        """
+        if self._below_total_locked():
+            return True
+        candidates = [idle[0] for other, idle in self._idle.items() if other != key and idle]
+        if not candidates:
+            return False
+        entry = min(candidates, key=lambda candidate: candidate.last_used)
+        self._idle[entry.key].pop(0)
+        self._sizes[entry.key] -= 1
+        evicted.append(entry)
+        return True
+
+    def _start(self, key: tuple) -> str:
+        """
+        Starts a container for a slot that has already been reserved in _sizes.
+        """
+        try:
+            container_id = self.start_container(*key)
+        except Exception:
+            with self._cond:
+                self._sizes[key] -= 1
+                self._cond.notify_all()
+            raise
+        entry = PooledContainer(container_id, key)
+        with self._cond:
+            self._leased[container_id] = entry
+        return container_id
+
+    def _needs_health_check(self, entry: PooledContainer) -> bool:
+        if self.health_check is None:
+            return False
+        return time.monotonic() - entry.last_checked >= self.health_check_interval
+
+    def _is_healthy(self, entry: PooledContainer) -> bool:
+        try:
+            healthy = bool(self.health_check(entry.container_id))
+        except Exception as e:
+            logger.warning(f"Health check failed for container {entry.container_id}: {str(e)}")
+            healthy = False
+        entry.last_checked = time.monotonic()
+        return healthy
+
+    def _destroy(self, entry: PooledContainer):
+        with self._cond:
+            self._leased.pop(entry.container_id, None)
+            self._sizes[entry.key] -= 1
+            self._cond.notify_all()
+        self._teardown(entry.container_id)
+
+    def _collect_idle_locked(self) -> list:
+        """
+        Detaches idle containers past idle_timeout. Must be called with the lock held;
+        the returned containers are torn down by the caller after releasing it.
+        """
+        now = time.monotonic()
+        expired = []
+        for key, idle in self._idle.items():
+            surplus = self._sizes.get(key, 0) - self.min_size
+            # Oldest containers sit at the front of the list
+            while surplus > 0 and idle and now - idle[0].last_used >= self.idle_timeout:
+                entry = idle.pop(0)
+                self._sizes[key] -= 1
+                surplus -= 1
+                expired.append(entry)
+        if expired:
+            self._cond.notify_all()
+        return expired
+
+    def _teardown_all(self, entries: list):
+        for entry in entries:
+            logger.info(f"Evicting idle container {entry.container_id}.")
+            self._teardown(entry.container_id)
+
+    def _teardown(self, container_id: str):
+        try:
+            self.teardown_container(container_id)
+        except Exception as e:
+            logger.error(f"Failed to remove pooled container {container_id}: {str(e)}")
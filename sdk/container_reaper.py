@@ -0,0 +1,295 @@
+# container_reaper.py
+
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+from .errors import ContainerError
+from .logging_config import logger
+from .metrics import metrics
+
+# Labels put on every container the SDK starts, used to find orphans after a crash
+MANAGED_LABEL = "sudo-sdk.managed"
+OWNER_LABEL = "sudo-sdk.owner"
+
+# Several reapers can run in one process (one per ContainerManager); each gets its own state file
+_instance_ids = itertools.count(1)
+# State directories already swept by a reaper of this process
+_swept_dirs = set()
+_swept_lock = threading.Lock()
+
+
+def default_owner() -> str:
+    """
+    Returns the owner ID of this process ('<hostname>:<pid>').
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_is_dead(owner: str) -> bool:
+    """
+    Returns True if the owner is a process on this host that is no longer running.
+    Owners on other hosts are never considered dead.
+
+    :param owner: An owner ID as returned by default_owner()
+    """
+    hostname, _, pid = owner.rpartition(":")
+    if hostname != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+class ContainerReaper:
+    def __init__(self, transport, state_dir: str = None, owner: str = None,
+                 batch_size: int = 20, max_attempts: int = 5, retry_interval: float = 5.0):
+        """
+        Removes containers on a background thread so teardown never blocks a task.
+
+        Pending removals are persisted to `state_dir` so that a crash does not leak
+        the containers that were waiting to be removed.
+
+        :param transport: The DockerTransport used to list and remove containers
+        :param state_dir: Directory for the pending-removal files (None disables persistence)
+        :param owner: Owner ID written to container labels and state files (default: this process)
+        :param batch_size: Maximum number of containers removed per Docker call
+        :param max_attempts: Removal attempts before a container is given up on
+        :param retry_interval: Seconds to wait before retrying a failed removal
+        """
+        self.transport = transport
+        self.state_dir = state_dir
+        self.owner = owner or default_owner()
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_interval = retry_interval
+        self.instance = next(_instance_ids)
+
+        self._cond = threading.Condition()
+        self._pending = {}      # container_id -> (attempts, not_before)
+        self._in_progress = set()
+        self._thread = None
+        self._stopping = False
+
+    @property
+    def labels(self) -> dict:
+        """
+        Labels to attach to containers started on behalf of this reaper's owner.
+        """
+        return {MANAGED_LABEL: "true", OWNER_LABEL: self.owner}
+
+    @property
+    def state_file(self) -> str:
+        if not self.state_dir:
+            return None
+        name = f"pending-{self.owner.replace(':', '-')}-{self.instance}.json"
+        return os.path.join(self.state_dir, name)
+
+    def start(self, sweep: bool = True):
+        """
+        Starts the background thread.
+
+        :param sweep: Also schedule orphaned containers left by dead SDK processes on this host.
+                      Only the first reaper started in a process sweeps a given state directory.
+        """
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="sudo-container-reaper", daemon=True)
+            self._thread.start()
+        if sweep and self._claim_sweep():
+            threading.Thread(target=self.sweep_orphans, name="sudo-container-sweep", daemon=True).start()
+
+    def _claim_sweep(self) -> bool:
+        key = os.path.abspath(self.state_dir) if self.state_dir else None
+        with _swept_lock:
+            if key in _swept_dirs:
+                return False
+            _swept_dirs.add(key)
+            return True
+
+    def schedule(self, container_id: str):
+        """
+        Queues a container for removal and returns immediately.
+
+        :param container_id: The ID of the container to remove
+        """
+        with self._cond:
+            if container_id in self._pending or container_id in self._in_progress:
+                return
+            self._pending[container_id] = (0, 0.0)
+            self._persist_locked()
+            self._cond.notify()
+        if self._thread is None:
+            # Not started (e.g., used synchronously); remove right away
+            self._reap_once()
+
+    def pending(self) -> int:
+        """
+        Returns the number of containers waiting to be removed.
+        """
+        with self._cond:
+            return len(self._pending) + len(self._in_progress)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Waits until every scheduled container has been removed or given up on.
+
+        :param timeout: Seconds to wait (None waits forever)
+        :return: True if nothing is pending anymore
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if self._thread is None:
+            while self.pending() and (deadline is None or time.monotonic() < deadline):
+                with self._cond:
+                    for container_id in self._pending:
+                        self._pending[container_id] = (self._pending[container_id][0], 0.0)
+                self._reap_once()
+            return not self.pending()
+
+        with self._cond:
+            for container_id in self._pending:
+                self._pending[container_id] = (self._pending[container_id][0], 0.0)
+            self._cond.notify_all()
+            while self._pending or self._in_progress:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def sweep_orphans(self) -> int:
+        """
+        Schedules containers left behind by SDK processes on this host that are no longer running.
+
+        Two sources are used: pending-removal files written by dead processes, and
+        running containers whose owner label points at a dead process.
+
+        :return: The number of containers scheduled
+        """
+        orphans = set()
+        if self.state_dir and os.path.isdir(self.state_dir):
+            for name in os.listdir(self.state_dir):
+                if not (name.startswith("pending-") and name.endswith(".json")):
+                    continue
+                path = os.path.join(self.state_dir, name)
+                if path == self.state_file:
+                    continue
+                try:
+                    with open(path, 'r') as f:
+                        state = json.load(f)
+                    if not owner_is_dead(state.get("owner", "")):
+                        continue
+                    orphans.update(state.get("containers", []))
+                    os.remove(path)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Failed to read pending removals from {path}: {str(e)}")
+
+        try:
+            for container_id, labels in self.transport.list_containers({MANAGED_LABEL: "true"}):
+                if owner_is_dead(labels.get(OWNER_LABEL, "")):
+                    orphans.add(container_id)
+        except ContainerError as e:
+            logger.warning(f"Failed to list SDK containers for the orphan sweep: {str(e)}")
+
+        for container_id in orphans:
+            self.schedule(container_id)
+        if orphans:
+            logger.info(f"Scheduled {len(orphans)} orphaned containers for removal.")
+        return len(orphans)
+
+    def close(self, timeout: float = 30.0):
+        """
+        Removes whatever is still pending and stops the background thread.
+
+        :param timeout: Seconds to wait for pending removals
+        """
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            thread, self._thread = self._thread, None
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping and not self._due_locked():
+                    self._cond.wait(self._next_wakeup_locked())
+                if self._stopping:
+                    return
+            self._reap_once()
+
+    def _due_locked(self) -> list:
+        now = time.monotonic()
+        return [cid for cid, (_, not_before) in self._pending.items() if not_before <= now]
+
+    def _next_wakeup_locked(self):
+        if not self._pending:
+            return None
+        return max(0.0, min(not_before for _, not_before in self._pending.values()) - time.monotonic())
+
+    def _reap_once(self):
+        with self._cond:
+            batch = self._due_locked()[:self.batch_size]
+            attempts = {cid: self._pending.pop(cid)[0] for cid in batch}
+            self._in_progress.update(batch)
+        if not batch:
+            return
+
+        failed = {}
+        try:
+            with metrics.span("container_teardown"):
+                self.transport.remove_containers(batch)
+        except ContainerError:
+            # Fall back to one call per container to find out which ones failed
+            for container_id in batch:
+                try:
+                    self.transport.remove_container(container_id)
+                except ContainerError as e:
+                    if "no such container" in str(e).lower():
+                        continue
+                    failed[container_id] = str(e)
+
+        with self._cond:
+            self._in_progress.difference_update(batch)
+            for container_id, error in failed.items():
+                attempt = attempts[container_id] + 1
+                if attempt >= self.max_attempts:
+                    logger.error(f"Giving up on removing container {container_id}: {error}")
+                    continue
+                self._pending[container_id] = (attempt, time.monotonic() + self.retry_interval)
+            self._persist_locked()
+            self._cond.notify_all()
+        removed = len(batch) - len(failed)
+        if removed:
+            logger.info(f"Removed {removed} containers.")
+
+    def _persist_locked(self):
+        """
+        Writes the pending removals to the state file (atomically) or deletes it when empty.
+        """
+        path = self.state_file
+        if path is None:
+            return
+        containers = sorted(set(self._pending) | self._in_progress)
+        try:
+            if not containers:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            os.makedirs(self.state_dir, exist_ok=True)
+            temp_path = path + ".tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({"owner": self.owner, "containers": containers}, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to persist pending container removals to {path}: {str(e)}")
@@ -0,0 +1,103 @@
+# decision_cache.py
+
+import threading
+from collections import OrderedDict
+
+
+class DecisionCache:
+    def __init__(self, max_entries: int = 4096):
+        """
+        Bounded cache of policy decisions, scoped to one policy snapshot.
+
+        Entries are stored with the version of the snapshot that produced them. The first
+        write from a newer snapshot replaces every entry, and lookups from any other version
+        miss, so a reload can never serve a decision made under the old policies.
+
+        Lookups take no lock: the version and its entries are swapped as one tuple and read
+        with a plain dict lookup. A hit then marks the entry as recently used if the lock is
+        free; under contention the refresh is skipped rather than waited for. Writes are
+        serialized, and once the cache is full they evict the least recently used entries.
+        The counters are updated without a lock, so under heavy concurrency stats() is
+        approximate.
+
+        :param max_entries: Maximum number of decisions kept
+        """
+        self.max_entries = max_entries
+        self._state = (None, OrderedDict())   # (snapshot version, key -> decision), least recently used first
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def version(self):
+        return self._state[0]
+
+    def get(self, version: int, key):
+        """
+        :return: The cached decision (True, or the name of the parameter that denied the
+                 request), or None on a miss
+        """
+        cached_version, entries = self._state
+        decision = entries.get(key) if version == cached_version else None
+        if decision is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        if self._lock.acquire(blocking=False):
+            try:
+                entries.move_to_end(key)
+            except KeyError:
+                # Evicted since the read
+                pass
+            finally:
+                self._lock.release()
+        return decision
+
+    def put(self, version: int, key, decision):
+        """
+        Stores a decision made under snapshot `version`. Decisions from a snapshot older
+        than the cached one are discarded.
+
+        :param decision: True if the request is allowed, otherwise the restricted parameter that denied it
+        """
+        with self._lock:
+            cached_version, entries = self._state
+            if version != cached_version:
+                if cached_version is not None:
+                    if version < cached_version:
+                        return
+                    self._invalidations += 1
+                entries = OrderedDict()
+                self._state = (version, entries)
+            entries[key] = decision
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._state = (self._state[0], OrderedDict())
+
+    def stats(self) -> dict:
+        """
+        Returns hits, misses, hit ratio, evictions, invalidations and the current size.
+        """
+        version, entries = self._state
+        hits, misses = self._hits, self._misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+            "entries": len(entries),
+            "max_entries": self.max_entries,
+            "version": version,
+        }
+
+    def __len__(self):
+        return len(self._state[1])
@@ -0,0 +1,795 @@
+# docker_transport.py
+
+import asyncio
+import functools
+import os
+import selectors
+import socket
+import struct
+import subprocess
+import time
+from collections import namedtuple
+from .async_docker import AsyncEngineClient
+from .errors import ContainerError, TaskTimeoutError
+from .logging_config import logger
+
+try:
+    import docker
+except ImportError:  # pragma: no cover - docker is optional, the CLI backend still works without it
+    docker = None
+
+DEFAULT_DOCKER_HOST = "unix:///var/run/docker.sock"
+
+# Output of a finished exec; stdout and stderr are raw bytes
+ExecResult = namedtuple("ExecResult", ["exit_code", "stdout", "stderr"])
+
+# A piece of exec output as it arrives; stream is 'stdout' or 'stderr'
+OutputChunk = namedtuple("OutputChunk", ["stream", "data"])
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class ExecStream:
+    """
+    Iterator over the OutputChunks of a running exec.
+
+    exit_code is set once the output is exhausted. Closing the stream early
+    stops the exec on the host side and marks it as incomplete.
+    """
+    def __init__(self, chunks, get_exit_code, cancel=None, on_close=None):
+        """
+        :param chunks: Iterator of OutputChunk produced by the transport
+        :param get_exit_code: Callable returning the exit code once the output is exhausted
+        :param cancel: Optional callable that stops the exec if the stream is closed early
+        :param on_close: Optional callable (completed: bool) invoked exactly once when the stream closes
+        """
+        self._chunks = iter(chunks)
+        self._get_exit_code = get_exit_code
+        self._cancel = cancel
+        self.on_close = on_close
+        self.exit_code = None
+        self.completed = False
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> OutputChunk:
+        if self.closed:
+            raise StopIteration
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self.exit_code = self._get_exit_code()
+            self.completed = True
+            self.close()
+            raise
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Stops the exec if it is still running and releases the stream.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if not self.completed and self._cancel is not None:
+                self._cancel()
+        finally:
+            if self.on_close is not None:
+                self.on_close(self.completed)
+
+    def read_all(self) -> ExecResult:
+        """
+        Consumes the remaining output and returns it as an ExecResult.
+        """
+        stdout, stderr = [], []
+        for chunk in self:
+            (stdout if chunk.stream == "stdout" else stderr).append(chunk.data)
+        return ExecResult(self.exit_code, b"".join(stdout), b"".join(stderr))
+
+
+class ExecChannel:
+    """
+    Bidirectional byte channel to a process running inside a container:
+    writes go to its stdin and reads come from its stdout.
+    """
+    closed = False
+
+    def send(self, data: bytes):
+        raise NotImplementedError
+
+    def recv_exactly(self, size: int) -> bytes:
+        """
+        Reads exactly `size` bytes of stdout, raising EOFError if the process exits first.
+        """
+        raise NotImplementedError
+
+    def abort(self):
+        """
+        Stops the process at once. Safe to call from another thread while a read is blocked;
+        the blocked read then fails and the owner closes the channel.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class PipeChannel(ExecChannel):
+    """
+    ExecChannel over the pipes of a local `docker exec -i` process.
+    """
+    def __init__(self, process: subprocess.Popen):
+        self.process = process
+
+    def send(self, data: bytes):
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def recv_exactly(self, size: int) -> bytes:
+        data = self.process.stdout.read(size)
+        if len(data) < size:
+            raise EOFError("Process closed its output")
+        return data
+
+    def abort(self):
+        try:
+            self.process.kill()
+        except OSError:
+            pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class SocketChannel(ExecChannel):
+    """
+    ExecChannel over a hijacked Engine API exec socket. Output arrives in the
+    Engine's multiplexed format (8-byte header per frame); stderr frames are dropped.
+    """
+    def __init__(self, sock):
+        self.sock = sock
+        self._buffer = bytearray()
+
+    def send(self, data: bytes):
+        self.sock.sendall(data)
+
+    def recv_exactly(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            stream_id, length = struct.unpack('>BxxxL', self._read_raw(8))
+            payload = self._read_raw(length)
+            if stream_id == 1:
+                self._buffer += payload
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def _read_raw(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise EOFError("Exec socket closed")
+            data += chunk
+        return data
+
+    def abort(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.sock.close()
+
+
+class DockerTransport:
+    """
+    Interface used by ContainerManager to talk to a Docker daemon.
+    """
+    name = "base"
+
+    def ping(self) -> bool:
+        """
+        Returns True if the daemon is reachable.
+        """
+        raise NotImplementedError
+
+    def run_container(self, image: str, network: str, command: list, labels: dict = None,
+                      cpus: float = None, memory_mb: int = None) -> str:
+        """
+        Creates and starts a detached container.
+
+        :param image: The container image
+        :param network: The network mode for the container
+        :param command: The command the container runs
+        :param labels: Optional labels to attach to the container
+        :param cpus: Optional CPU limit (cores) enforced through the container's cgroup
+        :param memory_mb: Optional memory limit (MiB) enforced through the container's cgroup
+        :return: The container ID
+        """
+        raise NotImplementedError
+
+    def exec_command(self, container_id: str, command: list, timeout: float = None) -> ExecResult:
+        """
+        Runs a command inside a running container and waits for it to finish.
+
+        :param container_id: The ID of the container
+        :param command: The command to run (argv list)
+        :param timeout: Seconds to wait before giving up with TaskTimeoutError (None waits forever).
+                        The command may keep running inside the container; callers discard it.
+        :return: An ExecResult with the exit code and captured output
+        """
+        raise NotImplementedError
+
+    async def exec_command_async(self, container_id: str, command: list, timeout: float = None) -> ExecResult:
+        """
+        Async counterpart of exec_command. Transports without native async I/O
+        run the blocking call in the event loop's default executor.
+
+        :param container_id: The ID of the container
+        :param command: The command to run (argv list)
+        :param timeout: Seconds to wait before giving up with TaskTimeoutError (None waits forever)
+        :return: An ExecResult with the exit code and captured output
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self.exec_command, container_id, command, timeout=timeout)
+        )
+
+    def exec_stream(self, container_id: str, command: list) -> ExecStream:
+        """
+        Starts a command inside a running container with stdout/stderr attached.
+
+        :param container_id: The ID of the container
+        :param command: The command to run (argv list)
+        :return: An ExecStream yielding output chunks as they arrive
+        """
+        raise NotImplementedError
+
+    def open_channel(self, container_id: str, command: list) -> ExecChannel:
+        """
+        Starts a long-lived command inside a container with stdin and stdout attached.
+
+        :param container_id: The ID of the container
+        :param command: The command to run (argv list)
+        :return: An ExecChannel connected to the command
+        """
+        raise NotImplementedError
+
+    def put_archive(self, container_id: str, path: str, chunks):
+        """
+        Extracts a tar archive into a directory of the container, streaming it from `chunks`.
+
+        :param container_id: The ID of the container
+        :param path: Existing directory in the container to extract into
+        :param chunks: Iterable of bytes chunks forming a tar archive
+        """
+        raise NotImplementedError
+
+    def get_archive(self, container_id: str, path: str):
+        """
+        Streams a file or directory of the container as a tar archive.
+
+        :param container_id: The ID of the container
+        :param path: Path in the container
+        :return: An iterator of bytes chunks forming a tar archive
+        """
+        raise NotImplementedError
+
+    def is_running(self, container_id: str) -> bool:
+        """
+        Returns True if the container exists and is running.
+
+        :param container_id: The ID of the container
+        """
+        raise NotImplementedError
+
+    def remove_container(self, container_id: str):
+        """
+        Force-removes a container.
+
+        :param container_id: The ID of the container
+        """
+        raise NotImplementedError
+
+    def remove_containers(self, container_ids: list):
+        """
+        Force-removes several containers, raising ContainerError if any removal fails.
+
+        :param container_ids: The IDs of the containers
+        """
+        errors = []
+        for container_id in container_ids:
+            try:
+                self.remove_container(container_id)
+            except ContainerError as e:
+                errors.append(e.error_details)
+        if errors:
+            raise ContainerError(",".join(container_ids), "; ".join(errors))
+
+    def list_containers(self, labels: dict) -> list:
+        """
+        Lists containers (running or not) carrying all of the given labels.
+
+        :param labels: Label names and values to filter on
+        :return: A list of (container_id, labels) tuples
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Releases any resources (connections, sessions) held by the transport.
+        """
+
+
+class CLITransport(DockerTransport):
+    """
+    Transport that forks the docker CLI for every operation. Used as a fallback
+    when the Engine API is not reachable or the docker package is not installed.
+    """
+    name = "cli"
+
+    def __init__(self, docker_binary: str = "docker", docker_host: str = None):
+        """
+        :param docker_binary: Path or name of the docker CLI
+        :param docker_host: Optional daemon URL passed with -H (default: the CLI's own configuration)
+        """
+        self.base_command = [docker_binary]
+        if docker_host:
+            self.base_command += ["-H", docker_host]
+
+    def ping(self) -> bool:
+        try:
+            command = self.base_command + ["version", "--format", "{{.Server.Version}}"]
+            subprocess.check_output(command, stderr=subprocess.DEVNULL)
+            return True
+        except (OSError, subprocess.CalledProcessError):
+            return False
+
+    def run_container(self, image: str, network: str, command: list, labels: dict = None,
+                      cpus: float = None, memory_mb: int = None) -> str:
+        try:
+            args = ["run", "-d", "--network", network]
+            for name, value in (labels or {}).items():
+                args += ["--label", f"{name}={value}"]
+            if cpus:
+                args += ["--cpus", str(cpus)]
+            if memory_mb:
+                args += ["--memory", f"{memory_mb}m"]
+            args += [image] + list(command)
+            return subprocess.check_output(self.base_command + args).decode('utf-8').strip()
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise ContainerError(image, f"Failed to start container: {str(e)}")
+
+    def exec_command(self, container_id: str, command: list, timeout: float = None) -> ExecResult:
+        try:
+            completed = subprocess.run(
+                self.base_command + ["exec", container_id] + list(command),
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            raise TaskTimeoutError(container_id, timeout)
+        except OSError as e:
+            raise ContainerError(container_id, f"Failed to exec in container: {str(e)}")
+        return ExecResult(completed.returncode, completed.stdout, completed.stderr)
+
+    async def exec_command_async(self, container_id: str, command: list, timeout: float = None) -> ExecResult:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *(self.base_command + ["exec", container_id] + list(command)),
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+        except OSError as e:
+            raise ContainerError(container_id, f"Failed to exec in container: {str(e)}")
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise TaskTimeoutError(container_id, timeout)
+        except asyncio.CancelledError:
+            process.kill()
+            raise
+        return ExecResult(process.returncode, stdout, stderr)
+
+    def exec_stream(self, container_id: str, command: list) -> ExecStream:
+        try:
+            process = subprocess.Popen(
+                self.base_command + ["exec", container_id] + list(command),
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+        except OSError as e:
+            raise ContainerError(container_id, f"Failed to exec in container: {str(e)}")
+
+        def cancel():
+            process.kill()
+            process.wait()
+            process.stdout.close()
+            process.stderr.close()
+
+        return ExecStream(self._read_pipes(process), process.wait, cancel=cancel)
+
+    @staticmethod
+    def _read_pipes(process):
+        """
+        Yields output from both pipes of the process as soon as either has data.
+        """
+        names = {process.stdout: "stdout", process.stderr: "stderr"}
+        with selectors.DefaultSelector() as selector:
+            for pipe in names:
+                selector.register(pipe, selectors.EVENT_READ)
+            while selector.get_map():
+                for key, _ in selector.select():
+                    data = os.read(key.fileobj.fileno(), READ_CHUNK_SIZE)
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+                        continue
+                    yield OutputChunk(names[key.fileobj], data)
+
+    def open_channel(self, container_id: str, command: list) -> ExecChannel:
+        try:
+            process = subprocess.Popen(
+                self.base_command + ["exec", "-i", container_id] + list(command),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+        except OSError as e:
+            raise ContainerError(container_id, f"Failed to attach to container: {str(e)}")
+        return PipeChannel(process)
+
+    def put_archive(self, container_id: str, path: str, chunks):
+        try:
+            process = subprocess.Popen(
+                self.base_command + ["cp", "-", f"{container_id}:{path}"],
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+        except OSError as e:
+            raise ContainerError(container_id, f"Failed to copy files into container: {str(e)}")
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+            process.stdin.close()
+        except BrokenPipeError:
+            pass  # docker cp exited early; its exit status and stderr say why
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        stderr = process.stderr.read()
+        process.stderr.close()
+        if process.wait() != 0:
+            details = stderr.decode('utf-8', 'replace').strip()
+            raise ContainerError(container_id, f"Failed to copy files into container: {details}")
+
+    def get_archive(self, container_id: str, path: str):
+        try:
+            process = subprocess.Popen(
+                self.base_command + ["cp", f"{container_id}:{path}", "-"],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+        except OSError as e:
+            raise ContainerError(container_id, f"Failed to copy files from container: {str(e)}")
+
+        def chunks():
+            try:
+                while True:
+                    data = process.stdout.read(READ_CHUNK_SIZE)
+                    if not data:
+                        break
+                    yield data
+                stderr = process.stderr.read()
+                if process.wait() != 0:
+                    details = stderr.decode('utf-8', 'replace').strip()
+                    raise ContainerError(container_id, f"Failed to copy files from container: {details}")
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                process.stdout.close()
+                process.stderr.close()
+
+        return chunks()
+
+    def is_running(self, container_id: str) -> bool:
+        try:
+            command = self.base_command + ["inspect", "-f", "{{.State.Running}}", container_id]
+            return subprocess.check_output(command, stderr=subprocess.DEVNULL).decode('utf-8').strip() == "true"
+        except (OSError, subprocess.CalledProcessError):
+            return False
+
+    def remove_container(self, container_id: str):
+        try:
+            subprocess.check_output(self.base_command + ["rm", "-f", container_id], stderr=subprocess.PIPE)
+        except subprocess.CalledProcessError as e:
+            details = (e.stderr or b"").decode('utf-8', 'replace').strip() or str(e)
+            raise ContainerError(container_id, f"Failed to remove container: {details}")
+        except OSError as e:
+            raise ContainerError(container_id, f"Failed to remove container: {str(e)}")
+
+    def remove_containers(self, container_ids: list):
+        try:
+            subprocess.check_output(self.base_command + ["rm", "-f"] + list(container_ids), stderr=subprocess.PIPE)
+        except subprocess.CalledProcessError as e:
+            details = (e.stderr or b"").decode('utf-8', 'replace').strip() or str(e)
+            raise ContainerError(",".join(container_ids), f"Failed to remove containers: {details}")
+        except OSError as e:
+            raise ContainerError(",".join(container_ids), f"Failed to remove containers: {str(e)}")
+
+    def list_containers(self, labels: dict) -> list:
+        command = self.base_command + ["ps", "-a", "--no-trunc", "--format", "{{.ID}}\t{{.Labels}}"]
+        for name, value in labels.items():
+            command += ["--filter", f"label={name}={value}"]
+        try:
+            output = subprocess.check_output(command).decode('utf-8')
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise ContainerError("list", f"Failed to list containers: {str(e)}")
+        containers = []
+        for line in output.splitlines():
+            container_id, _, label_text = line.partition("\t")
+            parsed = dict(item.partition("=")[::2] for item in label_text.split(",") if item)
+            containers.append((container_id, parsed))
+        return containers
+
+
+class EngineAPITransport(DockerTransport):
+    """
+    Transport that talks to the Docker Engine API directly. The underlying
+    docker.APIClient keeps a pool of persistent HTTP connections to the daemon,
+    so no process is spawned per operation.
+    """
+    name = "api"
+
+    def __init__(self, base_url: str = DEFAULT_DOCKER_HOST, max_pool_size: int = 10, timeout: int = 60):
+        """
+        :param base_url: Daemon URL (e.g., 'unix:///var/run/docker.sock' or 'tcp://host:2375')
+        :param max_pool_size: Maximum number of keep-alive connections to the daemon
+        :param timeout: Request timeout in seconds
+        """
+        if docker is None:
+            raise ContainerError("transport", "The 'docker' package is required for the Engine API backend")
+        try:
+            self.client = docker.APIClient(base_url=base_url, max_pool_size=max_pool_size, timeout=timeout)
+        except Exception as e:
+            raise ContainerError("transport", f"Failed to connect to Docker Engine at {base_url}: {str(e)}")
+        self.base_url = base_url
+        self.max_pool_size = max_pool_size
+        self.timeout = timeout
+        self._async_client = None
+        self._async_loop = None
+
+    def ping(self) -> bool:
+        try:
+            return bool(self.client.ping())
+        except Exception:
+            return False
+
+    def run_container(self, image: str, network: str, command: list, labels: dict = None,
+                      cpus: float = None, memory_mb: int = None) -> str:
+        try:
+            host_config = self.client.create_host_config(
+                network_mode=network,
+                nano_cpus=int(cpus * 1e9) if cpus else None,
+                mem_limit=f"{memory_mb}m" if memory_mb else None,
+            )
+            container = self.client.create_container(
+                image, command=list(command), detach=True, host_config=host_config, labels=labels or None
+            )
+            container_id = container["Id"]
+            self.client.start(container_id)
+            return container_id
+        except Exception as e:
+            raise ContainerError(image, f"Failed to start container: {str(e)}")
+
+    def exec_command(self, container_id: str, command: list, timeout: float = None) -> ExecResult:
+        try:
+            exec_id = self.client.exec_create(container_id, list(command), stdout=True, stderr=True)["Id"]
+            if timeout is None:
+                stdout, stderr = self.client.exec_start(exec_id, demux=True)
+            else:
+                # Read the raw exec socket so the wait can be bounded by the deadline
+                response_socket = self.client.exec_start(exec_id, socket=True)
+                stdout, stderr = _read_exec_socket(
+                    getattr(response_socket, "_sock", response_socket), container_id, timeout
+                )
+            exit_code = self.client.exec_inspect(exec_id)["ExitCode"]
+        except ContainerError:
+            raise
+        except Exception as e:
+            raise ContainerError(container_id, f"Failed to exec in container: {str(e)}")
+        return ExecResult(exit_code, stdout or b"", stderr or b"")
+
+    async def exec_command_async(self, container_id: str, command: list, timeout: float = None) -> ExecResult:
+        try:
+            exit_code, stdout, stderr = await asyncio.wait_for(
+                self._get_async_client().exec_run(container_id, command), timeout
+            )
+        except asyncio.TimeoutError:
+            raise TaskTimeoutError(container_id, timeout)
+        except ContainerError:
+            raise
+        except (OSError, ValueError, KeyError, asyncio.IncompleteReadError) as e:
+            raise ContainerError(container_id, f"Failed to exec in container: {str(e)}")
+        return ExecResult(exit_code, stdout, stderr)
+
+    def _get_async_client(self) -> AsyncEngineClient:
+        """
+        Returns the async Engine API client bound to the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            if self._async_client is not None:
+                self._close_async_client(self._async_client, self._async_loop)
+            self._async_client = AsyncEngineClient(
+                self.base_url, self.client.api_version, self.max_pool_size, self.timeout
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    @staticmethod
+    def _close_async_client(client: AsyncEngineClient, loop):
+        """
+        Closes the idle connections of a client bound to another event loop. They can only
+        be closed from their own loop, so a loop still running elsewhere is asked to do it.
+        """
+        if loop.is_running() and not loop.is_closed():
+            loop.call_soon_threadsafe(client.close_nowait)
+        else:
+            client.close_nowait()
+
+    def exec_stream(self, container_id: str, command: list) -> ExecStream:
+        try:
+            exec_id = self.client.exec_create(container_id, list(command), stdout=True, stderr=True)["Id"]
+            frames = self.client.exec_start(exec_id, stream=True, demux=True)
+        except Exception as e:
+            raise ContainerError(container_id, f"Failed to exec in container: {str(e)}")
+
+        def chunks():
+            for stdout, stderr in frames:
+                if stdout:
+                    yield OutputChunk("stdout", stdout)
+                if stderr:
+                    yield OutputChunk("stderr", stderr)
+
+        def exit_code():
+            return self.client.exec_inspect(exec_id)["ExitCode"]
+
+        return ExecStream(chunks(), exit_code, cancel=frames.close)
+
+    def open_channel(self, container_id: str, command: list) -> ExecChannel:
+        try:
+            exec_id = self.client.exec_create(
+                container_id, list(command), stdin=True, stdout=True, stderr=True
+            )["Id"]
+            response_socket = self.client.exec_start(exec_id, socket=True)
+        except Exception as e:
+            raise ContainerError(container_id, f"Failed to attach to container: {str(e)}")
+        # exec_start returns a read-only file wrapper; write through the underlying socket
+        return SocketChannel(getattr(response_socket, "_sock", response_socket))
+
+    def put_archive(self, container_id: str, path: str, chunks):
+        try:
+            # A generator body is sent with chunked transfer encoding, so the archive is never buffered
+            if not self.client.put_archive(container_id, path, (chunk for chunk in chunks)):
+                raise ContainerError(container_id, f"Docker refused the archive for {path}")
+        except ContainerError:
+            raise
+        except Exception as e:
+            raise ContainerError(container_id, f"Failed to copy files into container: {str(e)}")
+
+    def get_archive(self, container_id: str, path: str):
+        try:
+            chunks, _ = self.client.get_archive(container_id, path, chunk_size=READ_CHUNK_SIZE)
+        except Exception as e:
+            raise ContainerError(container_id, f"Failed to copy files from container: {str(e)}")
+        return chunks
+
+    def is_running(self, container_id: str) -> bool:
+        try:
+            return bool(self.client.inspect_container(container_id)["State"]["Running"])
+        except Exception:
+            return False
+
+    def remove_container(self, container_id: str):
+        try:
+            self.client.remove_container(container_id, force=True)
+        except Exception as e:
+            raise ContainerError(container_id, f"Failed to remove container: {str(e)}")
+
+    def list_containers(self, labels: dict) -> list:
+        try:
+            filters = {"label": [f"{name}={value}" for name, value in labels.items()]}
+            return [(c["Id"], c.get("Labels") or {}) for c in self.client.containers(all=True, filters=filters)]
+        except Exception as e:
+            raise ContainerError("list", f"Failed to list containers: {str(e)}")
+
+    def close(self):
+        self.client.close()
+
+
+def _read_exec_socket(sock, container_id: str, timeout: float) -> tuple:
+    """
+    Collects the multiplexed output of an exec socket until it closes or the timeout passes.
+
+    :return: A tuple (stdout, stderr) of bytes
+    """
+    deadline = time.monotonic() + timeout
+    output = {1: bytearray(), 2: bytearray()}
+    buffer = bytearray()
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TaskTimeoutError(container_id, timeout)
+            sock.settimeout(remaining)
+            try:
+                data = sock.recv(READ_CHUNK_SIZE)
+            except socket.timeout:
+                raise TaskTimeoutError(container_id, timeout)
+            if not data:
+                break
+            buffer += data
+            while len(buffer) >= 8:
+                stream_id, length = struct.unpack('>BxxxL', buffer[:8])
+                if len(buffer) < 8 + length:
+                    break
+                if stream_id in output:
+                    output[stream_id] += buffer[8:8 + length]
+                del buffer[:8 + length]
+    finally:
+        sock.close()
+    return bytes(output[1]), bytes(output[2])
+
+
+def create_transport(backend: str = "auto", docker_host: str = None, max_pool_size: int = 10) -> DockerTransport:
+    """
+    Creates the transport for the requested backend.
+
+    :param backend: 'api' for the Engine API, 'cli' for the docker CLI, or 'auto' to
+                    use the Engine API when the daemon is reachable and fall back to the CLI
+    :param docker_host: Daemon URL (default: unix socket)
+    :param max_pool_size: Maximum number of keep-alive connections for the Engine API backend
+    :return: A DockerTransport instance
+    """
+    backend = (backend or "auto").lower()
+    if backend == "cli":
+        return CLITransport(docker_host=docker_host)
+    if backend not in ("api", "auto"):
+        raise ValueError(f"Unknown Docker backend '{backend}'. Expected 'api', 'cli' or 'auto'.")
+
+    try:
+        transport = EngineAPITransport(base_url=docker_host or DEFAULT_DOCKER_HOST, max_pool_size=max_pool_size)
+        if backend == "api" or transport.ping():
+            return transport
+        transport.close()
+        logger.warning("Docker Engine API did not answer; falling back to the docker CLI.")
+    except ContainerError as e:
+        if backend == "api":
+            raise
+        logger.warning(f"Docker Engine API unavailable ({e.message}); falling back to the docker CLI.")
+    return CLITransport(docker_host=docker_host)
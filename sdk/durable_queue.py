@@ -0,0 +1,234 @@
+# durable_queue.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from .logging_config import logger
+from .task_executor import PRIORITY_NORMAL
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_name TEXT NOT NULL,
+    task_params TEXT NOT NULL,
+    user_token TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    resources TEXT,
+    timeout REAL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority, available_at, id);
+"""
+
+
+class Job:
+    """
+    A task taken from the queue by lease(). Finish it with ack() or nack().
+    """
+    def __init__(self, row: sqlite3.Row):
+        self.id = row["id"]
+        self.task_name = row["task_name"]
+        self.task_params = json.loads(row["task_params"])
+        self.user_token = row["user_token"]
+        self.priority = row["priority"]
+        self.resources = json.loads(row["resources"]) if row["resources"] else None
+        self.timeout = row["timeout"]
+        self.attempts = row["attempts"]
+
+
+class DurableQueue:
+    def __init__(self, path: str, lease_timeout: float = 3660.0, max_attempts: int = 5,
+                 backoff_base: float = 1.0, backoff_max: float = 300.0):
+        """
+        Task queue stored in a SQLite database (WAL mode), shared by any number of processes.
+
+        A worker leases a job, runs it and acks it. A job whose worker dies is leased again
+        once its lease expires. Failed jobs are retried with exponential backoff, and jobs
+        that fail `max_attempts` times are moved to the dead-letter state for inspection.
+
+        :param path: Database file
+        :param lease_timeout: Seconds a worker may hold a job before it is handed to another
+                              worker; must exceed the longest task timeout
+        :param max_attempts: Attempts before a job is dead-lettered
+        :param backoff_base: Delay in seconds before the first retry; doubled for every later one
+        :param backoff_max: Upper bound of the retry delay in seconds
+        """
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, task_name: str, task_params: dict, user_token: str, priority: int = PRIORITY_NORMAL,
+                resources: dict = None, timeout: float = None, delay: float = 0.0) -> int:
+        """
+        Adds a task to the queue. It is written to disk before this returns.
+
+        :param task_name: The task to execute
+        :param task_params: JSON-serializable task parameters
+        :param user_token: Token the worker passes to SudoOrchestrator.execute_task
+        :param priority: Lower values are leased first
+        :param resources: Optional resource request for the task
+        :param timeout: Optional deadline in seconds for running the task
+        :param delay: Seconds before the job may be leased
+        :return: The job ID
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (task_name, task_params, user_token, priority, resources, timeout, status, "
+                "available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (task_name, json.dumps(task_params), user_token, priority,
+                 json.dumps(resources) if resources else None, timeout, QUEUED, now + delay, now, now),
+            )
+            return cursor.lastrowid
+
+    def lease(self, worker_id: str, lease_timeout: float = None):
+        """
+        Takes the next ready job: the lowest priority value first, then the oldest.
+        Jobs whose lease has expired count as a failed attempt and are leased again
+        (or dead-lettered when out of attempts).
+
+        :param worker_id: Identifies the worker holding the lease
+        :param lease_timeout: Seconds the lease lasts (default: the queue's lease_timeout)
+        :return: A Job, or None if no job is ready
+        """
+        now = time.time()
+        expires = now + (self.lease_timeout if lease_timeout is None else lease_timeout)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs abandoned by crashed workers
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, last_error = ?, updated_at = ? "
+                    "WHERE status = ? AND lease_expires <= ? AND attempts >= ?",
+                    (DEAD, "Lease expired", now, LEASED, now, self.max_attempts),
+                )
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires <= ?) "
+                    "ORDER BY priority, id LIMIT 1",
+                    (QUEUED, now, LEASED, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (LEASED, worker_id, expires, now, row["id"]),
+                )
+                row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Job(row)
+
+    def ack(self, job: Job, worker_id: str, result) -> bool:
+        """
+        Marks a leased job as done and stores its result.
+
+        :return: False if the lease had expired and the job was handed to another worker
+        """
+        return self._finish(job, worker_id, "status = ?, result = ?", (DONE, json.dumps(result)))
+
+    def nack(self, job: Job, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        Records a failed attempt. The job is retried after a backoff delay, or dead-lettered
+        when it is out of attempts or retry is False.
+
+        :return: False if the lease had expired and the job was handed to another worker
+        """
+        if not retry or job.attempts >= self.max_attempts:
+            logger.error(f"Job {job.id} ('{job.task_name}') dead-lettered after {job.attempts} attempts: {error}")
+            return self._finish(job, worker_id, "status = ?, last_error = ?", (DEAD, error))
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (job.attempts - 1))
+        logger.warning(f"Job {job.id} ('{job.task_name}') failed; retrying in {delay:g}s: {error}")
+        return self._finish(job, worker_id, "status = ?, last_error = ?, available_at = ?",
+                            (QUEUED, error, time.time() + delay))
+
+    def get(self, job_id: int) -> dict:
+        """
+        Returns the state of a job (status, attempts, result, last_error), or None if unknown.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, task_name, status, attempts, result, last_error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def dead_letters(self, limit: int = 100) -> list:
+        """
+        Returns the oldest dead-lettered jobs.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, task_name, attempts, last_error, updated_at FROM jobs WHERE status = ? ORDER BY id LIMIT ?",
+                (DEAD, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def requeue(self, job_id: int) -> bool:
+        """
+        Puts a dead-lettered job back in the queue with a fresh set of attempts.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (QUEUED, time.time(), time.time(), job_id, DEAD),
+            )
+            return cursor.rowcount == 1
+
+    def stats(self) -> dict:
+        """
+        Returns the number of jobs in each state.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0, DEAD: 0}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _finish(self, job: Job, worker_id: str, assignments: str, values: tuple) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments}, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                values + (time.time(), job.id, LEASED, worker_id),
+            )
+            finished = cursor.rowcount == 1
+        if not finished:
+            logger.warning(f"Lease on job {job.id} was lost before it finished; result discarded.")
+        return finished
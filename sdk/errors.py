@@ -39,6 +39,18 @@ class ContainerError(BaseError):
         return f"ContainerError: {self.message}"
 
 
+class TaskTimeoutError(ContainerError):
+    """
+    Raised when a task does not finish before its deadline. The container it ran in is discarded.
+    """
+    def __init__(self, container_id: str, timeout: float, *args):
+        self.timeout = timeout
+        super().__init__(container_id, f"Task exceeded its deadline of {timeout:g}s", *args)
+
+    def __str__(self):
+        return f"TaskTimeoutError: {self.message}"
+
+
 class BlockchainError(BaseError):
     """
     Raised when an issue occurs with blockchain interaction (e.g., transaction failure, token error).
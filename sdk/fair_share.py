@@ -0,0 +1,323 @@
+# fair_share.py
+
+import hashlib
+import heapq
+import itertools
+import math
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from .logging_config import logger
+from .task_executor import PRIORITY_NORMAL
+
+
+class TokenBucket:
+    """
+    Allows `rate` operations per second on average, with bursts of up to `burst`.
+    """
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= 1.0
+
+    def take(self):
+        self.tokens -= 1.0
+
+    def wait_time(self, now: float) -> float:
+        """
+        Seconds until the next token is available.
+        """
+        self._refill(now)
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+    def full_at(self, now: float) -> float:
+        """
+        Monotonic time at which the bucket is full again.
+        """
+        self._refill(now)
+        return now + (self.burst - self.tokens) / self.rate
+
+
+class _Tenant:
+    def __init__(self, key, weight: float, bucket: TokenBucket = None):
+        self.key = key
+        self.label = hashlib.sha256(str(key).encode("utf-8")).hexdigest()[:12]  # never expose raw tokens
+        self.weight = weight
+        self.bucket = bucket
+        self.queue = []         # heap of (priority, sequence, enqueued_at, future, fn, args, kwargs)
+        self.deficit = 0.0
+        self.running = 0
+
+
+class FairShareExecutor:
+    def __init__(self, workers: int = 8, max_queue_size: int = 1000, max_queued_per_tenant: int = 0,
+                 max_concurrent_per_tenant: int = 0, rate: float = 0.0, burst: float = 1.0,
+                 weights: dict = None, name: str = "sudo-fair-worker"):
+        """
+        Runs submitted callables on a fixed set of worker threads, sharing them fairly between tenants.
+
+        Every tenant (e.g., a user token) has its own queue. Workers serve the queues with
+        deficit round-robin, so each tenant with waiting work gets a share of the workers in
+        proportion to its weight, however much work another tenant has queued. Within one
+        tenant, lower priority values run first. A tenant over its concurrency cap or out of
+        rate-limit tokens is skipped until it is eligible again; its work waits in its queue.
+
+        :param workers: Number of worker threads, started on first use
+        :param max_queue_size: Maximum number of submissions waiting in all queues together
+        :param max_queued_per_tenant: Maximum number of submissions waiting per tenant (0 for no limit)
+        :param max_concurrent_per_tenant: Maximum number of running submissions per tenant (0 for no limit)
+        :param rate: Submissions started per second per tenant (token bucket; 0 for no limit)
+        :param burst: Token bucket size, i.e. how many submissions a tenant may start at once
+        :param weights: Mapping of tenant to weight (default 1.0)
+        :param name: Prefix for the worker thread names
+        """
+        if workers < 1 or max_queue_size < 1:
+            raise ValueError("FairShareExecutor needs at least one worker and a queue size of at least one")
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.max_queued_per_tenant = max_queued_per_tenant
+        self.max_concurrent_per_tenant = max_concurrent_per_tenant
+        self.rate = rate
+        self.burst = burst
+        self.weights = dict(weights or {})
+        self.name = name
+        if any(weight <= 0 for weight in self.weights.values()):
+            raise ValueError("Tenant weights must be positive")
+        # Passes over the active tenants needed before the lightest one has earned a turn
+        self._rounds = math.ceil(1.0 / min([1.0] + list(self.weights.values())))
+
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._tenants = {}      # tenant -> _Tenant, for tenants with queued or running work
+        self._refilling = {}    # tenant -> TokenBucket of an idle tenant whose bucket is not yet full
+        self._refills = []      # heap of (time the bucket is full, sequence, tenant) for _refilling
+        self._active = deque()  # tenants with queued work, in round-robin order
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._threads = []
+        self._shutdown = False
+
+        self._busy = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def submit(self, tenant, fn, *args, priority: int = PRIORITY_NORMAL, block: bool = True,
+               queue_timeout: float = None, **kwargs) -> Future:
+        """
+        Queues fn(*args, **kwargs) for a tenant and returns a Future for its result.
+
+        :param tenant: Hashable tenant key, e.g. the user token
+        :param fn: The callable to run
+        :param priority: Lower values run first among the tenant's own submissions
+        :param block: Wait for queue space when the queue is full; otherwise raise queue.Full at once
+        :param queue_timeout: Seconds to wait for queue space before raising queue.Full (None waits forever)
+        :return: A concurrent.futures.Future
+        """
+        deadline = None if queue_timeout is None else time.monotonic() + queue_timeout
+        with self._not_full:
+            while True:
+                if self._shutdown:
+                    raise RuntimeError("Cannot submit to an executor that has been shut down")
+                state = self._tenants.get(tenant)
+                tenant_full = (self.max_queued_per_tenant and state is not None
+                               and len(state.queue) >= self.max_queued_per_tenant)
+                if self._queued < self.max_queue_size and not tenant_full:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    self._rejected += 1
+                    if tenant_full:
+                        raise queue.Full(f"Tenant queue is full ({self.max_queued_per_tenant} waiting)")
+                    raise queue.Full(f"Task queue is full ({self.max_queue_size} waiting)")
+                self._not_full.wait(remaining)
+
+            state = self._tenant_locked(tenant)
+            if not state.queue:
+                self._active.append(state)
+            future = Future()
+            heapq.heappush(state.queue, (priority, next(self._sequence), time.monotonic(), future, fn, args, kwargs))
+            self._queued += 1
+            self._submitted += 1
+            if len(self._threads) < self.workers and self._busy + self._queued > len(self._threads):
+                self._start_worker_locked()
+            self._not_empty.notify()
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """
+        Stops accepting submissions. Queued work still runs unless cancel_pending is set.
+
+        :param wait: Block until the workers have exited
+        :param cancel_pending: Cancel submissions that have not started yet
+        """
+        with self._lock:
+            self._shutdown = True
+            if cancel_pending:
+                for state in self._active:
+                    for entry in state.queue:
+                        entry[3].cancel()
+                    state.queue = []
+                    state.deficit = 0.0
+                self._active.clear()
+                self._queued = 0
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def stats(self) -> dict:
+        """
+        Returns queue depth, worker usage and queue wait times (seconds), plus queued and
+        running counts per tenant. Tenants are identified by a short hash of their key.
+        """
+        with self._lock:
+            now = time.monotonic()
+            started = self._completed + self._busy
+            return {
+                "workers": self.workers,
+                "busy": self._busy,
+                "queue_depth": self._queued,
+                "max_queue_size": self.max_queue_size,
+                "oldest_wait": max((now - entry[2] for state in self._active for entry in state.queue), default=0.0),
+                "wait_time_avg": self._total_wait / started if started else 0.0,
+                "wait_time_max": self._max_wait,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "tenants": {
+                    state.label: {"queued": len(state.queue), "running": state.running, "weight": state.weight}
+                    for state in self._tenants.values() if state.queue or state.running
+                },
+            }
+
+    def _tenant_locked(self, tenant) -> _Tenant:
+        state = self._tenants.get(tenant)
+        if state is None:
+            # A returning tenant keeps a bucket that has not refilled yet; otherwise it starts full
+            bucket = self._refilling.pop(tenant, None)
+            if bucket is None and self.rate > 0:
+                bucket = TokenBucket(self.rate, self.burst)
+            state = self._tenants[tenant] = _Tenant(tenant, self.weights.get(tenant, 1.0), bucket)
+        return state
+
+    def _retire_locked(self, state: _Tenant, now: float):
+        """
+        Drops the state of a tenant without queued or running work. Only a bucket that is
+        still refilling is kept, until it is full, so that the rate limit carries over.
+        """
+        self._tenants.pop(state.key, None)
+        if state.bucket is not None and not state.bucket.full(now):
+            self._refilling[state.key] = state.bucket
+            heapq.heappush(self._refills, (state.bucket.full_at(now), next(self._sequence), state.key))
+        while self._refills and self._refills[0][0] <= now:
+            _, _, key = heapq.heappop(self._refills)
+            bucket = self._refilling.get(key)
+            if bucket is not None and bucket.full(now):
+                del self._refilling[key]
+
+    def _pick_locked(self, now: float):
+        """
+        Deficit round-robin over the tenants with queued work.
+
+        :return: (entry, tenant, None) to run, or (None, None, seconds until a rate-limited tenant is eligible)
+        """
+        wait = None
+        for _ in range(len(self._active) * self._rounds):
+            state = self._active[0]
+            if self.max_concurrent_per_tenant and state.running >= self.max_concurrent_per_tenant:
+                self._active.rotate(-1)
+                continue
+            if state.bucket is not None and not state.bucket.ready(now):
+                delay = state.bucket.wait_time(now)
+                wait = delay if wait is None else min(wait, delay)
+                self._active.rotate(-1)
+                continue
+            if state.deficit < 1.0:
+                state.deficit += state.weight
+                if state.deficit < 1.0:
+                    self._active.rotate(-1)
+                    continue
+
+            entry = heapq.heappop(state.queue)
+            self._queued -= 1
+            state.deficit -= 1.0
+            if state.bucket is not None:
+                state.bucket.take()
+            if not state.queue:
+                state.deficit = 0.0
+                self._active.popleft()
+            elif state.deficit < 1.0:
+                self._active.rotate(-1)
+            return entry, state, None
+        return None, None, wait
+
+    def _start_worker_locked(self):
+        thread = threading.Thread(target=self._work, name=f"{self.name}-{len(self._threads)}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _work(self):
+        while True:
+            with self._not_empty:
+                while True:
+                    if not self._active and self._shutdown:
+                        return
+                    entry, state, wait = self._pick_locked(time.monotonic())
+                    if entry is not None:
+                        break
+                    # Nothing eligible: wait for new work, a finished task or the next rate-limit token
+                    self._not_empty.wait(wait)
+                _, _, enqueued_at, future, fn, args, kwargs = entry
+                waited = time.monotonic() - enqueued_at
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+                self._busy += 1
+                state.running += 1
+                self._not_full.notify_all()
+
+            run = future.set_running_or_notify_cancel()
+            result = error = None
+            if run:
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    error = e
+            # Count the work as done before the caller can observe the future
+            with self._lock:
+                self._busy -= 1
+                self._completed += 1
+                state.running -= 1
+                if not state.queue and not state.running:
+                    self._retire_locked(state, time.monotonic())
+                # The tenant may be back under its concurrency cap
+                self._not_empty.notify()
+            if not run:
+                continue
+            try:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Fair-share worker failed to complete a future: {str(e)}")
@@ -0,0 +1,131 @@
+# file_transfer.py
+
+import io
+import os
+import posixpath
+import tarfile
+import time
+
+TAR_BLOCK_SIZE = tarfile.BLOCKSIZE
+FILE_CHUNK_SIZE = 1024 * 1024
+
+
+def tar_stream(files: dict, mode: int = 0o644):
+    """
+    Yields a tar archive of the given files chunk by chunk, without building it in memory.
+
+    Each value may be:
+      - bytes: the file content
+      - str: a path on the host, streamed from disk
+      - (size, chunks): the exact size in bytes and an iterable of bytes chunks
+
+    :param files: Mapping of archive path (relative, '/'-separated) to content
+    :param mode: Permission bits of the files in the archive
+    :return: A generator of bytes chunks
+    """
+    now = int(time.time())
+    for name, content in files.items():
+        size, chunks = _file_source(content)
+        info = tarfile.TarInfo(_safe_member_name(name))
+        info.size = size
+        info.mode = mode
+        info.mtime = now
+        yield info.tobuf(format=tarfile.PAX_FORMAT)
+
+        written = 0
+        for chunk in chunks:
+            written += len(chunk)
+            if written > size:
+                raise ValueError(f"File '{name}' is larger than its declared size of {size} bytes")
+            yield chunk
+        if written != size:
+            raise ValueError(f"File '{name}' produced {written} bytes, expected {size}")
+        remainder = size % TAR_BLOCK_SIZE
+        if remainder:
+            yield b"\0" * (TAR_BLOCK_SIZE - remainder)
+    # End-of-archive marker: two zero blocks
+    yield b"\0" * (2 * TAR_BLOCK_SIZE)
+
+
+def extract_tar_stream(chunks, dest_dir: str) -> list:
+    """
+    Extracts a tar archive arriving as chunks into a host directory, one member at a time.
+
+    Only regular files and directories are extracted; members that would land outside
+    `dest_dir` are rejected.
+
+    :param chunks: Iterable of bytes chunks forming a tar archive
+    :param dest_dir: Directory to extract into (created if missing)
+    :return: The archive paths of the extracted files
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    root = os.path.realpath(dest_dir)
+    extracted = []
+    with tarfile.open(fileobj=ChunkReader(chunks), mode="r|") as archive:
+        for member in archive:
+            target = os.path.realpath(os.path.join(root, member.name))
+            if os.path.commonpath([root, target]) != root:
+                raise ValueError(f"Archive member '{member.name}' points outside {dest_dir}")
+            if member.isdir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            if not member.isfile():
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            source = archive.extractfile(member)
+            with open(target, "wb") as f:
+                while True:
+                    chunk = source.read(FILE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            extracted.append(member.name)
+    return extracted
+
+
+class ChunkReader(io.RawIOBase):
+    """
+    Read-only file object over an iterable of bytes chunks.
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _file_source(content):
+    if isinstance(content, (bytes, bytearray)):
+        return len(content), [bytes(content)]
+    if isinstance(content, str):
+        return os.path.getsize(content), _read_host_file(content)
+    size, chunks = content
+    return size, chunks
+
+
+def _read_host_file(path: str):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _safe_member_name(name: str) -> str:
+    normalized = posixpath.normpath(name).lstrip("/")
+    if normalized in ("", ".") or normalized == ".." or normalized.startswith("../"):
+        raise ValueError(f"Invalid file name '{name}'")
+    return normalized
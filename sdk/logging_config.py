@@ -1,9 +1,13 @@
 # logging_config.py
 
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
 
+# Shared by the SDK modules; setup_logging() configures the handlers it propagates to
+logger = logging.getLogger("sdk")
+
 def setup_logging(log_level: str = "INFO", log_file: str = "app.log"):
     """
     Configures the logging settings for the application.
@@ -42,6 +46,26 @@ def setup_logging(log_level: str = "INFO", log_file: str = "app.log"):
     logger.info("Logging is set up with level %s and log file %s", log_level, log_file)
 
 
+def setup_async_logging() -> QueueListener:
+    """
+    Moves the root logger's handlers onto a background thread. Logging calls then only
+    enqueue the record; formatting and console/file I/O no longer delay the caller.
+    Call after setup_logging().
+    
+    :return: The started QueueListener; call its stop() at shutdown to flush pending records.
+    """
+    root = logging.getLogger()
+    handlers = [handler for handler in root.handlers if not isinstance(handler, QueueHandler)]
+    log_queue = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     Returns a logger instance with the given name.
@@ -0,0 +1,241 @@
+# metrics.py
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .config import Config
+from .logging_config import logger
+
+# Upper bounds (seconds) of the stage latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Cumulative latency histogram with fixed buckets, as exported to Prometheus.
+    """
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile from the buckets (the upper bound of the bucket it falls in).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class _Span:
+    __slots__ = ("metrics", "stage", "started")
+
+    def __init__(self, metrics, stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop(failed=exc_type is not None)
+        return False
+
+    def start(self):
+        self.started = time.perf_counter()
+        return self
+
+    def stop(self, failed: bool = False):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started, failed=failed)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def start(self):
+        return self
+
+    def stop(self, failed: bool = False):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False, buckets: tuple = DEFAULT_BUCKETS, prefix: str = "sudo"):
+        """
+        Per-stage latency histograms and event counters for the task pipeline.
+
+        Instrumented code wraps each stage in `with metrics.span("stage"):`. While disabled,
+        span() hands out one shared no-op context manager and increment() returns at once,
+        so instrumentation costs an attribute check per call.
+
+        :param enabled: Record metrics
+        :param buckets: Histogram bucket upper bounds in seconds
+        :param prefix: Prefix of the exported metric names
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stages = {}    # stage -> Histogram
+        self._errors = {}    # stage -> spans that raised
+        self._counters = {}  # (name, sorted label items) -> value
+
+    def span(self, stage: str):
+        """
+        Context manager timing one run of a stage. Spans that raise are also counted as errors.
+
+        Code that handles its own errors can instead call `span = metrics.span(stage).start()`
+        and later `span.stop(failed=...)`.
+
+        :param stage: Stage name, e.g. "policy_check" or "container_start"
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, stage)
+
+    def observe(self, stage: str, seconds: float, failed: bool = False):
+        """
+        Records the duration of one run of a stage.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if failed:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """
+        Adds to a counter, e.g. increment("tasks", outcome="denied").
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self) -> dict:
+        """
+        Returns count, total, mean and estimated p50/p99 seconds per stage, plus the counters.
+        """
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                    "p50": histogram.quantile(0.5),
+                    "p99": histogram.quantile(0.99),
+                    "errors": self._errors.get(stage, 0),
+                }
+                for stage, histogram in self._stages.items()
+            }
+            counters = {(name, labels): value for (name, labels), value in self._counters.items()}
+        return {"stages": stages, "counters": counters}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._errors.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        name = f"{self.prefix}_stage_duration_seconds"
+        lines = [f"# HELP {name} Time spent in each stage of the task pipeline.", f"# TYPE {name} histogram"]
+        with self._lock:
+            for stage, histogram in sorted(self._stages.items()):
+                label = f'stage="{_escape(stage)}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label},le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f"{name}_sum{{{label}}} {histogram.sum!r}")
+                lines.append(f"{name}_count{{{label}}} {histogram.count}")
+
+            errors = f"{self.prefix}_stage_errors_total"
+            lines += [f"# HELP {errors} Stage runs that raised an exception.", f"# TYPE {errors} counter"]
+            for stage, count in sorted(self._errors.items()):
+                lines.append(f'{errors}{{stage="{_escape(stage)}"}} {count}')
+
+            typed = set()
+            for (counter, labels), value in sorted(self._counters.items()):
+                metric = f"{self.prefix}_{counter}_total"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                rendered = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels)
+                lines.append(f"{metric}{{{rendered}}} {value:g}" if rendered else f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Shared by the orchestrator, container manager, policy engine and blockchain integration
+metrics = Metrics(enabled=Config.METRICS_ENABLED)
+
+
+def start_metrics_server(port: int = Config.METRICS_PORT, address: str = Config.METRICS_ADDRESS,
+                         registry: Metrics = None) -> ThreadingHTTPServer:
+    """
+    Serves the metrics for Prometheus at http://address:port/metrics from a background thread.
+    Enables recording if it was off.
+
+    :param port: Port to listen on (0 picks a free port)
+    :param address: Address to bind (default: loopback only)
+    :param registry: Metrics to export (default: the shared `metrics`)
+    :return: The running server; call shutdown() to stop it
+    """
+    registry = registry or metrics
+    registry.enabled = True
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((address, port), Handler)
+    threading.Thread(target=server.serve_forever, name="sudo-metrics-server", daemon=True).start()
+    logger.info(f"Serving metrics on http://{address}:{server.server_address[1]}/metrics")
+    return server
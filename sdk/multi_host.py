@@ -0,0 +1,338 @@
+# multi_host.py
+
+import threading
+import time
+from .docker_transport import DockerTransport, ExecChannel, ExecResult, ExecStream, create_transport
+from .errors import ContainerError, TaskTimeoutError
+from .logging_config import logger
+
+
+class DockerEndpoint:
+    """
+    Load and health bookkeeping for one Docker daemon.
+    """
+    def __init__(self, url: str, transport: DockerTransport):
+        self.url = url
+        self.transport = transport
+        self.in_flight = 0          # Docker calls currently running against the host
+        self.containers = set()     # containers placed on the host and not yet removed
+        self.latency = None         # moving average of call latency, in seconds
+        self.failures = 0           # consecutive failed calls
+        self.drained_until = None   # monotonic time until which no containers are placed here
+
+    @property
+    def drained(self) -> bool:
+        return self.drained_until is not None
+
+    def load(self, min_latency: float) -> float:
+        """
+        Placement score; lower is better. Busy hosts and slow hosts both score higher.
+        """
+        return (self.in_flight + len(self.containers) + 1) * max(self.latency or 0.0, min_latency)
+
+
+class MultiHostTransport(DockerTransport):
+    """
+    Transport that spreads containers over several Docker daemons.
+
+    New containers are placed on the healthy host with the lowest load, where load
+    combines in-flight calls, containers placed and recent call latency. Every later
+    operation on a container is routed to the host it was placed on. A host whose
+    calls keep failing is drained: it gets no new containers until it answers a
+    ping again after `drain_interval` seconds.
+    """
+    name = "multi"
+
+    def __init__(self, endpoints: dict, failure_threshold: int = 3, drain_interval: float = 30.0,
+                 latency_weight: float = 0.2, min_latency: float = 0.001):
+        """
+        :param endpoints: Mapping of daemon URL to the DockerTransport connected to it
+        :param failure_threshold: Consecutive failed calls after which a host is drained
+        :param drain_interval: Seconds a drained host is skipped before it is probed again
+        :param latency_weight: Weight of the newest sample in the latency moving average
+        :param min_latency: Latency floor (seconds) so idle hosts without samples still compare by load
+        """
+        if not endpoints:
+            raise ValueError("MultiHostTransport needs at least one Docker endpoint")
+        self.endpoints = [DockerEndpoint(url, transport) for url, transport in endpoints.items()]
+        self.failure_threshold = failure_threshold
+        self.drain_interval = drain_interval
+        self.latency_weight = latency_weight
+        self.min_latency = min_latency
+
+        self._lock = threading.Lock()
+        self._owners = {}   # container_id -> DockerEndpoint
+
+    def run_container(self, image: str, network: str, command: list, labels: dict = None,
+                      cpus: float = None, memory_mb: int = None, host: str = None) -> str:
+        """
+        Starts a container on the least-loaded healthy host, or on `host` if given.
+
+        :param host: URL of the endpoint the container's resources were reserved on. Other
+                     hosts are only used if it is drained or fails to start the container;
+                     host_of() tells where the container ended up.
+        """
+        tried = set()
+        last_error = None
+        while True:
+            endpoint = self._preferred(host, exclude=tried) or self._choose(exclude=tried)
+            if endpoint is None:
+                break
+            if host is not None and endpoint.url != host:
+                logger.warning(f"Docker host {host} is unavailable; starting the container on {endpoint.url}.")
+            tried.add(endpoint.url)
+            try:
+                container_id = self._call(endpoint, endpoint.transport.run_container, image, network, command,
+                                          labels=labels, cpus=cpus, memory_mb=memory_mb)
+            except ContainerError as e:
+                logger.warning(f"Failed to start container on Docker host {endpoint.url}: {e.error_details}")
+                last_error = e
+                continue
+            with self._lock:
+                self._owners[container_id] = endpoint
+                endpoint.containers.add(container_id)
+            return container_id
+        if last_error is not None:
+            raise last_error
+        raise ContainerError(image, "No healthy Docker host available")
+
+    def exec_command(self, container_id: str, command: list, timeout: float = None) -> ExecResult:
+        endpoint = self._owner(container_id)
+        return self._call(endpoint, endpoint.transport.exec_command, container_id, command, timeout=timeout)
+
+    async def exec_command_async(self, container_id: str, command: list, timeout: float = None) -> ExecResult:
+        endpoint = self._owner(container_id)
+        started = self._begin(endpoint)
+        try:
+            result = await endpoint.transport.exec_command_async(container_id, command, timeout=timeout)
+        except TaskTimeoutError:
+            # A slow task says nothing about the host's health
+            self._finish(endpoint, None)
+            raise
+        except ContainerError:
+            self._finish(endpoint, started, failed=True)
+            raise
+        except BaseException:
+            self._finish(endpoint, None)
+            raise
+        self._finish(endpoint, started)
+        return result
+
+    def exec_stream(self, container_id: str, command: list) -> ExecStream:
+        endpoint = self._owner(container_id)
+        return self._call(endpoint, endpoint.transport.exec_stream, container_id, command)
+
+    def open_channel(self, container_id: str, command: list) -> ExecChannel:
+        endpoint = self._owner(container_id)
+        return self._call(endpoint, endpoint.transport.open_channel, container_id, command)
+
+    def put_archive(self, container_id: str, path: str, chunks):
+        endpoint = self._owner(container_id)
+        return self._call(endpoint, endpoint.transport.put_archive, container_id, path, chunks)
+
+    def get_archive(self, container_id: str, path: str):
+        endpoint = self._owner(container_id)
+        return self._call(endpoint, endpoint.transport.get_archive, container_id, path)
+
+    def is_running(self, container_id: str) -> bool:
+        return self._owner(container_id).transport.is_running(container_id)
+
+    def remove_container(self, container_id: str):
+        self.remove_containers([container_id])
+
+    def remove_containers(self, container_ids: list):
+        by_endpoint = {}
+        with self._lock:
+            for container_id in container_ids:
+                endpoint = self._owners.get(container_id)
+                if endpoint is None:
+                    raise ContainerError(container_id, "No such container on any known Docker host")
+                by_endpoint.setdefault(endpoint.url, (endpoint, []))[1].append(container_id)
+
+        errors = []
+        for endpoint, ids in by_endpoint.values():
+            try:
+                endpoint.transport.remove_containers(ids)
+            except ContainerError as e:
+                errors.append(f"{endpoint.url}: {e.error_details}")
+                continue
+            self._forget(endpoint, ids)
+        if errors:
+            raise ContainerError(",".join(container_ids), "; ".join(errors))
+
+    def list_containers(self, labels: dict) -> list:
+        containers = []
+        for endpoint in self.endpoints:
+            try:
+                found = endpoint.transport.list_containers(labels)
+            except ContainerError as e:
+                logger.warning(f"Failed to list containers on Docker host {endpoint.url}: {e.error_details}")
+                continue
+            with self._lock:
+                for container_id, _ in found:
+                    self._owners.setdefault(container_id, endpoint)
+            containers.extend(found)
+        return containers
+
+    def host_loads(self) -> dict:
+        """
+        Returns the placement score of every healthy endpoint, keyed by URL; lower is better.
+        This is the ranking new containers are placed by, for ResourceScheduler to reserve
+        capacity on the same host. Drained endpoints are left out.
+        """
+        with self._lock:
+            return {endpoint.url: load for endpoint, load in self._loads_locked().items()}
+
+    def host_of(self, container_id: str) -> str:
+        """
+        Returns the URL of the endpoint a container runs on.
+        """
+        return self._owner(container_id).url
+
+    def stats(self) -> list:
+        """
+        Returns the load and health of every endpoint.
+
+        :return: A list of dictionaries, one per endpoint
+        """
+        with self._lock:
+            return [
+                {
+                    "url": endpoint.url,
+                    "healthy": not endpoint.drained,
+                    "in_flight": endpoint.in_flight,
+                    "containers": len(endpoint.containers),
+                    "latency_ms": None if endpoint.latency is None else round(endpoint.latency * 1000, 3),
+                    "failures": endpoint.failures,
+                }
+                for endpoint in self.endpoints
+            ]
+
+    def close(self):
+        for endpoint in self.endpoints:
+            try:
+                endpoint.transport.close()
+            except Exception as e:
+                logger.warning(f"Failed to close transport for Docker host {endpoint.url}: {str(e)}")
+
+    def _preferred(self, url: str, exclude: set = ()) -> DockerEndpoint:
+        """
+        Returns the endpoint with the given URL if it is healthy and not excluded.
+        """
+        if url is None or url in exclude:
+            return None
+        with self._lock:
+            for endpoint in self.endpoints:
+                if endpoint.url == url and not endpoint.drained:
+                    return endpoint
+        return None
+
+    def _choose(self, exclude: set = ()) -> DockerEndpoint:
+        """
+        Returns the least-loaded healthy endpoint, probing drained ones whose interval has passed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            probe = [e for e in self.endpoints
+                     if e.drained and e.drained_until <= now and e.url not in exclude]
+        for endpoint in probe:
+            self._probe(endpoint)
+
+        with self._lock:
+            loads = self._loads_locked(exclude)
+            if not loads:
+                return None
+            return min(loads, key=loads.get)
+
+    def _loads_locked(self, exclude: set = ()) -> dict:
+        return {e: e.load(self.min_latency) for e in self.endpoints if not e.drained and e.url not in exclude}
+
+    def _probe(self, endpoint: DockerEndpoint):
+        try:
+            healthy = bool(endpoint.transport.ping())
+        except Exception:
+            healthy = False
+        with self._lock:
+            if healthy:
+                endpoint.drained_until = None
+                endpoint.failures = 0
+            else:
+                endpoint.drained_until = time.monotonic() + self.drain_interval
+        if healthy:
+            logger.info(f"Docker host {endpoint.url} answered again; placing containers on it.")
+
+    def _owner(self, container_id: str) -> DockerEndpoint:
+        with self._lock:
+            endpoint = self._owners.get(container_id)
+        if endpoint is None:
+            raise ContainerError(container_id, "No such container on any known Docker host")
+        return endpoint
+
+    def _forget(self, endpoint: DockerEndpoint, container_ids: list):
+        with self._lock:
+            for container_id in container_ids:
+                self._owners.pop(container_id, None)
+                endpoint.containers.discard(container_id)
+
+    def _call(self, endpoint: DockerEndpoint, method, *args, **kwargs):
+        started = self._begin(endpoint)
+        try:
+            result = method(*args, **kwargs)
+        except TaskTimeoutError:
+            # A slow task says nothing about the host's health
+            self._finish(endpoint, None)
+            raise
+        except ContainerError:
+            self._finish(endpoint, started, failed=True)
+            raise
+        except BaseException:
+            self._finish(endpoint, None)
+            raise
+        self._finish(endpoint, started)
+        return result
+
+    def _begin(self, endpoint: DockerEndpoint) -> float:
+        with self._lock:
+            endpoint.in_flight += 1
+        return time.monotonic()
+
+    def _finish(self, endpoint: DockerEndpoint, started: float, failed: bool = False):
+        """
+        Records the outcome of a call. `started` is None when the call was interrupted
+        rather than answered, in which case only the in-flight count is updated.
+        """
+        with self._lock:
+            endpoint.in_flight -= 1
+            if started is None:
+                return
+            if not failed:
+                elapsed = time.monotonic() - started
+                if endpoint.latency is None:
+                    endpoint.latency = elapsed
+                else:
+                    endpoint.latency += self.latency_weight * (elapsed - endpoint.latency)
+                endpoint.failures = 0
+                return
+            endpoint.failures += 1
+            if endpoint.drained or endpoint.failures < self.failure_threshold:
+                return
+            endpoint.drained_until = time.monotonic() + self.drain_interval
+        logger.warning(f"Draining Docker host {endpoint.url} after {self.failure_threshold} consecutive failures.")
+
+
+def create_multi_host_transport(docker_hosts: list, backend: str = "auto", max_pool_size: int = 10,
+                                **kwargs) -> DockerTransport:
+    """
+    Creates a transport for one or more Docker daemons.
+
+    :param docker_hosts: Daemon URLs (DOCKER_HOST format)
+    :param backend: Backend used for each daemon, as in create_transport()
+    :param max_pool_size: Maximum number of keep-alive connections per daemon
+    :param kwargs: Placement settings passed to MultiHostTransport
+    :return: A plain transport for a single host, otherwise a MultiHostTransport
+    """
+    if len(docker_hosts) == 1:
+        return create_transport(backend, docker_hosts[0], max_pool_size)
+    return MultiHostTransport(
+        {url: create_transport(backend, url, max_pool_size) for url in docker_hosts}, **kwargs
+    )
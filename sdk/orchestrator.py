@@ -1,15 +1,55 @@
 # orchestrator.py
 
+import threading
+from concurrent.futures import Future
+from .config import Config
+from .fair_share import FairShareExecutor
 from .policy_engine import PolicyEngine
 from .container_manager import ContainerManager
 from .logging_config import logger
+from .metrics import metrics
+from .result_cache import ResultCache, create_result_cache, task_fingerprint
+from .single_flight import SingleFlight
+from .task_executor import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, TaskExecutor
+from .workflow import Workflow
 
 class SudoOrchestrator:
-    def __init__(self, policy_engine: PolicyEngine, container_manager: ContainerManager):
+    def __init__(self, policy_engine: PolicyEngine, container_manager: ContainerManager,
+                 workers: int = Config.ORCHESTRATOR_WORKERS, max_queue_size: int = Config.ORCHESTRATOR_QUEUE_SIZE,
+                 result_cache: ResultCache = None, coalesce: bool = Config.COALESCE_IDENTICAL_TASKS,
+                 pipelined: bool = Config.ORCHESTRATOR_PIPELINED):
+        """
+        :param policy_engine: Checks whether a user may run a task
+        :param container_manager: Runs tasks inside containers
+        :param workers: Worker threads used by submit()
+        :param max_queue_size: Maximum number of submitted tasks waiting for a worker
+        :param result_cache: Optional cache for results of deterministic tasks
+                             (default: built from RESULT_CACHE_* settings, disabled unless RESULT_CACHE_BACKEND is set)
+        :param coalesce: Run identical tasks that are in flight at the same time only once and
+                         share the result between their callers (each caller's permissions are still checked,
+                         and each waits no longer than its own deadline). Only enable this when tasks are
+                         idempotent: two identical create_file calls, for example, would run once.
+        :param pipelined: Acquire the task's container while the permission check runs (it is given
+                          back unused if the task is denied) and store results in the background
+        """
         self.policy_engine = policy_engine
         self.container_manager = container_manager
+        if result_cache is None and Config.RESULT_CACHE_BACKEND:
+            result_cache = create_result_cache(
+                Config.RESULT_CACHE_BACKEND, Config.RESULT_CACHE_PATH, Config.RESULT_CACHE_MAX_ENTRIES,
+                Config.RESULT_CACHE_TTL, Config.RESULT_CACHE_TTLS,
+            )
+        self.result_cache = result_cache
+        self.in_flight = SingleFlight() if coalesce else None
+        self.pipelined = pipelined
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self._executor = None
+        self._background = None  # speculative container acquisition and post-execution work
+        self._executor_lock = threading.Lock()
 
-    def execute_task(self, task_name: str, task_params: dict, user_token: str):
+    def execute_task(self, task_name: str, task_params: dict, user_token: str, resources: dict = None,
+                     timeout: float = None):
         """
         Main entry point for executing a task.
         
@@ -21,42 +61,326 @@ class SudoOrchestrator:
         :param task_name: The name of the task to execute
         :param task_params: The parameters required for the task
         :param user_token: Token to verify user identity and permissions
-        :return: Execution result or error
+        :param resources: Optional resource request for the task ({"cpus": 1.0, "memory_mb": 512})
+        :param timeout: Deadline in seconds for the task (default: CONTAINER_TIMEOUT). A task that
+                        misses it is killed and {"error": ..., "timed_out": True} is returned.
+        :return: Execution result or error ({"error": ..., "denied": True} if the user may not run the task)
         """
+        pending_lease = None
         try:
+            if self.pipelined:
+                # Start acquiring a container while the policy is evaluated. Nothing runs in it
+                # before the check passes, and it is given back unused if the check fails.
+                task = self.prepare_task(task_name, task_params, resources, timeout)
+                pending_lease = self._get_background().submit(
+                    self.container_manager.lease_for_task, task, priority=PRIORITY_HIGH
+                )
+
             # Step 1: Check if the user has permission to perform the task
-            if not self.policy_engine.check_permission(task_name, user_token):
+            with metrics.span("policy_check"):
+                allowed = self.policy_engine.check_permission(task_name, user_token)
+            if not allowed:
                 raise PermissionError(f"User does not have permission to execute task: {task_name}")
             
             # Step 2: Prepare and route the task to the container
-            task = self.prepare_task(task_name, task_params)
+            if pending_lease is None:
+                task = self.prepare_task(task_name, task_params, resources, timeout)
             
-            # Step 3: Execute the task inside the container
-            result = self.container_manager.execute_in_container(task)
+            # Step 3: Execute the task inside the container, unless an identical task's result is cached
+            hit, result = self._cached_result(task)
+            if hit:
+                logger.info(f"Task '{task_name}' served from the result cache.")
+                metrics.increment("tasks", outcome="cached")
+                return result
+            key = self._coalesce_key(task)
+            if key is None:
+                result = self._run_and_store(task, pending_lease)
+            else:
+                try:
+                    result = self.in_flight.do(key, self._run_and_store, task, pending_lease,
+                                               follower_timeout=self._task_timeout(task))
+                except TimeoutError:
+                    result = self._follower_timeout_result(task)
             
             # Step 4: Log the successful execution of the task
             logger.info(f"Task '{task_name}' executed successfully with result: {result}")
+            failed = isinstance(result, dict) and "error" in result
+            metrics.increment("tasks", outcome="failed" if failed else "completed")
+            
+            return result
+
+        except PermissionError as e:
+            logger.error(str(e))
+            metrics.increment("tasks", outcome="denied")
+            return {"error": str(e), "denied": True}
+        except Exception as e:
+            logger.error(f"Unexpected error during task execution: {str(e)}")
+            metrics.increment("tasks", outcome="failed")
+            return {"error": "An unexpected error occurred."}
+        finally:
+            if pending_lease is not None:
+                # No-op when the lease was used
+                pending_lease.add_done_callback(self._release_unused_lease)
+
+    def submit(self, task_name: str, task_params: dict, user_token: str, priority: int = PRIORITY_NORMAL,
+               resources: dict = None, timeout: float = None, block: bool = True,
+               queue_timeout: float = None) -> Future:
+        """
+        Queues a task for execute_task on the orchestrator's worker pool.
+        
+        The queue is bounded: when it is full, submit() waits for space (or raises
+        queue.Full when block is False or queue_timeout passes). Each user token has its
+        own queue and the workers are shared fairly between users, within the per-user
+        concurrency caps and rate limits (USER_* settings).
+        
+        :param task_name: The name of the task to execute
+        :param task_params: The parameters required for the task
+        :param user_token: Token to verify user identity and permissions; also the fair-share tenant
+        :param priority: Lower values are picked first among the user's own tasks
+                         (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)
+        :param resources: Optional resource request for the task
+        :param timeout: Optional deadline in seconds for running the task
+        :param block: Wait for queue space instead of failing at once
+        :param queue_timeout: Seconds to wait for queue space
+        :return: A Future resolving to the result of execute_task
+        """
+        return self._get_executor().submit(
+            user_token, self.execute_task, task_name, task_params, user_token, resources=resources, timeout=timeout,
+            priority=priority, block=block, queue_timeout=queue_timeout,
+        )
+
+    def executor_stats(self) -> dict:
+        """
+        Returns queue depth, busy workers and queue wait times of the submit() worker pool,
+        with queued and running counts per user (keyed by a hash of the token).
+        """
+        return self._get_executor().stats()
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """
+        Stops the submit() worker pool.
+        
+        :param wait: Block until running and queued tasks have finished
+        :param cancel_pending: Cancel tasks that have not started yet
+        """
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+            background, self._background = self._background, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_pending=cancel_pending)
+        if background is not None:
+            background.shutdown(wait=wait)
+
+    def cache_stats(self) -> dict:
+        """
+        Returns the result cache's hit/miss counters, or None when caching is disabled.
+        """
+        return self.result_cache.stats() if self.result_cache is not None else None
+
+    def _coalesce_key(self, task: dict):
+        """
+        Returns the key under which identical in-flight tasks are coalesced, or None.
+        """
+        if self.in_flight is None:
+            return None
+        return task_fingerprint(task, self.container_manager.container_image)
+
+    def _task_timeout(self, task: dict):
+        """
+        Returns the task's deadline in seconds, as the container manager will apply it (None for no deadline).
+        """
+        timeout = task.get("timeout", getattr(self.container_manager, "task_timeout", None))
+        return float(timeout) if isinstance(timeout, (int, float)) and timeout else None
+
+    def _follower_timeout_result(self, task: dict) -> dict:
+        # This caller waited on an identical in-flight task for longer than its own deadline
+        message = f"Task '{task['name']}' exceeded its deadline of {self._task_timeout(task):g}s"
+        logger.warning(message)
+        return {"error": message, "timed_out": True}
+
+    def _run_and_store(self, task: dict, pending_lease: Future = None):
+        if pending_lease is None:
+            result = self.container_manager.execute_in_container(task)
+        else:
+            result = self.container_manager.execute_leased(pending_lease.result())
+        if self.pipelined and self.result_cache is not None:
+            self._get_background().submit(self._store_result, task, result, priority=PRIORITY_LOW)
+        else:
+            self._store_result(task, result)
+        return result
+
+    @staticmethod
+    def _release_unused_lease(pending_lease: Future):
+        if not pending_lease.cancelled():
+            pending_lease.result().release()
+
+    async def _run_and_store_async(self, task: dict):
+        result = await self.container_manager.execute_in_container_async(task)
+        self._store_result(task, result)
+        return result
+
+    def _cached_result(self, task: dict):
+        if self.result_cache is None:
+            return False, None
+        return self.result_cache.get(task, self.container_manager.container_image)
+
+    def _store_result(self, task: dict, result):
+        if self.result_cache is not None:
+            self.result_cache.put(task, self.container_manager.container_image, result)
+
+    def _get_executor(self) -> FairShareExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = FairShareExecutor(
+                    self.workers, self.max_queue_size,
+                    max_queued_per_tenant=Config.USER_MAX_QUEUED_TASKS,
+                    max_concurrent_per_tenant=Config.USER_MAX_CONCURRENT_TASKS,
+                    rate=Config.USER_RATE_LIMIT, burst=Config.USER_RATE_BURST, weights=Config.USER_WEIGHTS,
+                    name="sudo-orchestrator-worker",
+                )
+            return self._executor
+
+    def _get_background(self) -> TaskExecutor:
+        with self._executor_lock:
+            if self._background is None:
+                self._background = TaskExecutor(self.workers, self.max_queue_size, name="sudo-orchestrator-background")
+            return self._background
+
+    def workflow(self, name: str, max_parallel: int = Config.WORKFLOW_MAX_PARALLEL, fail_fast: bool = True) -> Workflow:
+        """
+        Creates a workflow whose task steps run through this orchestrator.
+        
+        :param name: Name of the workflow
+        :param max_parallel: Maximum number of steps running at once
+        :param fail_fast: Stop starting new steps after the first failure
+        :return: An empty Workflow to add steps to
+        """
+        return Workflow(name, self, max_parallel=max_parallel, fail_fast=fail_fast)
+
+    def execute_tasks(self, tasks: list, user_token: str) -> list:
+        """
+        Executes a burst of tasks for one user in a single container session.
+        
+        Permissions are checked per task; denied tasks get an error result and are not
+        sent to the container. Allowed tasks run via ContainerManager.execute_batch and
+        share one container's filesystem.
+        
+        :param tasks: List of (task_name, task_params) pairs
+        :param user_token: Token to verify user identity and permissions
+        :return: One result per task, in the same order
+        """
+        results = [None] * len(tasks)
+        allowed = []
+        for index, (task_name, task_params) in enumerate(tasks):
+            try:
+                if not self.policy_engine.check_permission(task_name, user_token):
+                    raise PermissionError(f"User does not have permission to execute task: {task_name}")
+                allowed.append((index, self.prepare_task(task_name, task_params)))
+            except PermissionError as e:
+                logger.error(str(e))
+                results[index] = {"error": str(e), "denied": True}
+            except Exception as e:
+                logger.error(f"Unexpected error during task execution: {str(e)}")
+                results[index] = {"error": "An unexpected error occurred."}
+
+        if allowed:
+            batch_results = self.container_manager.execute_batch([task for _, task in allowed])
+            for (index, task), result in zip(allowed, batch_results):
+                results[index] = result
+            logger.info(f"Executed batch of {len(allowed)} tasks ({len(tasks) - len(allowed)} rejected).")
+
+        return results
+
+    async def execute_task_async(self, task_name: str, task_params: dict, user_token: str, resources: dict = None,
+                                 timeout: float = None):
+        """
+        Async counterpart of execute_task. The container work is awaited through
+        ContainerManager.execute_in_container_async, so many tasks can run on one event loop.
+        
+        :param task_name: The name of the task to execute
+        :param task_params: The parameters required for the task
+        :param user_token: Token to verify user identity and permissions
+        :param resources: Optional resource request for the task ({"cpus": 1.0, "memory_mb": 512})
+        :param timeout: Deadline in seconds for the task (default: CONTAINER_TIMEOUT). A task that
+                        misses it is killed and {"error": ..., "timed_out": True} is returned.
+        :return: Execution result or error ({"error": ..., "denied": True} if the user may not run the task)
+        """
+        try:
+            with metrics.span("policy_check"):
+                allowed = self.policy_engine.check_permission(task_name, user_token)
+            if not allowed:
+                raise PermissionError(f"User does not have permission to execute task: {task_name}")
+            
+            task = self.prepare_task(task_name, task_params, resources, timeout)
+            
+            hit, result = self._cached_result(task)
+            if hit:
+                logger.info(f"Task '{task_name}' served from the result cache.")
+                metrics.increment("tasks", outcome="cached")
+                return result
+            key = self._coalesce_key(task)
+            if key is None:
+                result = await self._run_and_store_async(task)
+            else:
+                try:
+                    result = await self.in_flight.do_async(key, self._run_and_store_async, task,
+                                                           follower_timeout=self._task_timeout(task))
+                except TimeoutError:
+                    result = self._follower_timeout_result(task)
+            
+            logger.info(f"Task '{task_name}' executed successfully with result: {result}")
+            failed = isinstance(result, dict) and "error" in result
+            metrics.increment("tasks", outcome="failed" if failed else "completed")
             
             return result
 
         except PermissionError as e:
             logger.error(str(e))
-            return {"error": str(e)}
+            metrics.increment("tasks", outcome="denied")
+            return {"error": str(e), "denied": True}
         except Exception as e:
             logger.error(f"Unexpected error during task execution: {str(e)}")
+            metrics.increment("tasks", outcome="failed")
             return {"error": "An unexpected error occurred."}
 
-    def prepare_task(self, task_name: str, task_params: dict):
+    def stream_task(self, task_name: str, task_params: dict, user_token: str):
+        """
+        Executes a task and streams its output while it runs.
+        
+        Permissions are checked exactly as in execute_task. The returned ExecStream
+        yields OutputChunk(stream, data) items and exposes exit_code once exhausted.
+        
+        :param task_name: The name of the task to execute
+        :param task_params: The parameters required for the task
+        :param user_token: Token to verify user identity and permissions
+        :return: An ExecStream over the task's output
+        :raises PermissionError: If the user may not execute the task
+        """
+        if not self.policy_engine.check_permission(task_name, user_token):
+            logger.error(f"User does not have permission to execute task: {task_name}")
+            raise PermissionError(f"User does not have permission to execute task: {task_name}")
+
+        task = self.prepare_task(task_name, task_params)
+        return self.container_manager.stream_task(task)
+
+    def prepare_task(self, task_name: str, task_params: dict, resources: dict = None, timeout: float = None):
         """
         Prepares the task, which can involve validation, parameter formatting, etc.
         
         :param task_name: The task to prepare
         :param task_params: The parameters to pass to the task
+        :param resources: Optional resource request ({"cpus": ..., "memory_mb": ...})
+        :param timeout: Optional deadline in seconds, overriding the container manager's default
         :return: The prepared task ready for execution
         """
         # For now, let's just return the parameters as is. You could expand this logic
         # for things like data validation, transformation, etc.
-        return {
+        task = {
             "name": task_name,
             "params": task_params
         }
+        if resources:
+            task["resources"] = resources
+        if timeout is not None:
+            task["timeout"] = timeout
+        return task
@@ -0,0 +1,167 @@
+# pattern_matcher.py
+
+import fnmatch
+import re
+from collections import deque
+
+# Rule kinds accepted under "restricted_patterns" in the policy file
+PATTERN_KINDS = ("glob", "prefix", "regex", "substring")
+
+# Flags of a pattern without inline flags; anything else came from an inline (?aiLmsux)
+_DEFAULT_FLAGS = re.compile("").flags
+
+
+class PrefixTrie:
+    """
+    Character trie of banned prefixes. A lookup walks the value once, stopping at the
+    first banned prefix or the first character no prefix continues with.
+    """
+    _END = object()
+
+    def __init__(self, prefixes):
+        self.root = {}
+        self.size = 0
+        for prefix in prefixes:
+            node = self.root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            if self._END not in node:
+                node[self._END] = prefix
+                self.size += 1
+
+    def match(self, value: str):
+        """
+        Returns the shortest banned prefix of `value`, or None.
+        """
+        node = self.root
+        if self._END in node:
+            return node[self._END]
+        for char in value:
+            node = node.get(char)
+            if node is None:
+                return None
+            if self._END in node:
+                return node[self._END]
+        return None
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over banned substrings: finds whether any of them occurs in a
+    value in one pass over the value, however many substrings there are.
+    """
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [None]  # pattern ending at (or, through the fail links, inside) each state
+        for pattern in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                following = self.goto[state].get(char)
+                if following is None:
+                    following = self.goto[state][char] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(None)
+                state = following
+            self.output[state] = self.output[state] or pattern
+
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, following in self.goto[state].items():
+                pending.append(following)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[following] = self.goto[fallback].get(char, 0)
+                self.output[following] = self.output[following] or self.output[self.fail[following]]
+
+    def match(self, value: str):
+        """
+        Returns a banned substring occurring in `value`, or None.
+        """
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for char in value:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+
+class PatternMatcher:
+    def __init__(self, glob=(), prefix=(), regex=(), substring=()):
+        """
+        Every pattern rule of one parameter, compiled into one matcher per rule kind.
+
+        Globs (whole-value matches, where `*` also matches `/`) and regular expressions
+        (matched anywhere in the value) are joined into a single alternation regex.
+        Prefixes go into a PrefixTrie and substrings into an AhoCorasick automaton, so each
+        check scans the value once per kind, independent of the number of rules.
+
+        A regex with capture groups or inline global flags such as `(?i)` would change
+        meaning inside the alternation (its backreferences would be renumbered, its flags
+        rejected), so each of those is compiled and searched on its own.
+
+        :param glob: Shell-style patterns, e.g. "/etc/*.conf"
+        :param prefix: Banned value prefixes, e.g. "/proc/"
+        :param regex: Python regular expressions, e.g. r"rm\\s+-rf"
+        :param substring: Banned substrings, e.g. "| sh"
+        :raises ValueError: If a regular expression does not compile
+        """
+        alternatives = [r"\A(?:%s)" % fnmatch.translate(pattern) for pattern in glob]
+        self.standalone = []
+        for pattern in regex:
+            try:
+                compiled = re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Invalid regex rule '{pattern}': {str(e)}")
+            if compiled.groups or compiled.flags != _DEFAULT_FLAGS:
+                self.standalone.append(compiled)
+            else:
+                alternatives.append("(?:%s)" % pattern)
+        try:
+            self.regex = re.compile("|".join(alternatives)) if alternatives else None
+        except re.error as e:
+            raise ValueError(f"Invalid pattern in {list(glob) + list(regex)}: {str(e)}")
+        self.prefixes = PrefixTrie(prefix) if prefix else None
+        self.substrings = AhoCorasick(substring) if substring else None
+
+    @classmethod
+    def from_policy(cls, rules: dict):
+        """
+        Builds a matcher from one parameter's entry under "restricted_patterns".
+
+        :param rules: Mapping of rule kind ("glob", "prefix", "regex", "substring") to a pattern or list of patterns
+        :raises ValueError: For unknown rule kinds or patterns that are not strings
+        """
+        if not isinstance(rules, dict):
+            raise ValueError(f"Pattern rules must be a JSON object of {', '.join(PATTERN_KINDS)}")
+        unknown = set(rules) - set(PATTERN_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown pattern kinds: {', '.join(sorted(unknown))}")
+        compiled = {}
+        for kind, patterns in rules.items():
+            if isinstance(patterns, str):
+                patterns = [patterns]
+            if not all(isinstance(pattern, str) for pattern in patterns):
+                raise ValueError(f"'{kind}' patterns must be strings")
+            compiled[kind] = tuple(patterns)
+        return cls(**compiled)
+
+    def matches(self, value: str) -> bool:
+        """
+        Whether `value` breaks any of the rules.
+        """
+        if self.prefixes is not None and self.prefixes.match(value) is not None:
+            return True
+        if self.substrings is not None and self.substrings.match(value) is not None:
+            return True
+        if self.regex is not None and self.regex.search(value) is not None:
+            return True
+        return any(compiled.search(value) is not None for compiled in self.standalone)
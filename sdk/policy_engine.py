@@ -1,17 +1,89 @@
 # policy_engine.py
 
 import json
+import logging
+import threading
+from .config import Config
+from .decision_cache import DecisionCache
 from .errors import PolicyViolationError
 from .logging_config import logger
+from .metrics import metrics
+from .policy_index import ActionRules, PolicyIndex
+from .policy_watcher import PolicyWatcher
+from .utils import validate_token_format
 
 class PolicyEngine:
-    def __init__(self, policy_file: str):
+    def __init__(self, policy_file: str, watch: bool = Config.POLICY_HOT_RELOAD,
+                 reload_interval: float = Config.POLICY_RELOAD_INTERVAL,
+                 decision_cache_size: int = Config.POLICY_DECISION_CACHE_SIZE):
         """
         Initializes the PolicyEngine with a set of policies.
-        
+
+        The policies are held in one immutable PolicyIndex snapshot. reload() builds a new
+        snapshot and replaces the reference in a single assignment, so validate_action never
+        takes a lock and never sees a half-loaded policy. Decisions are remembered per
+        snapshot, so repeated checks of the same request skip the evaluation.
+
         :param policy_file: Path to the policy configuration file in JSON format
+        :param watch: Reload the policy file whenever it changes on disk
+        :param reload_interval: Seconds between checks when the file has to be polled
+        :param decision_cache_size: Maximum number of cached decisions (0 disables the cache)
+        """
+        self.policy_file = policy_file
+        self.decisions = DecisionCache(decision_cache_size) if decision_cache_size > 0 else None
+        self._reload_lock = threading.Lock()
+        self._snapshot = self.compile_policies(self.load_policies(policy_file))
+        self.watcher = None
+        if watch:
+            self.watcher = PolicyWatcher(policy_file, self.reload, poll_interval=reload_interval).start()
+
+    @property
+    def index(self) -> PolicyIndex:
+        """
+        The current policy snapshot.
         """
-        self.policies = self.load_policies(policy_file)
+        return self._snapshot
+
+    @property
+    def policies(self) -> dict:
+        return self._snapshot.policies
+
+    @policies.setter
+    def policies(self, policies: dict):
+        with self._reload_lock:
+            self._snapshot = self.compile_policies(policies, self._snapshot.version + 1)
+
+    def reload(self) -> bool:
+        """
+        Loads and compiles the policy file again and swaps the result in. If the file
+        cannot be read or compiled, the current policies stay in force.
+
+        :return: True if the new policies are in force
+        """
+        with self._reload_lock:
+            current = self._snapshot
+            try:
+                snapshot = self.compile_policies(self.load_policies(self.policy_file), current.version + 1)
+            except Exception as e:
+                logger.error(f"Keeping policy version {current.version}; reload of {self.policy_file} failed: {str(e)}")
+                return False
+            self._snapshot = snapshot
+        logger.info(f"Policy version {snapshot.version} loaded from {self.policy_file}.")
+        return True
+
+    def decision_cache_stats(self) -> dict:
+        """
+        Returns the decision cache's hits, misses, hit ratio and size (empty if the cache is disabled).
+        """
+        return self.decisions.stats() if self.decisions is not None else {}
+
+    def close(self):
+        """
+        Stops watching the policy file.
+        """
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
 
     def load_policies(self, policy_file: str):
         """
@@ -29,6 +101,20 @@ class PolicyEngine:
             logger.error(f"Failed to load policies from {policy_file}: {str(e)}")
             raise Exception(f"Error loading policies: {str(e)}")
 
+    def compile_policies(self, policies: dict, version: int = 1) -> PolicyIndex:
+        """
+        Compiles the loaded policies into the decision index that validate_action queries.
+
+        :param policies: The policies as returned by load_policies
+        :param version: Version number of the snapshot
+        :return: An immutable PolicyIndex
+        """
+        try:
+            return PolicyIndex(policies, version)
+        except Exception as e:
+            logger.error(f"Failed to compile policies: {str(e)}")
+            raise Exception(f"Error loading policies: {str(e)}")
+
     def validate_action(self, action: str, parameters: dict) -> bool:
         """
         Validates whether the specified action is allowed based on the current policies.
@@ -37,27 +123,139 @@ class PolicyEngine:
         :param parameters: A dictionary of parameters related to the action (e.g., file path, command)
         :return: True if the action is allowed, False if blocked
         """
-        try:
-            # Check if the action is defined in the policies
-            if action not in self.policies:
-                logger.warning(f"Action '{action}' is not defined in policies.")
-                return False
+        with metrics.span("policy_validate"):
+            try:
+                # Check if the action is defined in the policies
+                snapshot = self._snapshot
+                rules = snapshot.rules_for(action)
+                if rules is None:
+                    logger.warning(f"Action '{action}' is not defined in policies.")
+                    return False
 
-            action_policy = self.policies[action]
+                key = rules.decision_key(parameters) if self.decisions is not None else None
+                decision = None
+                if key is not None:
+                    decision = self.decisions.get(snapshot.version, (action, key))
+                    metrics.increment("policy_decision_cache", result="miss" if decision is None else "hit")
 
-            # Check if parameters for the action are valid
-            for param, value in parameters.items():
-                if param in action_policy.get("restricted_parameters", []):
-                    if not self.is_valid_parameter(param, value, action_policy):
-                        logger.warning(f"Invalid parameter '{param}' for action '{action}'.")
-                        return False
+                cached = decision is not None
+                if not cached:
+                    # Check if parameters for the action are valid
+                    param = rules.first_violation(parameters)
+                    decision = True if param is None else param
+                    if key is not None:
+                        self.decisions.put(snapshot.version, (action, key), decision)
 
-            logger.info(f"Action '{action}' is allowed.")
-            return True
+                # Denials are logged the same whether cached or not; a cached allow only at DEBUG
+                if decision is not True:
+                    logger.warning(f"Parameter value '{parameters[decision]}' for '{decision}' is restricted.")
+                    logger.warning(f"Invalid parameter '{decision}' for action '{action}'.")
+                    return False
+                level = logging.DEBUG if cached else logging.INFO
+                if logger.isEnabledFor(level):
+                    logger.log(level, f"Action '{action}' is allowed.")
+                return True
 
-        except Exception as e:
-            logger.error(f"Error during action validation: {str(e)}")
-            raise PolicyViolationError(f"Action validation failed: {str(e)}")
+            except Exception as e:
+                logger.error(f"Error during action validation: {str(e)}")
+                raise PolicyViolationError(f"Action validation failed: {str(e)}")
+
+    def check_permission(self, task_name: str, user_token: str) -> bool:
+        """
+        Checks whether a user may run a task. This is the check SudoOrchestrator runs before
+        every task: the token must be a well-formed $SUDO token, and the task must be an
+        action the policies allow.
+
+        :param task_name: The task the user wants to run, looked up as a policy action
+        :param user_token: Token identifying the user
+        :return: True if the task may run
+        """
+        if not isinstance(user_token, str) or not validate_token_format(user_token):
+            logger.warning(f"Malformed user token for task '{task_name}'.")
+            return False
+        return self.validate_action(task_name, {})
+
+    def validate_actions(self, requests: list) -> list:
+        """
+        Validates a batch of actions against one policy snapshot.
+
+        Requests are grouped by action. Each group resolves its action's rules once and is
+        evaluated in one pass (ActionRules.first_violations); requests with the same
+        restricted parameters are evaluated once. The batch is logged as one summary line
+        instead of one line per request.
+
+        :param requests: (action, parameters) pairs
+        :return: One entry per request, in order: None if it is allowed, otherwise the reason it is denied
+        """
+        with metrics.span("policy_validate_batch"):
+            try:
+                snapshot = self._snapshot
+                groups = {}
+                for position, (action, parameters) in enumerate(requests):
+                    groups.setdefault(action, []).append(position)
+
+                reasons = [None] * len(requests)
+                hits = misses = 0
+                for action, positions in groups.items():
+                    rules = snapshot.rules_for(action)
+                    if rules is None:
+                        reason = f"Action '{action}' is not defined in policies."
+                        for position in positions:
+                            reasons[position] = reason
+                        continue
+
+                    shared = {}     # decision key -> positions with the same restricted parameters
+                    evaluate = []   # (decision key or None, positions, cached decision)
+                    for position in positions:
+                        parameters = requests[position][1]
+                        if not isinstance(parameters, dict):
+                            reasons[position] = f"Parameters for action '{action}' must be a dictionary."
+                            continue
+                        key = rules.decision_key(parameters)
+                        if key is None:
+                            evaluate.append((None, [position], None))
+                        else:
+                            shared.setdefault(key, []).append(position)
+
+                    for key, same in shared.items():
+                        decision = None
+                        if self.decisions is not None:
+                            decision = self.decisions.get(snapshot.version, (action, key))
+                            if decision is None:
+                                misses += 1
+                            else:
+                                hits += 1
+                        evaluate.append((key, same, decision))
+
+                    fresh = [(key, same) for key, same, decision in evaluate if decision is None]
+                    violations = iter(rules.first_violations([requests[same[0]][1] for _, same in fresh]))
+                    for key, same, decision in evaluate:
+                        if decision is None:
+                            param = next(violations)
+                            decision = True if param is None else param
+                            if key is not None and self.decisions is not None:
+                                self.decisions.put(snapshot.version, (action, key), decision)
+                        if decision is not True:
+                            reasons[same[0]] = f"Invalid parameter '{decision}' for action '{action}'."
+                            # Denials are rare; name each request's own first offending parameter
+                            for position in same[1:]:
+                                other = rules.first_violation(requests[position][1])
+                                reasons[position] = f"Invalid parameter '{other}' for action '{action}'."
+
+                if hits:
+                    metrics.increment("policy_decision_cache", hits, result="hit")
+                if misses:
+                    metrics.increment("policy_decision_cache", misses, result="miss")
+                denied = sum(reason is not None for reason in reasons)
+                if denied:
+                    logger.warning(f"Policy batch of {len(requests)} actions: {denied} denied.")
+                else:
+                    logger.info(f"Policy batch of {len(requests)} actions: all allowed.")
+                return reasons
+
+            except Exception as e:
+                logger.error(f"Error during batch action validation: {str(e)}")
+                raise PolicyViolationError(f"Batch action validation failed: {str(e)}")
 
     def is_valid_parameter(self, param: str, value: str, action_policy: dict) -> bool:
         """
@@ -69,10 +267,9 @@ class PolicyEngine:
         :return: True if the parameter value is valid, False otherwise
         """
         try:
-            # Implement specific rules for different types of parameters
-            # For example, you could validate file paths, command types, etc.
-            restricted_values = action_policy.get("restricted_values", {}).get(param, [])
-            if value in restricted_values:
+            # Compiled per call; validate_action uses the rules compiled at load time instead
+            rules = ActionRules("", dict(action_policy, restricted_parameters=[param]))
+            if rules.is_restricted(param, value):
                 logger.warning(f"Parameter value '{value}' for '{param}' is restricted.")
                 return False
 
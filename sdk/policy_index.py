@@ -0,0 +1,165 @@
+# policy_index.py
+
+from types import MappingProxyType
+from .pattern_matcher import PatternMatcher
+
+_NO_VALUES = frozenset()
+
+
+class ActionRules:
+    """
+    Compiled restrictions of one action: which parameters are restricted and, per
+    restricted parameter, the set of values it may not take and the patterns its
+    string values may not match.
+    """
+    __slots__ = ("action", "restricted_parameters", "restricted_values", "restricted_patterns", "_unhashable",
+                 "_checks")
+
+    def __init__(self, action: str, action_policy: dict):
+        self.action = action
+        restricted = action_policy.get("restricted_parameters") or ()
+        values = action_policy.get("restricted_values") or {}
+        patterns = action_policy.get("restricted_patterns") or {}
+        if not isinstance(patterns, dict):
+            raise ValueError(f"restricted_patterns of action '{action}' must be a JSON object")
+        # A parameter with pattern rules is restricted without being listed separately
+        self.restricted_parameters = frozenset(restricted) | frozenset(patterns)
+        self.restricted_patterns = MappingProxyType({
+            param: PatternMatcher.from_policy(rules) for param, rules in patterns.items()
+        })
+        compiled = {}
+        unhashable = {}
+        for param in self.restricted_parameters:
+            listed = values.get(param) or ()
+            if isinstance(listed, str):
+                listed = (listed,)
+            hashable, other = _split_hashable(listed)
+            compiled[param] = frozenset(hashable) if hashable else _NO_VALUES
+            if other:
+                unhashable[param] = tuple(other)
+        self.restricted_values = MappingProxyType(compiled)
+        # Lists and dicts cannot go in a frozenset; they are rare and compared one by one
+        self._unhashable = MappingProxyType(unhashable)
+        # Everything a restricted parameter is checked against, resolved with one lookup
+        self._checks = MappingProxyType({
+            param: (compiled[param], unhashable.get(param, ()), self.restricted_patterns.get(param))
+            for param in self.restricted_parameters
+        })
+
+    def is_restricted(self, param: str, value) -> bool:
+        """
+        Whether `value` is a restricted value of `param` or a string matching one of its
+        patterns. Parameters that are not restricted for the action never are.
+        """
+        check = self._checks.get(param)
+        return check is not None and _breaks(check, value)
+
+    def decision_key(self, parameters: dict):
+        """
+        Canonical key of the parameters that can change the decision: the restricted ones,
+        sorted by name. Other parameters are left out, so they do not split cache entries.
+
+        :return: A hashable key, or None if a restricted value is unhashable
+        """
+        restricted = self.restricted_parameters
+        key = tuple(sorted((param, value) for param, value in parameters.items() if param in restricted))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def first_violation(self, parameters: dict):
+        """
+        Returns the first parameter whose value is restricted, or None if there is none.
+        """
+        return self.first_violations((parameters,))[0]
+
+    def first_violations(self, parameter_sets: list) -> list:
+        """
+        Evaluates many requests for this action in one pass; the per-parameter checks are
+        resolved once for the whole group instead of once per request.
+
+        :param parameter_sets: The parameter dictionaries of the requests (a sequence)
+        :return: For each request, its first restricted parameter or None
+        """
+        checks = self._checks
+        if not checks:
+            return [None] * len(parameter_sets)
+        get = checks.get
+        results = []
+        for parameters in parameter_sets:
+            violation = None
+            for param, value in parameters.items():
+                check = get(param)
+                if check is not None and _breaks(check, value):
+                    violation = param
+                    break
+            results.append(violation)
+        return results
+
+
+class PolicyIndex:
+    def __init__(self, policies: dict, version: int = 1):
+        """
+        Immutable decision index compiled once from the loaded policies.
+
+        Restricted parameters and values are held in frozensets, so a lookup costs the
+        same however many values a policy lists. The index is never modified after it is
+        built; build a new one to apply new policies.
+
+        :param policies: The policies as loaded from the policy file
+        :param version: Increases with every reload of the policy file
+        """
+        if not isinstance(policies, dict):
+            raise ValueError(f"Policies must be a JSON object, not {type(policies).__name__}")
+        actions = {}
+        for action, action_policy in policies.items():
+            if not isinstance(action_policy, dict):
+                raise ValueError(f"Policy for action '{action}' must be a JSON object")
+            actions[action] = ActionRules(action, action_policy)
+        self.actions = MappingProxyType(actions)
+        self.policies = policies
+        self.version = version
+
+    def rules_for(self, action: str):
+        """
+        Returns the compiled rules of an action, or None if the action is not defined.
+        """
+        return self.actions.get(action)
+
+    def __contains__(self, action: str) -> bool:
+        return action in self.actions
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+
+def _breaks(check: tuple, value) -> bool:
+    """
+    Whether `value` is one of a parameter's restricted values or matches one of its patterns.
+
+    :param check: (frozenset of hashable values, tuple of unhashable values, PatternMatcher or None)
+    """
+    values, unhashable, matcher = check
+    try:
+        if value in values:
+            return True
+    except TypeError:
+        # Unhashable request value: it can only equal an unhashable policy value
+        pass
+    if unhashable and value in unhashable:
+        return True
+    return matcher is not None and isinstance(value, str) and matcher.matches(value)
+
+
+def _split_hashable(values) -> tuple:
+    hashable, other = [], []
+    for value in values:
+        try:
+            hash(value)
+        except TypeError:
+            other.append(value)
+        else:
+            hashable.append(value)
+    return hashable, other
@@ -0,0 +1,179 @@
+# policy_watcher.py
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+from .config import Config
+from .logging_config import logger
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; followed by a NUL-padded name
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, "inotify_init1") else None
+
+
+class PolicyWatcher:
+    def __init__(self, path: str, on_change, poll_interval: float = Config.POLICY_RELOAD_INTERVAL,
+                 settle: float = 0.05, use_inotify: bool = True):
+        """
+        Calls `on_change()` from a background thread whenever a file is written or replaced.
+
+        Uses inotify on Linux, watching the file's directory so that editors and deploy
+        tools that replace the file by renaming a new one over it are noticed. Elsewhere,
+        or if inotify cannot be set up, it polls the file's modification time, size and inode.
+
+        :param path: The file to watch
+        :param on_change: Callable invoked after each change
+        :param poll_interval: Seconds between checks when polling
+        :param settle: Seconds to wait after an inotify event, so that one save triggers one call
+        :param use_inotify: Set to False to always poll
+        """
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.use_inotify = use_inotify
+        self.mode = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+        self._last_signature = None
+
+    def start(self):
+        """
+        Starts the background thread.
+
+        :return: The watcher
+        """
+        if self._thread is not None:
+            return self
+        self._last_signature = self._signature()
+        if self.use_inotify:
+            self._fd = self._open_inotify()
+        self.mode = "inotify" if self._fd is not None else "poll"
+        target = self._watch_inotify if self._fd is not None else self._watch_poll
+        self._thread = threading.Thread(target=target, name="sudo-policy-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.path} for policy changes ({self.mode}).")
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stops the background thread.
+        """
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _notify(self):
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error(f"Policy change handler failed: {str(e)}")
+
+    def _watch_poll(self):
+        while not self._stop.wait(self.poll_interval):
+            current = self._signature()
+            if current != self._last_signature:
+                self._last_signature = current
+                if current is not None:
+                    self._notify()
+
+    def _open_inotify(self):
+        libc = _load_libc()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logger.warning(f"inotify unavailable ({os.strerror(ctypes.get_errno())}); polling {self.path}.")
+            return None
+        directory = os.path.dirname(self.path).encode()
+        if libc.inotify_add_watch(fd, directory, _WATCH_MASK) < 0:
+            logger.warning(f"Cannot watch {os.path.dirname(self.path)} ({os.strerror(ctypes.get_errno())}); "
+                           f"polling {self.path}.")
+            os.close(fd)
+            return None
+        return fd
+
+    def _read_events(self) -> tuple:
+        """
+        Drains the pending events.
+
+        :return: (whether the watched file changed, whether the directory watch is gone)
+        """
+        name = os.path.basename(self.path).encode()
+        changed = lost = False
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return changed, lost
+                raise
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                _, mask, _, length = _EVENT.unpack_from(data, offset)
+                event_name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW or event_name == name:
+                    changed = True
+                if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    lost = True
+
+    def _watch_inotify(self):
+        try:
+            while not self._stop.is_set():
+                readable, _, _ = select.select([self._fd], [], [], self.poll_interval)
+                if not readable:
+                    continue
+                changed, lost = self._read_events()
+                if changed:
+                    # Let the writer finish, then fold its remaining events into this change
+                    self._stop.wait(self.settle)
+                    lost = self._read_events()[1] or lost
+                    self._last_signature = self._signature()
+                    self._notify()
+                if lost:
+                    logger.warning(f"Policy directory watch was removed; polling {self.path}.")
+                    self.mode = "poll"
+                    self._watch_poll()
+                    return
+        except (OSError, ValueError) as e:
+            if not self._stop.is_set():
+                logger.error(f"Policy watcher failed, falling back to polling: {str(e)}")
+                self.mode = "poll"
+                self._watch_poll()
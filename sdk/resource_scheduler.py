@@ -0,0 +1,301 @@
+# resource_scheduler.py
+
+import asyncio
+import os
+import threading
+import time
+from collections import namedtuple
+from .errors import ContainerError
+from .logging_config import logger
+
+# CPU cores and memory (MiB) a task asks for; also the cgroup limits of its container
+ResourceRequest = namedtuple("ResourceRequest", ["cpus", "memory_mb"])
+# A request bound to the Docker host its capacity was reserved on
+Placement = namedtuple("Placement", ["cpus", "memory_mb", "host"])
+
+# Returned by ResourceScheduler._place when a request fits on no host (None names the default host)
+_UNPLACED = object()
+
+
+def parse_resources(resources: dict, default: ResourceRequest) -> ResourceRequest:
+    """
+    Builds a ResourceRequest from a task's "resources" entry, filling gaps from the default.
+
+    :param resources: Dictionary with optional "cpus" and "memory_mb" keys (or None)
+    :param default: The request used for missing values
+    :return: The resulting ResourceRequest
+    """
+    if not resources:
+        return default
+    request = ResourceRequest(
+        float(resources.get("cpus", default.cpus)),
+        int(resources.get("memory_mb", default.memory_mb)),
+    )
+    if request.cpus <= 0 or request.memory_mb <= 0:
+        raise ValueError(f"Resource requests must be positive, got {request}")
+    return request
+
+
+def host_memory_mb() -> int:
+    """
+    Returns the physical memory of the host in MiB (0 if it cannot be determined).
+    """
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return 0
+
+
+class Reservation:
+    """
+    Capacity granted to one task. Release it (or use it as a context manager) when the task ends.
+    """
+    def __init__(self, scheduler, request: ResourceRequest, host: str = None):
+        self.scheduler = scheduler
+        self.request = request
+        self.host = host
+        self.released = False
+
+    @property
+    def placement(self):
+        """
+        The request to start the task's container with: a Placement naming the host the
+        capacity was reserved on, or the plain request when the scheduler has one host.
+        """
+        if self.host is None:
+            return self.request
+        return Placement(self.request.cpus, self.request.memory_mb, self.host)
+
+    def release(self):
+        self.scheduler.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class _Waiter:
+    def __init__(self, request: ResourceRequest, grant):
+        self.request = request
+        self.grant = grant
+        self.enqueued_at = time.monotonic()
+        self.reservation = None
+
+
+class ResourceScheduler:
+    def __init__(self, cpus: float, memory_mb: int, backfill_window: float = 5.0, hosts: list = None,
+                 host_loads=None):
+        """
+        Admits tasks onto the hosts' CPU and memory capacity.
+
+        Tasks that fit are admitted immediately; the rest wait in arrival order. When
+        capacity frees up, waiting tasks are packed in first-fit order, so small tasks
+        can fill gaps behind a large one. Once the oldest waiter has waited longer than
+        `backfill_window`, nothing may overtake it until it has been admitted.
+
+        With several hosts, each has its own capacity and a task is admitted onto the
+        one with the most free CPUs among those it fits on; its reservation names that
+        host. A task never spans hosts, so it must fit on one of them. Given `host_loads`,
+        only the hosts it reports are used, and the one with the lowest load wins; free
+        CPUs break ties.
+
+        :param cpus: CPU cores available to tasks on each host
+        :param memory_mb: Memory (MiB) available to tasks on each host
+        :param backfill_window: Seconds the oldest waiter may be overtaken by smaller tasks
+        :param hosts: Names of the hosts, e.g. Docker endpoint URLs (default: one unnamed host)
+        :param host_loads: Optional callable returning {host: load} for the hosts that may take
+                           new tasks, e.g. MultiHostTransport.host_loads
+        """
+        if cpus <= 0 or memory_mb <= 0:
+            raise ValueError("Scheduler capacity must be positive")
+        self.cpus = float(cpus)
+        self.memory_mb = int(memory_mb)
+        self.backfill_window = backfill_window
+        self.hosts = list(hosts) if hosts else [None]
+        self.host_loads = host_loads
+
+        self._lock = threading.Lock()
+        self._used = {host: [0.0, 0] for host in self.hosts}  # host -> [cpus, memory_mb] in use
+        self._waiters = []
+
+    def acquire(self, request: ResourceRequest, timeout: float = None) -> Reservation:
+        """
+        Blocks until the request fits on the host and reserves it.
+
+        :param request: The resources the task needs
+        :param timeout: Seconds to wait (None waits forever)
+        :return: A Reservation to release when the task ends
+        """
+        granted = threading.Event()
+        waiter = self._enqueue(request, lambda: granted.set())
+        if granted.wait(timeout):
+            return waiter.reservation
+        if self._cancel(waiter):
+            raise ContainerError("scheduler", f"Timed out waiting for {request.cpus} CPUs / {request.memory_mb} MiB")
+        # Granted between the timeout and the cancellation
+        return waiter.reservation
+
+    async def acquire_async(self, request: ResourceRequest) -> Reservation:
+        """
+        Async counterpart of acquire(); waits without blocking the event loop.
+
+        :param request: The resources the task needs
+        :return: A Reservation to release when the task ends
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def grant():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._enqueue(request, grant)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not self._cancel(waiter):
+                waiter.reservation.release()
+            raise
+        return waiter.reservation
+
+    def release(self, reservation: Reservation):
+        """
+        Returns a reservation's capacity and admits waiting tasks that now fit.
+
+        :param reservation: The reservation to release
+        """
+        with self._lock:
+            if reservation.released:
+                return
+            reservation.released = True
+            used = self._used[reservation.host]
+            used[0] -= reservation.request.cpus
+            used[1] -= reservation.request.memory_mb
+            granted = self._dispatch_locked()
+        for waiter in granted:
+            waiter.grant()
+
+    def relocate(self, reservation: Reservation, host: str):
+        """
+        Moves a reservation to another host, e.g. when its container had to be started
+        elsewhere. The capacity is taken on the new host even if that overcommits it, since
+        the task runs there either way; waiting tasks may use what the old host got back.
+
+        :param reservation: The reservation to move
+        :param host: The host the task actually runs on
+        """
+        with self._lock:
+            if reservation.released or reservation.host == host or host not in self._used:
+                return
+            old, new = self._used[reservation.host], self._used[host]
+            old[0] -= reservation.request.cpus
+            old[1] -= reservation.request.memory_mb
+            new[0] += reservation.request.cpus
+            new[1] += reservation.request.memory_mb
+            reservation.host = host
+            granted = self._dispatch_locked()
+        for waiter in granted:
+            waiter.grant()
+
+    def stats(self) -> dict:
+        """
+        Returns current capacity usage and queue length, summed over all hosts and,
+        with several hosts, per host under "hosts".
+        """
+        with self._lock:
+            stats = {
+                "cpus_total": self.cpus * len(self.hosts),
+                "cpus_used": round(sum(used[0] for used in self._used.values()), 6),
+                "memory_total_mb": self.memory_mb * len(self.hosts),
+                "memory_used_mb": sum(used[1] for used in self._used.values()),
+                "queued": len(self._waiters),
+            }
+            if len(self.hosts) > 1:
+                stats["hosts"] = {
+                    host: {"cpus_used": round(used[0], 6), "memory_used_mb": used[1]}
+                    for host, used in self._used.items()
+                }
+            return stats
+
+    def _enqueue(self, request: ResourceRequest, grant) -> _Waiter:
+        if request.cpus > self.cpus or request.memory_mb > self.memory_mb:
+            raise ContainerError("scheduler", f"Request for {request.cpus} CPUs / {request.memory_mb} MiB "
+                                              f"exceeds host capacity of {self.cpus} CPUs / {self.memory_mb} MiB")
+        waiter = _Waiter(request, grant)
+        with self._lock:
+            self._waiters.append(waiter)
+            granted = self._dispatch_locked()
+        for admitted in granted:
+            admitted.grant()
+        if waiter.reservation is None:
+            logger.debug(f"Queued task needing {request.cpus} CPUs / {request.memory_mb} MiB; host is full.")
+        return waiter
+
+    def _cancel(self, waiter: _Waiter) -> bool:
+        """
+        Removes a waiter that gave up. Returns False if it had already been granted.
+        """
+        with self._lock:
+            if waiter.reservation is not None:
+                return False
+            self._waiters.remove(waiter)
+            granted = self._dispatch_locked()
+        for admitted in granted:
+            admitted.grant()
+        return True
+
+    def _loads(self) -> dict:
+        """
+        Returns {host: load} for the hosts that may take new tasks.
+        """
+        if self.host_loads is None or len(self.hosts) == 1:
+            return dict.fromkeys(self._used, 0)
+        try:
+            loads = {host: load for host, load in self.host_loads().items() if host in self._used}
+        except Exception as e:
+            logger.warning(f"Failed to rank hosts, placing by free capacity: {str(e)}")
+            loads = None
+        # With every host drained, place by capacity; starting the container then probes them
+        return loads or dict.fromkeys(self._used, 0)
+
+    def _place(self, request: ResourceRequest, loads: dict):
+        """
+        Returns the host with the lowest load, then the most free CPUs, that the request
+        fits on, or _UNPLACED.
+        """
+        best, best_rank = _UNPLACED, None
+        for host, load in loads.items():
+            used = self._used[host]
+            if used[0] + request.cpus > self.cpus + 1e-9 or used[1] + request.memory_mb > self.memory_mb:
+                continue
+            rank = (load, used[0])
+            if best_rank is None or rank < best_rank:
+                best, best_rank = host, rank
+        return best
+
+    def _dispatch_locked(self) -> list:
+        """
+        Grants waiting requests that fit, in first-fit order. Must be called with the lock held;
+        the caller notifies the returned waiters after releasing it.
+        """
+        granted = []
+        remaining = []
+        head_blocked = False
+        now = time.monotonic()
+        loads = self._loads() if self._waiters else None
+        for waiter in self._waiters:
+            host = _UNPLACED if head_blocked else self._place(waiter.request, loads)
+            if host is not _UNPLACED:
+                used = self._used[host]
+                used[0] += waiter.request.cpus
+                used[1] += waiter.request.memory_mb
+                waiter.reservation = Reservation(self, waiter.request, host)
+                granted.append(waiter)
+                continue
+            remaining.append(waiter)
+            # A waiter past the backfill window blocks everything queued behind it
+            if len(remaining) == 1 and now - waiter.enqueued_at >= self.backfill_window:
+                head_blocked = True
+        self._waiters = remaining
+        return granted
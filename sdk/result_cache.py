@@ -0,0 +1,238 @@
+# result_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from .logging_config import logger
+
+
+def task_fingerprint(task: dict, image: str):
+    """
+    Returns a canonical hash of a prepared task: the same name, parameters and image
+    always give the same key, whatever the order of the parameter keys.
+
+    Resource requests and timeouts do not change what a task computes and are not
+    part of the key. Tasks that upload files, or whose parameters are not plain JSON
+    values, have no fingerprint and are never cached.
+
+    :param task: The prepared task ({"name": ..., "params": ...})
+    :param image: The container image the task runs in
+    :return: A hex digest, or None if the task cannot be cached
+    """
+    if task.get("files"):
+        return None
+    try:
+        canonical = json.dumps({"name": task["name"], "params": task.get("params"), "image": image},
+                               sort_keys=True, separators=(",", ":"), allow_nan=False)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU store. Evicts the least recently used entry once max_entries is reached.
+    """
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (expires_at, value), most recently used last
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float):
+        """
+        :return: (found, value)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= now:
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[1]
+
+    def put(self, key: str, value, expires_at: float) -> int:
+        """
+        :return: Number of entries evicted to make room
+        """
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    On-disk LRU store, shared by every process pointing at the same file. Values must be JSON-serializable.
+    """
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+    def get(self, key: str, now: float):
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False, None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return False, None
+            # Wall-clock time so that several processes agree on recency
+            self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return True, json.loads(row[0])
+
+    def put(self, key: str, value, expires_at: float) -> int:
+        data = json.dumps(value)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                               (key, data, expires_at, time.time()))
+            excess = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+            if excess <= 0:
+                return 0
+            self._conn.execute("DELETE FROM results WHERE key IN "
+                               "(SELECT key FROM results ORDER BY last_used LIMIT ?)", (excess,))
+            return excess
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class ResultCache:
+    def __init__(self, backend=None, default_ttl: float = 0.0, ttls: dict = None):
+        """
+        Caches the results of deterministic tasks.
+
+        Only successful results are stored; error results are always recomputed.
+        A TTL of 0 disables caching, so by default only the tasks listed in `ttls`
+        are cached: a task is cached only once it is known to be deterministic.
+
+        :param backend: A MemoryCacheBackend (default) or SQLiteCacheBackend
+        :param default_ttl: Seconds a result stays valid for tasks not listed in ttls
+        :param ttls: Mapping of task name to TTL in seconds, overriding default_ttl
+        """
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+    def ttl(self, task_name: str) -> float:
+        return self.ttls.get(task_name, self.default_ttl)
+
+    def get(self, task: dict, image: str):
+        """
+        Looks up the result of a prepared task.
+
+        :return: (hit, result)
+        """
+        key = task_fingerprint(task, image) if self.ttl(task["name"]) > 0 else None
+        if key is None:
+            return False, None
+        try:
+            hit, value = self.backend.get(key, time.time())
+        except Exception as e:
+            logger.warning(f"Result cache lookup failed for task '{task['name']}': {str(e)}")
+            hit, value = False, None
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+        return hit, value
+
+    def put(self, task: dict, image: str, result):
+        """
+        Stores the result of a prepared task, unless it is an error result or the task is not cacheable.
+        """
+        ttl = self.ttl(task["name"])
+        if ttl <= 0 or (isinstance(result, dict) and "error" in result):
+            return
+        key = task_fingerprint(task, image)
+        if key is None:
+            return
+        try:
+            evicted = self.backend.put(key, result, time.time() + ttl)
+        except Exception as e:
+            logger.warning(f"Failed to cache result of task '{task['name']}': {str(e)}")
+            return
+        with self._lock:
+            self._stores += 1
+            self._evictions += evicted
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters and the number of cached entries.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+                "stores": self._stores,
+                "evictions": self._evictions,
+                "entries": len(self.backend),
+            }
+
+
+def create_result_cache(backend: str, path: str = None, max_entries: int = 1024, default_ttl: float = 0.0,
+                        ttls: dict = None) -> ResultCache:
+    """
+    Creates a result cache with the named backend.
+
+    :param backend: 'memory' or 'sqlite'
+    :param path: Database file for the 'sqlite' backend
+    :param max_entries: Maximum number of cached results
+    :param default_ttl: Seconds a result stays valid for tasks not listed in ttls (0: not cached)
+    :param ttls: Per-task-name TTLs
+    :return: A ResultCache
+    """
+    if backend == "memory":
+        store = MemoryCacheBackend(max_entries)
+    elif backend == "sqlite":
+        store = SQLiteCacheBackend(path, max_entries)
+    else:
+        raise ValueError(f"Unknown result cache backend: {backend}")
+    return ResultCache(store, default_ttl=default_ttl, ttls=ttls)
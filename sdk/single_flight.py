@@ -0,0 +1,105 @@
+# single_flight.py
+
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the work and
+    every caller that arrives while it is running gets its result (or exception).
+    Followers receive a deep copy of the result, so no caller sees another's changes
+    to it. Nothing is remembered once the call completes.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}        # key -> concurrent.futures.Future of the running call
+        self._async_calls = {}  # (event loop, key) -> asyncio.Future of the running call
+        self._coalesced = 0
+
+    def do(self, key, fn, *args, follower_timeout: float = None, **kwargs):
+        """
+        Runs fn(*args, **kwargs) unless a call with the same key is already running,
+        in which case waits for that call instead.
+
+        :param key: Hashable identity of the work
+        :param fn: The callable to run
+        :param follower_timeout: Seconds to wait for a running call before giving up (None waits for it to finish)
+        :return: The result of the (possibly shared) call
+        :raises TimeoutError: If this caller joined a running call that did not finish within follower_timeout
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self._coalesced += 1
+        if not leader:
+            try:
+                return copy.deepcopy(future.result(follower_timeout))
+            except FutureTimeoutError:
+                raise TimeoutError(f"Shared call did not finish within {follower_timeout:g}s")
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async(self, key, coroutine_fn, *args, follower_timeout: float = None, **kwargs):
+        """
+        Async counterpart of do(). Calls are only coalesced within one event loop.
+
+        :param key: Hashable identity of the work
+        :param coroutine_fn: Coroutine function to await
+        :param follower_timeout: Seconds to wait for a running call before giving up (None waits for it to finish)
+        :return: The result of the (possibly shared) call
+        :raises TimeoutError: If this caller joined a running call that did not finish within follower_timeout
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            future = self._async_calls.get((loop, key))
+            leader = future is None
+            if leader:
+                future = self._async_calls[(loop, key)] = loop.create_future()
+            else:
+                self._coalesced += 1
+        if not leader:
+            # Shielded so that a cancelled or timed-out follower does not cancel the shared call
+            try:
+                return copy.deepcopy(await asyncio.wait_for(asyncio.shield(future), follower_timeout))
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Shared call did not finish within {follower_timeout:g}s")
+
+        try:
+            result = await coroutine_fn(*args, **kwargs)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark the exception as retrieved when no follower was waiting
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._async_calls[(loop, key)]
+
+    def stats(self) -> dict:
+        """
+        Returns the number of calls in flight and how many callers joined a running call.
+        """
+        with self._lock:
+            return {"in_flight": len(self._calls) + len(self._async_calls), "coalesced": self._coalesced}
@@ -0,0 +1,161 @@
+# task_executor.py
+
+import heapq
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from .logging_config import logger
+
+# Priority levels; lower values run first. Any integer may be used.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+
+class TaskExecutor:
+    def __init__(self, workers: int = 8, max_queue_size: int = 1000, name: str = "sudo-task-worker"):
+        """
+        Runs submitted callables on a fixed set of worker threads.
+
+        Submissions wait in a bounded priority queue: higher-priority work is picked
+        first and submissions of equal priority run in arrival order. When the queue
+        is full, submit() blocks (or raises queue.Full), which pushes back on producers.
+
+        :param workers: Number of worker threads, started on first use
+        :param max_queue_size: Maximum number of submissions waiting for a worker
+        :param name: Prefix for the worker thread names
+        """
+        if workers < 1 or max_queue_size < 1:
+            raise ValueError("TaskExecutor needs at least one worker and a queue size of at least one")
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._queue = []    # heap of (priority, sequence, enqueued_at, future, fn, args, kwargs)
+        self._sequence = itertools.count()
+        self._threads = []
+        self._shutdown = False
+
+        self._busy = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def submit(self, fn, *args, priority: int = PRIORITY_NORMAL, block: bool = True,
+               queue_timeout: float = None, **kwargs) -> Future:
+        """
+        Queues fn(*args, **kwargs) and returns a Future for its result.
+
+        :param fn: The callable to run
+        :param priority: Lower values run first (see PRIORITY_HIGH / PRIORITY_NORMAL / PRIORITY_LOW)
+        :param block: Wait for queue space when the queue is full; otherwise raise queue.Full at once
+        :param queue_timeout: Seconds to wait for queue space before raising queue.Full (None waits forever)
+        :return: A concurrent.futures.Future
+        """
+        deadline = None if queue_timeout is None else time.monotonic() + queue_timeout
+        with self._not_full:
+            while True:
+                if self._shutdown:
+                    raise RuntimeError("Cannot submit to an executor that has been shut down")
+                if len(self._queue) < self.max_queue_size:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    self._rejected += 1
+                    raise queue.Full(f"Task queue is full ({self.max_queue_size} waiting)")
+                self._not_full.wait(remaining)
+
+            future = Future()
+            heapq.heappush(self._queue, (priority, next(self._sequence), time.monotonic(), future, fn, args, kwargs))
+            self._submitted += 1
+            if len(self._threads) < self.workers and self._busy + len(self._queue) > len(self._threads):
+                self._start_worker_locked()
+            self._not_empty.notify()
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """
+        Stops accepting submissions. Queued work still runs unless cancel_pending is set.
+
+        :param wait: Block until the workers have exited
+        :param cancel_pending: Cancel submissions that have not started yet
+        """
+        with self._lock:
+            self._shutdown = True
+            if cancel_pending:
+                pending, self._queue = self._queue, []
+                for entry in pending:
+                    entry[3].cancel()
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def stats(self) -> dict:
+        """
+        Returns queue depth, worker usage and queue wait times (seconds) for sizing the executor.
+        """
+        with self._lock:
+            now = time.monotonic()
+            started = self._completed + self._busy
+            return {
+                "workers": self.workers,
+                "busy": self._busy,
+                "queue_depth": len(self._queue),
+                "max_queue_size": self.max_queue_size,
+                "oldest_wait": max((now - entry[2] for entry in self._queue), default=0.0),
+                "wait_time_avg": self._total_wait / started if started else 0.0,
+                "wait_time_max": self._max_wait,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def _start_worker_locked(self):
+        thread = threading.Thread(target=self._work, name=f"{self.name}-{len(self._threads)}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _work(self):
+        while True:
+            with self._not_empty:
+                while not self._queue and not self._shutdown:
+                    self._not_empty.wait()
+                if not self._queue:
+                    return
+                _, _, enqueued_at, future, fn, args, kwargs = heapq.heappop(self._queue)
+                waited = time.monotonic() - enqueued_at
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+                self._busy += 1
+                self._not_full.notify()
+
+            run = future.set_running_or_notify_cancel()
+            result = error = None
+            if run:
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    error = e
+            # Count the work as done before the caller can observe the future
+            with self._lock:
+                self._busy -= 1
+                self._completed += 1
+            if not run:
+                continue
+            try:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Task executor worker failed to complete a future: {str(e)}")
@@ -0,0 +1,132 @@
+# worker.py
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from .config import Config
+from .durable_queue import DurableQueue
+from .logging_config import logger
+
+
+class QueueWorker:
+    def __init__(self, durable_queue: DurableQueue, orchestrator, worker_id: str = None,
+                 poll_interval: float = Config.WORKER_POLL_INTERVAL):
+        """
+        Runs jobs from a DurableQueue through SudoOrchestrator.execute_task.
+
+        Error results are retried, except permission denials, which are final and acked.
+
+        :param durable_queue: The queue to pull jobs from
+        :param orchestrator: Orchestrator that executes the tasks
+        :param worker_id: Identifies this worker's leases (default: host and process ID)
+        :param poll_interval: Seconds to sleep when the queue is empty
+        """
+        self.queue = durable_queue
+        self.orchestrator = orchestrator
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+
+    def run_once(self) -> bool:
+        """
+        Leases and runs one job.
+
+        :return: False if no job was ready
+        """
+        job = self.queue.lease(self.worker_id)
+        if job is None:
+            return False
+        try:
+            result = self.orchestrator.execute_task(job.task_name, job.task_params, job.user_token,
+                                                    resources=job.resources, timeout=job.timeout)
+        except Exception as e:
+            self.queue.nack(job, self.worker_id, str(e))
+            return True
+        if isinstance(result, dict) and "error" in result and not result.get("denied"):
+            self.queue.nack(job, self.worker_id, result["error"])
+        else:
+            self.queue.ack(job, self.worker_id, result)
+        return True
+
+    def run(self):
+        """
+        Processes jobs until stop() is called.
+        """
+        logger.info(f"Queue worker {self.worker_id} started on {self.queue.path}.")
+        while not self.stop_event.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                logger.error(f"Queue worker {self.worker_id} failed to process a job: {str(e)}")
+            self.stop_event.wait(self.poll_interval)
+        logger.info(f"Queue worker {self.worker_id} stopped.")
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def _run_worker_process(queue_path: str, poll_interval: float):
+    # Imported here so each process builds its own Docker connections after the fork
+    from .container_manager import ContainerManager
+    from .orchestrator import SudoOrchestrator
+    from .policy_engine import PolicyEngine
+
+    durable_queue = DurableQueue(queue_path, lease_timeout=Config.TASK_QUEUE_LEASE_TIMEOUT,
+                                 max_attempts=Config.TASK_QUEUE_MAX_ATTEMPTS,
+                                 backoff_base=Config.TASK_QUEUE_BACKOFF_BASE,
+                                 backoff_max=Config.TASK_QUEUE_BACKOFF_MAX)
+    container_manager = ContainerManager(Config.CONTAINER_IMAGE)
+    policy_engine = PolicyEngine(Config.POLICY_FILE)
+    orchestrator = SudoOrchestrator(policy_engine, container_manager)
+    worker = QueueWorker(durable_queue, orchestrator, poll_interval=poll_interval)
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+    try:
+        worker.run()
+    finally:
+        policy_engine.close()
+        container_manager.close()
+        durable_queue.close()
+
+
+def main(argv: list = None):
+    """
+    Entry point of the `sudo-worker` command: runs N worker processes against a durable queue.
+    """
+    parser = argparse.ArgumentParser(prog="sudo-worker", description="Run tasks from the durable task queue.")
+    parser.add_argument("--queue", default=Config.TASK_QUEUE_PATH, help="SQLite queue database")
+    parser.add_argument("--processes", type=int, default=Config.WORKER_PROCESSES,
+                        help="Number of worker processes")
+    parser.add_argument("--poll-interval", type=float, default=Config.WORKER_POLL_INTERVAL,
+                        help="Seconds to wait when the queue is empty")
+    args = parser.parse_args(argv)
+
+    if args.processes <= 1:
+        _run_worker_process(args.queue, args.poll_interval)
+        return
+
+    processes = [
+        multiprocessing.Process(target=_run_worker_process, args=(args.queue, args.poll_interval),
+                                name=f"sudo-worker-{index}")
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# workflow.py
+
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
+from .config import Config
+from .errors import ValidationError
+from .logging_config import logger
+from .task_executor import TaskExecutor
+
+
+class WorkflowStep:
+    """
+    One step of a workflow: a callable that receives the outputs of the steps it depends on.
+    """
+    def __init__(self, name: str, action, depends_on: tuple = (), pass_token: bool = False):
+        """
+        :param name: Unique name of the step within its workflow
+        :param action: Callable (inputs) -> output, where inputs maps each dependency's name to its output
+        :param depends_on: Names of the steps that must complete first
+        :param pass_token: Call the action as (inputs, user_token) instead
+        """
+        self.name = name
+        self.action = action
+        self.depends_on = tuple(depends_on)
+        self.pass_token = pass_token
+
+    def run(self, inputs: dict, user_token: str = None):
+        if self.pass_token:
+            return self.action(inputs, user_token)
+        return self.action(inputs)
+
+
+class WorkflowRun:
+    """
+    Progress of one workflow execution. Passing it back to Workflow.run() resumes
+    the workflow: completed steps are not run again.
+    """
+    def __init__(self, workflow_name: str, outputs: dict = None):
+        self.workflow_name = workflow_name
+        self.outputs = dict(outputs or {})  # step name -> output of completed steps
+        self.errors = {}                    # step name -> error message of failed steps
+        self.skipped = []                   # steps not run because a dependency failed
+        self.status = "pending"
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == "succeeded"
+
+    def save(self, path: str):
+        """
+        Writes the completed step outputs to a JSON file (atomically). Outputs must be JSON-serializable.
+
+        :param path: The file to write
+        """
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({"workflow": self.workflow_name, "outputs": self.outputs}, f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Reads a run saved with save().
+
+        :param path: The file to read
+        :return: A WorkflowRun holding the completed step outputs
+        """
+        with open(path, 'r') as f:
+            state = json.load(f)
+        return cls(state["workflow"], state.get("outputs"))
+
+
+class Workflow:
+    def __init__(self, name: str, orchestrator=None, max_parallel: int = Config.WORKFLOW_MAX_PARALLEL, fail_fast: bool = True):
+        """
+        A set of steps with dependencies, run so that independent steps execute concurrently.
+
+        :param name: Name of the workflow (used in logs and saved state)
+        :param orchestrator: SudoOrchestrator used by task steps
+        :param max_parallel: Maximum number of steps running at once
+        :param fail_fast: Stop starting new steps after the first failure. When False,
+                          branches that do not depend on the failed step keep running.
+        """
+        self.name = name
+        self.orchestrator = orchestrator
+        self.max_parallel = max_parallel
+        self.fail_fast = fail_fast
+        self.steps = {}
+
+    def step(self, name: str, action=None, depends_on: tuple = ()):
+        """
+        Adds a step. Can also be used as a decorator: @workflow.step("name", depends_on=[...]).
+
+        :param name: Unique name of the step
+        :param action: Callable (inputs) -> output
+        :param depends_on: Names of the steps whose outputs this step needs
+        :return: The workflow (or, as a decorator, the decorated function)
+        """
+        if action is None:
+            def decorator(function):
+                self.step(name, function, depends_on)
+                return function
+            return decorator
+        return self._add(WorkflowStep(name, action, depends_on))
+
+    def task(self, name: str, task_name: str, params=None, depends_on: tuple = (),
+             resources: dict = None, timeout: float = None):
+        """
+        Adds a step that runs a task through the orchestrator (permission check included).
+
+        :param name: Unique name of the step
+        :param task_name: The task to execute
+        :param params: Task parameters, or a callable (inputs) -> parameters built from dependency outputs
+        :param depends_on: Names of the steps that must complete first
+        :param resources: Optional resource request for the task
+        :param timeout: Optional deadline in seconds for the task
+        :return: The workflow
+        """
+        def run_task(inputs, user_token):
+            if self.orchestrator is None:
+                raise ValidationError(name, "Task steps need a workflow created with an orchestrator")
+            task_params = params(inputs) if callable(params) else (params or {})
+            result = self.orchestrator.execute_task(task_name, task_params, user_token,
+                                                    resources=resources, timeout=timeout)
+            if isinstance(result, dict) and "error" in result:
+                raise RuntimeError(result["error"])
+            return result
+
+        return self._add(WorkflowStep(name, run_task, depends_on, pass_token=True))
+
+    def run(self, user_token: str = None, run: WorkflowRun = None, state_file: str = None) -> WorkflowRun:
+        """
+        Runs the workflow, starting each step as soon as its dependencies have completed.
+
+        :param user_token: Token passed to task steps for the permission check
+        :param run: A previous (failed) run to resume; its completed steps are skipped
+        :param state_file: JSON file recording completed steps. If it exists, the run resumes
+                           from it; it is updated after every completed step.
+        :return: The WorkflowRun with the outputs, errors and final status
+        """
+        self.validate()
+        if run is None and state_file and os.path.exists(state_file):
+            run = WorkflowRun.load(state_file)
+        run = run or WorkflowRun(self.name)
+        run.outputs = {name: output for name, output in run.outputs.items() if name in self.steps}
+        run.errors = {}
+        run.skipped = []
+        run.status = "running"
+
+        pending = [name for name in self.steps if name not in run.outputs]
+        if len(pending) < len(self.steps):
+            logger.info(f"Resuming workflow '{self.name}' with {len(self.steps) - len(pending)} steps already completed.")
+
+        executor = TaskExecutor(workers=self.max_parallel, max_queue_size=max(len(pending), 1),
+                                name=f"sudo-workflow-{self.name}")
+        running = {}
+        try:
+            while True:
+                if not (run.errors and self.fail_fast):
+                    for name in [n for n in pending if all(d in run.outputs for d in self.steps[n].depends_on)]:
+                        pending.remove(name)
+                        step = self.steps[name]
+                        inputs = {dependency: run.outputs[dependency] for dependency in step.depends_on}
+                        running[executor.submit(step.run, inputs, user_token)] = name
+                if not running:
+                    break
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        run.outputs[name] = future.result()
+                    except Exception as e:
+                        run.errors[name] = str(e)
+                        logger.error(f"Workflow '{self.name}' step '{name}' failed: {str(e)}")
+                        continue
+                    if state_file:
+                        run.save(state_file)
+        finally:
+            executor.shutdown(wait=False, cancel_pending=True)
+
+        run.skipped = pending
+        run.status = "failed" if run.errors or pending else "succeeded"
+        if run.succeeded:
+            logger.info(f"Workflow '{self.name}' completed {len(self.steps)} steps.")
+        else:
+            logger.error(f"Workflow '{self.name}' failed: {len(run.errors)} failed, {len(pending)} not run.")
+        return run
+
+    def validate(self):
+        """
+        Checks that every dependency exists and that the steps form no cycle.
+
+        :raises ValidationError: If the workflow is not a valid DAG
+        """
+        for step in self.steps.values():
+            for dependency in step.depends_on:
+                if dependency not in self.steps:
+                    raise ValidationError(step.name, f"Depends on unknown step '{dependency}'")
+
+        state = {}  # name -> 1 while visiting, 2 when done
+
+        def visit(name, path):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValidationError(name, f"Dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = 1
+            for dependency in self.steps[name].depends_on:
+                visit(dependency, path + [name])
+            state[name] = 2
+
+        for name in self.steps:
+            visit(name, [])
+
+    def _add(self, step: WorkflowStep):
+        if step.name in self.steps:
+            raise ValidationError(step.name, f"Duplicate step in workflow '{self.name}'")
+        self.steps[step.name] = step
+        return self
@@ -35,6 +35,7 @@ setup(
     entry_points={
         'console_scripts': [
             'sudo-sdk-cli=sdk.cli:main',  # Example CLI command
+            'sudo-worker=sdk.worker:main',
         ],
     },
 )
@@ -0,0 +1,132 @@
+# test_async_docker.py
+
+import asyncio
+import json
+import struct
+import pytest
+from sdk.async_docker import AsyncEngineClient
+from sdk.errors import ContainerError
+
+
+def frame(stream_id: int, data: bytes) -> bytes:
+    return struct.pack('>BxxxL', stream_id, len(data)) + data
+
+
+class FakeEngine:
+    """
+    Minimal Engine API stand-in serving the exec endpoints over a unix socket.
+    """
+    def __init__(self):
+        self.connections = 0
+        self.requests = []
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, _ = request_line.decode().split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line == b"\r\n":
+                    break
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            await reader.readexactly(int(headers.get("content-length", 0)))
+            self.requests.append((method, path))
+
+            if path.endswith("/exec") and method == "POST":
+                self._respond(writer, 201, json.dumps({"Id": "exec_1"}).encode())
+            elif path.endswith("/start"):
+                writer.write(b"HTTP/1.1 101 UPGRADED\r\nConnection: Upgrade\r\nUpgrade: tcp\r\n\r\n")
+                writer.write(frame(1, b"hello ") + frame(2, b"warn") + frame(1, b"world"))
+                await writer.drain()
+                break
+            elif "/exec/" in path and path.endswith("/json"):
+                body = json.dumps({"ExitCode": 7}).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n")
+                writer.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(body), body))
+            else:
+                self._respond(writer, 404, b'{"message": "not found"}')
+            await writer.drain()
+        writer.close()
+
+    @staticmethod
+    def _respond(writer, status, body):
+        writer.write(b"HTTP/1.1 %d X\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s"
+                     % (status, len(body), body))
+
+
+def run_with_engine(tmp_path, scenario):
+    engine = FakeEngine()
+    socket_path = str(tmp_path / "docker.sock")
+
+    async def main():
+        server = await asyncio.start_unix_server(engine.handle, path=socket_path)
+        client = AsyncEngineClient(f"unix://{socket_path}", "1.41")
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+
+    return engine, asyncio.run(main())
+
+
+def test_exec_run_collects_demultiplexed_output(tmp_path):
+    """
+    Test that an exec's stdout and stderr frames are separated and the exit code is returned.
+    """
+    engine, result = run_with_engine(tmp_path, lambda client: client.exec_run("container_id_123", ["echo", "hi"]))
+
+    assert result == (7, b"hello world", b"warn")
+    assert engine.requests[0] == ("POST", "/v1.41/containers/container_id_123/exec")
+
+
+def test_requests_reuse_keep_alive_connection(tmp_path):
+    """
+    Test that JSON requests share one connection while exec streams get their own.
+    """
+    async def scenario(client):
+        for _ in range(3):
+            await client.exec_run("container_id_123", ["true"])
+
+    engine, _ = run_with_engine(tmp_path, scenario)
+
+    # One pooled connection for create/inspect plus one hijacked connection per exec
+    assert engine.connections == 4
+
+
+def test_error_status_raises_container_error(tmp_path):
+    """
+    Test that an error response from the engine raises ContainerError.
+    """
+    async def scenario(client):
+        with pytest.raises(ContainerError, match="404"):
+            await client.request_json("GET", "/containers/missing/json")
+
+    run_with_engine(tmp_path, scenario)
+
+
+def test_close_nowait_after_loop_closed(tmp_path):
+    """
+    Test that idle connections can be dropped once the client's event loop is gone.
+    """
+    engine = FakeEngine()
+    socket_path = str(tmp_path / "docker.sock")
+    client = AsyncEngineClient(f"unix://{socket_path}", "1.41")
+
+    async def main():
+        server = await asyncio.start_unix_server(engine.handle, path=socket_path)
+        with pytest.raises(ContainerError):
+            await client.request_json("GET", "/containers/missing/json")
+        server.close()
+
+    asyncio.run(main())
+    assert len(client._idle) == 1
+
+    client.close_nowait()
+    assert client._idle == []
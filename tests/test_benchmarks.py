@@ -0,0 +1,38 @@
+# test_benchmarks.py
+
+from benchmarks.compare import compare
+from benchmarks.run import parse_args, run
+
+
+def test_benchmark_report_covers_every_benchmark_and_level():
+    """
+    Test a tiny run of the suite end to end against the fake Docker daemon and JSON-RPC node.
+    """
+    args = parse_args(["--iterations", "10", "--concurrency", "1,4", "--policy-sizes", "10,1000", "--start-latency", "0",
+                       "--exec-latency", "0", "--remove-latency", "0", "--rpc-latency", "0"])
+
+    report = run(args)
+
+    assert {(r["benchmark"], r["concurrency"]) for r in report["results"]} == {
+        (name, level) for name in ("execute_task", "validate_action", "validate_actions", "log_event") for level in (1, 4)
+    }
+    assert sorted(r["policy_size"] for r in report["results"] if r["benchmark"] == "validate_action") == [
+        10, 10, 1000, 1000]
+    for result in report["results"]:
+        assert result["iterations"] == 10
+        assert result["throughput_per_s"] > 0
+        assert result["p50_ms"] <= result["p99_ms"] <= result["max_ms"]
+        assert result["peak_memory_kib"] >= 0
+
+
+def test_compare_flags_regressions():
+    """
+    Test that a throughput drop beyond the threshold is reported as a regression.
+    """
+    baseline = {"results": [{"benchmark": "exec", "concurrency": 8, "throughput_per_s": 100.0, "p99_ms": 10.0}]}
+    current = {"results": [{"benchmark": "exec", "concurrency": 8, "throughput_per_s": 80.0, "p99_ms": 10.5}]}
+
+    [(benchmark, concurrency, throughput, p99, regressed)] = compare(baseline, current, threshold=0.1)
+
+    assert (benchmark, concurrency, regressed) == ("exec", 8, True)
+    assert round(throughput, 2) == -0.2 and round(p99, 2) == 0.05
@@ -0,0 +1,91 @@
+# test_container_agent.py
+
+import socket
+import struct
+import pytest
+from sdk.container_agent import ContainerAgent, encode_frame, decode_frame
+from sdk.docker_transport import CLITransport, SocketChannel
+from sdk.errors import ContainerError, TaskTimeoutError
+
+
+@pytest.fixture
+def fake_docker_cli(tmp_path):
+    """
+    Fixture providing a docker CLI stand-in whose 'exec [-i] <id> cmd...' runs cmd locally.
+    """
+    script = tmp_path / "docker"
+    script.write_text('#!/bin/sh\nshift\n[ "$1" = "-i" ] && shift\nshift\nexec "$@"\n')
+    script.chmod(0o755)
+    return str(script)
+
+
+def test_frame_round_trip():
+    """
+    Test that frames are length-prefixed JSON and decode back to the same message.
+    """
+    frame = encode_frame({"id": 1, "argv": ["ls"]})
+    remaining = bytearray(frame)
+
+    def recv_exactly(size):
+        data = bytes(remaining[:size])
+        del remaining[:size]
+        return data
+
+    assert struct.unpack(">I", frame[:4])[0] == len(frame) - 4
+    assert decode_frame(recv_exactly) == {"id": 1, "argv": ["ls"]}
+
+
+def test_agent_runs_sequential_tasks_over_one_channel(fake_docker_cli):
+    """
+    Test that several tasks are served by the same agent process.
+    """
+    agent = ContainerAgent(CLITransport(docker_binary=fake_docker_cli), "container_id_123", python="python3")
+    pid = agent.channel.process.pid
+
+    first = agent.run(["echo", "first"])
+    second = agent.run(["sh", "-c", "echo oops >&2; exit 4"])
+
+    assert (first.exit_code, first.stdout) == (0, b"first\n")
+    assert (second.exit_code, second.stderr) == (4, b"oops\n")
+    assert agent.channel.process.pid == pid
+    assert agent.served == 2
+    agent.close()
+
+
+def test_agent_reports_broken_channel(fake_docker_cli):
+    """
+    Test that an agent that exits raises ContainerError and is marked dead.
+    """
+    agent = ContainerAgent(CLITransport(docker_binary=fake_docker_cli), "container_id_123", python="false")
+
+    with pytest.raises(ContainerError, match="Agent channel failed"):
+        agent.run(["echo", "hello"])
+    assert not agent.alive
+
+
+def test_socket_channel_demultiplexes_stdout():
+    """
+    Test that the Engine API socket channel keeps stdout frames and drops stderr frames.
+    """
+    host, container = socket.socketpair()
+    container.sendall(
+        struct.pack(">BxxxL", 1, 3) + b"abc" + struct.pack(">BxxxL", 2, 4) + b"warn" + struct.pack(">BxxxL", 1, 2) + b"de"
+    )
+    channel = SocketChannel(host)
+
+    assert channel.recv_exactly(4) == b"abcd"
+    assert channel.recv_exactly(1) == b"e"
+    channel.close()
+    container.close()
+
+
+def test_agent_run_times_out_and_aborts_channel(fake_docker_cli):
+    """
+    Test that a command outliving its timeout raises TaskTimeoutError and leaves the agent closed.
+    """
+    agent = ContainerAgent(CLITransport(docker_binary=fake_docker_cli), "container_id_123", python="python3")
+
+    with pytest.raises(TaskTimeoutError):
+        agent.run(["sleep", "5"], timeout=0.2)
+
+    assert not agent.alive
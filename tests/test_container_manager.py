@@ -1,8 +1,14 @@
 # test_container_manager.py
 
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock, ANY
 from sdk.container_manager import ContainerManager, ContainerError
+from sdk.errors import TaskTimeoutError
+from sdk.container_reaper import ContainerReaper
+from sdk.docker_transport import DockerTransport, ExecResult, ExecStream, OutputChunk
+from sdk.file_transfer import tar_stream
+from sdk.resource_scheduler import ResourceRequest, ResourceScheduler
 
 
 @pytest.fixture
@@ -103,3 +109,486 @@ def test_container_cleanup_after_error(mock_container_manager):
     except ContainerError:
         # Assert that the container is torn down after the error
         mock_container_manager.tear_down_container.assert_called_once_with("container_id_123")
+
+
+
+@pytest.fixture
+def fake_transport():
+    """
+    Fixture providing a Docker transport stand-in that records calls.
+    """
+    transport = MagicMock(spec=DockerTransport)
+    transport.run_container.return_value = "container_id_123"
+    transport.exec_command.return_value = ExecResult(0, b"done\n", b"")
+    transport.exec_stream.side_effect = lambda container_id, command: ExecStream(
+        [OutputChunk("stdout", b"do"), OutputChunk("stdout", b"ne\n")], lambda: 0
+    )
+    transport.is_running.return_value = True
+    transport.list_containers.return_value = []
+    transport.exec_command_async = AsyncMock(return_value=ExecResult(0, b"done\n", b""))
+    return transport
+
+
+def test_execute_in_container_reuses_pooled_container(fake_transport):
+    """
+    Test that consecutive tasks run in the same warm container instead of starting a new one each time.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+
+    container_manager.execute_in_container({"name": "task", "params": {}})
+    container_manager.execute_in_container({"name": "task", "params": {}})
+
+    assert fake_transport.run_container.call_count == 1
+    assert fake_transport.run_container.call_args.args == ("python:3.8-slim", "host", ["sleep", "infinity"])
+    fake_transport.remove_containers.assert_not_called()
+
+
+def test_execute_in_container_reports_failed_exec(fake_transport):
+    """
+    Test that a non-zero exit code from the transport surfaces as an error result.
+    """
+    fake_transport.exec_command.return_value = ExecResult(1, b"", b"boom")
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+
+    result = container_manager.execute_in_container({"name": "task", "params": {}})
+
+    assert "error" in result
+
+
+def test_execute_in_container_uses_single_exec(fake_transport):
+    """
+    Test that a task's output is collected from one exec without a shell.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+
+    result = container_manager.execute_in_container({"name": "task", "params": "hello"})
+
+    assert result == "done"
+    fake_transport.exec_command.assert_any_call("container_id_123", ["echo", "hello"], timeout=ANY)
+    fake_transport.exec_stream.assert_not_called()
+
+
+def test_stream_task_yields_chunks_and_exit_code(fake_transport):
+    """
+    Test that stream_task yields output incrementally and returns the container when exhausted.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+
+    stream = container_manager.stream_task({"name": "task", "params": "hello"})
+    chunks = [chunk.data for chunk in stream]
+
+    assert chunks == [b"do", b"ne\n"]
+    assert stream.exit_code == 0
+    assert container_manager.pool.wait_for_resets(timeout=5)
+    assert container_manager.pool.stats()[("python:3.8-slim", "host", container_manager.default_resources)]["idle"] == 1
+
+
+def test_stream_task_closed_early_discards_container(fake_transport):
+    """
+    Test that abandoning a stream stops the task and does not reuse its container.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+
+    with container_manager.stream_task({"name": "task", "params": "hello"}) as stream:
+        next(stream)
+
+    assert stream.exit_code is None
+    assert container_manager.reaper.flush(timeout=5)
+    fake_transport.remove_containers.assert_called_once_with(["container_id_123"])
+
+
+def test_execute_in_container_async_runs_concurrently(fake_transport):
+    """
+    Test that the async API runs many tasks on one event loop and reuses pooled containers.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport, pool_max_size=2)
+
+    async def run_all():
+        tasks = [container_manager.execute_in_container_async({"name": "task", "params": i}) for i in range(10)]
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(run_all())
+
+    assert results == ["done"] * 10
+    assert fake_transport.run_container.call_count <= 2
+    # Tasks ran on the event loop; only the resets ran, on the pool's own threads
+    assert fake_transport.exec_command_async.await_count == 10
+    assert container_manager.pool.wait_for_resets(timeout=5)
+    assert all(call.args[1] == container_manager.reset_command
+               for call in fake_transport.exec_command.call_args_list)
+
+
+def test_execute_in_container_async_respects_concurrency_limit(fake_transport):
+    """
+    Test that no more than max_concurrency execs are in flight at once.
+    """
+    in_flight = []
+    peak = []
+
+    async def slow_exec(container_id, command, timeout=None):
+        in_flight.append(command)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(command)
+        return ExecResult(0, b"ok", b"")
+
+    fake_transport.exec_command_async = slow_exec
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport, max_concurrency=2,
+                                         pool_max_size=4, reset_command=["true"])
+
+    async def run_all():
+        await asyncio.gather(*[
+            container_manager.execute_in_container_async({"name": "task", "params": i}) for i in range(6)
+        ])
+
+    asyncio.run(run_all())
+
+    assert max(peak) <= 2
+
+
+def test_agent_unavailable_falls_back_to_exec(fake_transport):
+    """
+    Test that tasks fall back to exec when the in-container agent cannot answer.
+    """
+    channel = MagicMock()
+    channel.closed = False
+    channel.recv_exactly.side_effect = EOFError("python3: not found")
+    fake_transport.open_channel.return_value = channel
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport, use_agent=True)
+
+    result = container_manager.execute_in_container({"name": "task", "params": "hello"})
+    assert result == "done"
+    assert container_manager.execute_in_container({"name": "task", "params": "again"}) == "done"
+
+    # The agent is not retried in that container, and other containers may still use it
+    assert fake_transport.open_channel.call_count == 1
+    assert container_manager.use_agent is True
+
+
+def test_agent_is_disabled_per_image_after_repeated_failures(fake_transport):
+    """
+    Test that an image is run with exec only once the agent has failed in several of its containers.
+    """
+    from sdk.container_manager import AGENT_IMAGE_FAILURE_LIMIT
+    fake_transport.open_channel.side_effect = ContainerError("container", "exec failed")
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport, use_agent=True)
+
+    for index in range(AGENT_IMAGE_FAILURE_LIMIT + 2):
+        assert container_manager._get_agent(f"container_{index}") is None
+        assert container_manager._get_agent(f"container_{index}") is None
+
+    assert fake_transport.open_channel.call_count == AGENT_IMAGE_FAILURE_LIMIT
+    assert container_manager.use_agent is True
+
+
+@pytest.fixture
+def fake_shell_transport(fake_transport):
+    """
+    Fixture whose exec_command runs the command on the host, so packed batch scripts really execute.
+    """
+    import subprocess
+
+    def run_locally(container_id, command, timeout=None):
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return ExecResult(completed.returncode, completed.stdout, completed.stderr)
+
+    fake_transport.exec_command.side_effect = run_locally
+    return fake_transport
+
+
+def test_execute_batch_packs_tasks_into_one_exec(fake_shell_transport):
+    """
+    Test that a batch runs in one exec and returns per-task results in order.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_shell_transport, reset_command=["true"])
+    tasks = [{"name": f"task_{i}", "params": f"out {i}; $HOME 'quoted'"} for i in range(5)]
+
+    results = container_manager.execute_batch(tasks)
+
+    assert results == [f"out {i}; $HOME 'quoted'" for i in range(5)]
+    assert container_manager.pool.wait_for_resets(timeout=5)
+    # One exec for the batch plus the reset when the container is returned
+    assert fake_shell_transport.exec_command.call_count == 2
+
+
+def test_execute_batch_isolates_failures(fake_shell_transport):
+    """
+    Test that a failing task in a batch does not affect the tasks around it.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_shell_transport, reset_command=["true"])
+    commands = iter([["echo", "first"], ["sh", "-c", "echo bad >&2; exit 3"], ["echo", "third"]])
+    container_manager._task_command = lambda task: next(commands)
+
+    results = container_manager.execute_batch([{"name": "a", "params": 1}, {"name": "b", "params": 2},
+                                               {"name": "c", "params": 3}])
+
+    assert results[0] == "first"
+    assert results[1] == {"error": "Task 'b' exited with 3: bad"}
+    assert results[2] == "third"
+
+
+def test_execute_batch_with_agent(fake_transport):
+    """
+    Test that with the agent enabled, batch tasks go over the agent channel.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport, use_agent=True)
+    agent = MagicMock()
+    agent.run.side_effect = [ExecResult(0, b"one", b""), ContainerError("container_id_123", "lost"),
+                             ExecResult(0, b"", b"")]
+    agent.served = 1
+    container_manager._get_agent = lambda container_id: agent
+
+    results = container_manager.execute_batch([{"name": "a", "params": 1}, {"name": "b", "params": 2}])
+
+    assert results[0] == "one"
+    assert "lost" in results[1]["error"]
+
+
+def test_started_containers_are_labelled_for_the_reaper(fake_transport, tmp_path):
+    """
+    Test that containers carry the SDK owner labels and teardown returns before removal happens.
+    """
+    reaper = ContainerReaper(fake_transport, state_dir=str(tmp_path), owner="host:1")
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport, reaper=reaper)
+
+    container_manager._start_container()
+    container_manager._teardown_container("container_id_123")
+
+    assert fake_transport.run_container.call_args.kwargs["labels"] == {
+        "sudo-sdk.managed": "true", "sudo-sdk.owner": "host:1"
+    }
+    fake_transport.remove_containers.assert_called_once_with(["container_id_123"])
+
+
+def test_task_resources_set_container_limits(fake_transport):
+    """
+    Test that a task's resource request becomes the cgroup limits of its container.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport,
+                                         scheduler=ResourceScheduler(cpus=4, memory_mb=4096))
+
+    container_manager.execute_in_container({"name": "task", "params": {}, "resources": {"cpus": 2, "memory_mb": 1024}})
+
+    assert fake_transport.run_container.call_args.kwargs["cpus"] == 2.0
+    assert fake_transport.run_container.call_args.kwargs["memory_mb"] == 1024
+    assert container_manager.scheduler.stats()["cpus_used"] == 0
+
+
+def test_task_exceeding_host_capacity_returns_error(fake_transport):
+    """
+    Test that a task asking for more than the host has fails without starting a container.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport,
+                                         scheduler=ResourceScheduler(cpus=2, memory_mb=2048))
+
+    result = container_manager.execute_in_container({"name": "task", "params": {}, "resources": {"cpus": 4}})
+
+    assert "exceeds host capacity" in result["error"]
+    fake_transport.run_container.assert_not_called()
+
+
+def test_put_files_streams_tar_archive(fake_transport):
+    """
+    Test that put_files creates the directory and sends one tar stream to the archive endpoint.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+    sent = []
+    fake_transport.put_archive.side_effect = lambda container_id, path, chunks: sent.append((path, b"".join(chunks)))
+
+    container_manager.put_files("container_id_123", {"input.json": b'{"a": 1}'}, "/data")
+
+    fake_transport.exec_command.assert_any_call("container_id_123", ["mkdir", "-p", "/data"], timeout=None)
+    assert sent[0][0] == "/data"
+    assert b'{"a": 1}' in sent[0][1]
+
+
+def test_task_files_are_uploaded_before_running(fake_transport):
+    """
+    Test that files attached to a task are copied into its container before the command runs.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+    calls = []
+    fake_transport.put_archive.side_effect = lambda *args: calls.append("put_archive")
+    fake_transport.exec_command.side_effect = lambda container_id, command, timeout=None: (
+        calls.append(command[0]) or ExecResult(0, b"done\n", b"")
+    )
+
+    result = container_manager.execute_in_container({"name": "task", "params": {}, "files": {"in.txt": b"x"}})
+
+    assert result == "done"
+    assert calls[:3] == ["mkdir", "put_archive", "echo"]
+
+
+def test_streamed_task_files_are_uploaded_before_running(fake_transport):
+    """
+    Test that stream_task copies the task's files into the container before starting the stream.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+    calls = []
+    fake_transport.put_archive.side_effect = lambda *args: calls.append("put_archive")
+    exec_stream = fake_transport.exec_stream.side_effect
+    fake_transport.exec_stream.side_effect = lambda *args: calls.append("exec_stream") or exec_stream(*args)
+
+    stream = container_manager.stream_task({"name": "task", "params": "hello", "files": {"in.txt": b"x"}})
+    list(stream)
+
+    assert calls == ["put_archive", "exec_stream"]
+
+
+def test_batched_task_files_are_uploaded(fake_shell_transport):
+    """
+    Test that a packed batch uploads every task's files before its single exec, and that
+    tasks sharing a file path run one at a time with their own copy.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_shell_transport, reset_command=["true"])
+    uploads = []
+    fake_shell_transport.put_archive.side_effect = lambda container_id, path, chunks: uploads.append(
+        b"".join(chunks))
+    tasks = [{"name": "a", "params": 1, "files": {"a.txt": b"first"}},
+             {"name": "b", "params": 2},
+             {"name": "c", "params": 3, "files": {"c.txt": b"third"}}]
+
+    assert container_manager.execute_batch(tasks) == ["1", "2", "3"]
+    assert len(uploads) == 2 and b"first" in uploads[0] and b"third" in uploads[1]
+    assert container_manager.pool.wait_for_resets(timeout=5)
+    # mkdir for each upload, one packed exec, then the reset
+    assert fake_shell_transport.exec_command.call_count == 4
+
+    uploads.clear()
+    fake_shell_transport.exec_command.reset_mock()
+    tasks[2]["files"] = {"a.txt": b"other"}
+    assert container_manager.execute_batch(tasks) == ["1", "2", "3"]
+    assert container_manager.pool.wait_for_resets(timeout=5)
+    assert len(uploads) == 2
+    # Sequential: mkdir + exec, exec, mkdir + exec, then the reset
+    assert fake_shell_transport.exec_command.call_count == 6
+
+
+def test_get_files_extracts_to_host(fake_transport, tmp_path):
+    """
+    Test that get_files extracts the archive stream into a host directory.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+    fake_transport.get_archive.return_value = tar_stream({"out/result.txt": b"42"})
+
+    extracted = container_manager.get_files("container_id_123", "/tmp/out", str(tmp_path))
+
+    assert extracted == ["out/result.txt"]
+    assert (tmp_path / "out" / "result.txt").read_bytes() == b"42"
+
+
+def test_timed_out_task_returns_timeout_result_and_discards_container(fake_transport):
+    """
+    Test that a task hitting its deadline returns a timeout result and its container is not reused.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+    fake_transport.exec_command.side_effect = TaskTimeoutError("container_id_123", 0.5)
+
+    result = container_manager.execute_in_container({"name": "hang", "params": {}, "timeout": 0.5})
+
+    assert result == {"error": "Task 'hang' exceeded its deadline of 0.5s", "timed_out": True}
+    assert fake_transport.exec_command.call_args.kwargs["timeout"] <= 0.5
+    assert container_manager.reaper.flush(timeout=5)
+    fake_transport.remove_containers.assert_called_once_with(["container_id_123"])
+    assert container_manager.scheduler.stats()["cpus_used"] == 0
+
+
+def test_deadline_covers_waiting_for_capacity(fake_transport):
+    """
+    Test that time spent queued for host capacity counts towards the task's deadline.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport,
+                                         scheduler=ResourceScheduler(cpus=1, memory_mb=1024))
+    blocker = container_manager.scheduler.acquire(ResourceRequest(1, 512))
+
+    result = container_manager.execute_in_container({"name": "queued", "params": {}, "timeout": 0.05})
+
+    blocker.release()
+    assert result["timed_out"] is True
+    fake_transport.run_container.assert_not_called()
+
+
+def test_execute_in_container_async_times_out(fake_transport):
+    """
+    Test that the async path enforces the deadline on the exec.
+    """
+    async def hang(container_id, command, timeout=None):
+        await asyncio.sleep(timeout)
+        raise TaskTimeoutError(container_id, timeout)
+
+    fake_transport.exec_command_async = hang
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+
+    result = asyncio.run(container_manager.execute_in_container_async({"name": "hang", "params": {}, "timeout": 0.05}))
+
+    assert result["timed_out"] is True
+    assert container_manager.reaper.flush(timeout=5)
+    fake_transport.remove_containers.assert_called_once_with(["container_id_123"])
+
+
+def test_execute_batch_timeout_marks_unfinished_tasks(fake_transport):
+    """
+    Test that a batch exceeding its deadline reports timeouts and discards the container.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+    fake_transport.exec_command.side_effect = TaskTimeoutError("container_id_123", 1)
+
+    results = container_manager.execute_batch([{"name": "a", "params": 1, "timeout": 1}, {"name": "b", "params": 2}])
+
+    assert all(result["timed_out"] for result in results)
+    assert container_manager.reaper.flush(timeout=5)
+    fake_transport.remove_containers.assert_called_once_with(["container_id_123"])
+
+
+def test_unused_lease_returns_container_without_reset(fake_transport):
+    """
+    Test that a container leased ahead of time goes back to the pool untouched when the task does not run.
+    """
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport,
+                                         scheduler=ResourceScheduler(cpus=4, memory_mb=4096))
+
+    lease = container_manager.lease_for_task({"name": "task", "params": {}})
+    lease.release()
+    lease.release()
+    result = container_manager.execute_leased(container_manager.lease_for_task({"name": "task", "params": {}}))
+
+    assert result == "done"
+    assert fake_transport.run_container.call_count == 1
+    assert container_manager.pool.wait_for_resets(timeout=5)
+    # Only the task itself and the reset after it were executed
+    assert fake_transport.exec_command.call_count == 2
+    assert container_manager.scheduler.stats()["cpus_used"] == 0
+    assert "error" in container_manager.execute_leased(lease)
+
+
+def test_cancelled_async_task_returns_container_leased_in_the_background(fake_transport):
+    """
+    Test that a container whose lease finishes after the caller was cancelled goes back to the pool.
+    """
+    import threading
+    starting, release = threading.Event(), threading.Event()
+
+    def slow_start(*args, **kwargs):
+        starting.set()
+        release.wait(5)
+        return "container_id_123"
+
+    fake_transport.run_container.side_effect = slow_start
+    container_manager = ContainerManager("python:3.8-slim", transport=fake_transport)
+
+    async def cancel_during_lease():
+        task = asyncio.ensure_future(container_manager.execute_in_container_async({"name": "task", "params": {}}))
+        await asyncio.get_running_loop().run_in_executor(None, starting.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        release.set()
+        for _ in range(100):
+            if not container_manager.pool._leased:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(cancel_during_lease())
+
+    assert not container_manager.pool._leased
+    assert [counts["idle"] for counts in container_manager.pool.stats().values()] == [1]
@@ -0,0 +1,225 @@
+# test_container_pool.py
+
+import itertools
+import threading
+import pytest
+from unittest.mock import MagicMock
+from sdk.container_pool import ContainerPool
+from sdk.errors import ContainerError
+
+
+@pytest.fixture
+def lifecycle():
+    """
+    Fixture providing fake start/teardown callables that record container IDs.
+    """
+    counter = itertools.count(1)
+    fake = MagicMock()
+    fake.start.side_effect = lambda image, network: f"container_{next(counter)}"
+    return fake
+
+
+def make_pool(lifecycle, **kwargs):
+    return ContainerPool(start_container=lifecycle.start, teardown_container=lifecycle.teardown, **kwargs)
+
+
+def test_lease_reuses_released_container(lifecycle):
+    """
+    Test that a released container is handed out again instead of starting a new one.
+    """
+    pool = make_pool(lifecycle)
+
+    first = pool.lease("python:3.9-slim", "host")
+    pool.release(first)
+    second = pool.lease("python:3.9-slim", "host")
+
+    assert first == second
+    lifecycle.start.assert_called_once_with("python:3.9-slim", "host")
+    lifecycle.teardown.assert_not_called()
+
+
+def test_pool_is_keyed_by_image_and_network(lifecycle):
+    """
+    Test that containers are never shared between different images or networks.
+    """
+    pool = make_pool(lifecycle)
+
+    first = pool.lease("python:3.9-slim", "host")
+    pool.release(first)
+    second = pool.lease("python:3.9-slim", "bridge")
+
+    assert first != second
+    assert lifecycle.start.call_count == 2
+
+
+def test_release_resets_container(lifecycle):
+    """
+    Test that containers are reset before they are reused.
+    """
+    pool = make_pool(lifecycle, reset_container=lifecycle.reset)
+
+    container_id = pool.lease("python:3.9-slim", "host")
+    pool.release(container_id)
+
+    assert pool.wait_for_resets(timeout=5)
+    lifecycle.reset.assert_called_once_with(container_id)
+
+
+def test_failed_reset_discards_container(lifecycle):
+    """
+    Test that a container which cannot be reset is removed instead of reused.
+    """
+    lifecycle.reset.side_effect = ContainerError("container_1", "reset failed")
+    pool = make_pool(lifecycle, reset_container=lifecycle.reset)
+
+    container_id = pool.lease("python:3.9-slim", "host")
+    pool.release(container_id)
+
+    assert pool.wait_for_resets(timeout=5)
+    lifecycle.teardown.assert_called_once_with(container_id)
+    assert pool.lease("python:3.9-slim", "host") != container_id
+
+
+def test_unhealthy_idle_container_is_replaced(lifecycle):
+    """
+    Test that an idle container failing its health check is removed and replaced.
+    """
+    lifecycle.health.return_value = False
+    pool = make_pool(lifecycle, health_check=lifecycle.health, health_check_interval=0)
+
+    first = pool.lease("python:3.9-slim", "host")
+    pool.release(first)
+    second = pool.lease("python:3.9-slim", "host")
+
+    assert second != first
+    lifecycle.teardown.assert_called_once_with(first)
+
+
+def test_idle_containers_are_evicted_above_min_size(lifecycle):
+    """
+    Test that idle eviction keeps min_size containers warm.
+    """
+    pool = make_pool(lifecycle, min_size=1, idle_timeout=0)
+
+    first = pool.lease("python:3.9-slim", "host")
+    second = pool.lease("python:3.9-slim", "host")
+    pool.release(first)
+    pool.release(second)
+
+    assert pool.evict_idle() == 1
+    assert pool.stats()[("python:3.9-slim", "host")]["total"] == 1
+
+
+def test_lease_times_out_when_pool_is_full(lifecycle):
+    """
+    Test that leasing from an exhausted pool raises once the timeout passes.
+    """
+    pool = make_pool(lifecycle, max_size=1)
+    pool.lease("python:3.9-slim", "host")
+
+    with pytest.raises(ContainerError, match="Timed out"):
+        pool.lease("python:3.9-slim", "host", timeout=0.05)
+
+
+def test_lease_waits_for_release(lifecycle):
+    """
+    Test that a waiting lease is served as soon as a container is returned.
+    """
+    pool = make_pool(lifecycle, max_size=1)
+    container_id = pool.lease("python:3.9-slim", "host")
+
+    timer = threading.Timer(0.05, pool.release, args=(container_id,))
+    timer.start()
+
+    assert pool.lease("python:3.9-slim", "host", timeout=5) == container_id
+    timer.join()
+
+
+def test_prewarm_and_close(lifecycle):
+    """
+    Test that prewarm starts min_size containers and close removes them.
+    """
+    pool = make_pool(lifecycle, min_size=2)
+
+    pool.prewarm("python:3.9-slim", "host")
+    assert pool.stats()[("python:3.9-slim", "host")]["idle"] == 2
+
+    pool.close()
+    assert lifecycle.teardown.call_count == 2
+    with pytest.raises(ContainerError, match="closed"):
+        pool.lease("python:3.9-slim", "host")
+
+
+def test_max_total_evicts_idle_container_of_another_key(lifecycle):
+    """
+    Test that the overall cap is kept by evicting the least recently used idle container of another key.
+    """
+    pool = make_pool(lifecycle, max_total=2)
+
+    first = pool.lease("python:3.9-slim", "host")
+    second = pool.lease("python:3.9-slim", "bridge")
+    pool.release(first)
+    pool.release(second)
+    third = pool.lease("node:20", "host")
+
+    lifecycle.teardown.assert_called_once_with(first)
+    assert sum(counts["total"] for counts in pool.stats().values()) == 2
+
+    # Nothing idle to evict: the next new key waits for the cap
+    pool.lease("python:3.9-slim", "bridge")
+    with pytest.raises(ContainerError):
+        pool.lease("ruby:3", "host", timeout=0.05)
+    pool.release(third)
+    assert pool.lease("ruby:3", "host", timeout=0.05) == "container_4"
+    lifecycle.teardown.assert_called_with(third)
+
+
+def test_release_does_not_wait_for_reset(lifecycle):
+    """
+    Test that release() returns while the reset runs in the background, and the container is reused afterwards.
+    """
+    resetting, finish = threading.Event(), threading.Event()
+    lifecycle.reset.side_effect = lambda container_id: (resetting.set(), finish.wait(5))
+    pool = make_pool(lifecycle, reset_container=lifecycle.reset)
+
+    container_id = pool.lease("python:3.9-slim", "host")
+    pool.release(container_id)
+    assert resetting.wait(5)
+    assert not pool.wait_for_resets(timeout=0.01)
+
+    finish.set()
+    assert pool.wait_for_resets(timeout=5)
+    assert pool.lease("python:3.9-slim", "host") == container_id
+    lifecycle.start.assert_called_once()
+
+
+def test_idle_containers_are_evicted_in_the_background(lifecycle):
+    """
+    Test that idle containers past idle_timeout are removed without waiting for another lease.
+    """
+    evicted = threading.Event()
+    lifecycle.teardown.side_effect = lambda container_id: evicted.set()
+    pool = make_pool(lifecycle, idle_timeout=0, evict_interval=0.01)
+
+    pool.release(pool.lease("python:3.9-slim", "host"))
+
+    assert evicted.wait(5)
+    assert pool.stats()[("python:3.9-slim", "host")]["total"] == 0
+    pool.close()
+
+
+def test_close_waits_for_background_resets(lifecycle):
+    """
+    Test that close() returns only after a reset in progress has finished and its container is removed.
+    """
+    resetting, finish = threading.Event(), threading.Event()
+    lifecycle.reset.side_effect = lambda container_id: (resetting.set(), finish.wait(5))
+    pool = make_pool(lifecycle, reset_container=lifecycle.reset)
+
+    container_id = pool.lease("python:3.9-slim", "host")
+    pool.release(container_id)
+    assert resetting.wait(5)
+    threading.Timer(0.05, finish.set).start()
+    pool.close()
+
+    lifecycle.teardown.assert_called_once_with(container_id)
@@ -0,0 +1,158 @@
+# test_container_reaper.py
+
+import json
+import os
+import socket
+import threading
+import pytest
+from unittest.mock import MagicMock
+from sdk.container_reaper import ContainerReaper, MANAGED_LABEL, OWNER_LABEL, owner_is_dead
+from sdk.docker_transport import DockerTransport
+from sdk.errors import ContainerError
+
+
+@pytest.fixture
+def fake_transport():
+    """
+    Fixture providing a Docker transport stand-in for the reaper.
+    """
+    transport = MagicMock(spec=DockerTransport)
+    transport.list_containers.return_value = []
+    return transport
+
+
+def dead_owner() -> str:
+    # PIDs above the kernel's pid_max cannot belong to a live process
+    return f"{socket.gethostname()}:4194305"
+
+
+def test_owner_is_dead():
+    """
+    Test that only owners on this host with no running process are considered dead.
+    """
+    assert owner_is_dead(dead_owner())
+    assert not owner_is_dead(f"{socket.gethostname()}:{os.getpid()}")
+    assert not owner_is_dead("some-other-host:4194305")
+
+
+def test_schedule_returns_before_removal(fake_transport, tmp_path):
+    """
+    Test that scheduling does not wait for Docker and removals happen in batches.
+    """
+    release = threading.Event()
+    fake_transport.remove_containers.side_effect = lambda ids: release.wait(5)
+    reaper = ContainerReaper(fake_transport, state_dir=str(tmp_path), batch_size=10)
+    reaper.start(sweep=False)
+
+    for index in range(3):
+        reaper.schedule(f"container_{index}")
+    assert reaper.pending() == 3
+
+    release.set()
+    assert reaper.flush(timeout=5)
+    removed = [cid for call in fake_transport.remove_containers.call_args_list for cid in call.args[0]]
+    assert sorted(removed) == ["container_0", "container_1", "container_2"]
+    reaper.close()
+
+
+def test_pending_removals_are_persisted(fake_transport, tmp_path):
+    """
+    Test that pending removals are written to the state file and the file is removed once done.
+    """
+    release = threading.Event()
+    fake_transport.remove_containers.side_effect = lambda ids: release.wait(5)
+    reaper = ContainerReaper(fake_transport, state_dir=str(tmp_path), owner="host:1")
+    reaper.start(sweep=False)
+
+    reaper.schedule("container_1")
+    with open(reaper.state_file) as f:
+        assert json.load(f) == {"owner": "host:1", "containers": ["container_1"]}
+
+    release.set()
+    reaper.close()
+    assert not os.path.exists(reaper.state_file)
+
+
+def test_failed_batch_falls_back_to_individual_removal(fake_transport, tmp_path):
+    """
+    Test that containers already gone are dropped and other failures are retried.
+    """
+    fake_transport.remove_containers.side_effect = ContainerError("batch", "partial failure")
+    failures = {"gone": ContainerError("gone", "No such container: gone"),
+                "stuck": ContainerError("stuck", "device busy")}
+
+    def remove_container(container_id):
+        if container_id in failures:
+            raise failures[container_id]
+
+    fake_transport.remove_container.side_effect = remove_container
+    reaper = ContainerReaper(fake_transport, state_dir=str(tmp_path), max_attempts=2, retry_interval=0)
+
+    for container_id in ("ok", "gone", "stuck"):
+        reaper.schedule(container_id)
+    reaper.flush(timeout=5)
+
+    stuck_calls = [call for call in fake_transport.remove_container.call_args_list if call.args[0] == "stuck"]
+    assert len(stuck_calls) == 2
+    assert reaper.pending() == 0
+
+
+def test_sweep_orphans_from_labels_and_state_files(fake_transport, tmp_path):
+    """
+    Test that the startup sweep removes containers of dead SDK processes but not of live ones.
+    """
+    live_owner = f"{socket.gethostname()}:{os.getpid()}"
+    fake_transport.list_containers.return_value = [
+        ("labelled_orphan", {MANAGED_LABEL: "true", OWNER_LABEL: dead_owner()}),
+        ("live_container", {MANAGED_LABEL: "true", OWNER_LABEL: live_owner}),
+    ]
+    with open(os.path.join(str(tmp_path), "pending-crashed.json"), "w") as f:
+        json.dump({"owner": dead_owner(), "containers": ["persisted_orphan"]}, f)
+    reaper = ContainerReaper(fake_transport, state_dir=str(tmp_path), owner="host:1")
+
+    assert reaper.sweep_orphans() == 2
+    reaper.flush(timeout=5)
+
+    removed = sorted(cid for call in fake_transport.remove_containers.call_args_list for cid in call.args[0])
+    assert removed == ["labelled_orphan", "persisted_orphan"]
+    assert not os.path.exists(os.path.join(str(tmp_path), "pending-crashed.json"))
+
+
+def test_reapers_in_one_process_keep_separate_state_files(fake_transport, tmp_path):
+    """
+    Test that two reapers of the same process do not overwrite each other's pending removals.
+    """
+    release = threading.Event()
+    fake_transport.remove_containers.side_effect = lambda ids: release.wait(5)
+    first = ContainerReaper(fake_transport, state_dir=str(tmp_path), owner="host:1")
+    second = ContainerReaper(fake_transport, state_dir=str(tmp_path), owner="host:1")
+    first.start(sweep=False)
+    second.start(sweep=False)
+
+    first.schedule("container_1")
+    second.schedule("container_2")
+    assert first.state_file != second.state_file
+    with open(first.state_file) as f:
+        assert json.load(f)["containers"] == ["container_1"]
+    with open(second.state_file) as f:
+        assert json.load(f)["containers"] == ["container_2"]
+
+    release.set()
+    first.close()
+    second.close()
+
+
+def test_only_first_reaper_sweeps_a_state_dir(fake_transport, tmp_path):
+    """
+    Test that starting several reapers in one process sweeps a state directory once.
+    """
+    reapers = [ContainerReaper(fake_transport, state_dir=str(tmp_path)) for _ in range(3)]
+    sweeps = []
+    swept = threading.Event()
+    for reaper in reapers:
+        reaper.sweep_orphans = lambda reaper=reaper: (sweeps.append(reaper), swept.set())
+        reaper.start()
+    assert swept.wait(5)
+    for reaper in reapers:
+        reaper.close()
+    assert sweeps == [reapers[0]]
@@ -0,0 +1,51 @@
+# test_decision_cache.py
+
+from sdk.decision_cache import DecisionCache
+
+
+def test_eviction_and_hit_ratio():
+    """
+    Test that the least recently used decision is evicted once the cache is full and hits are counted.
+    """
+    cache = DecisionCache(max_entries=2)
+    cache.put(1, "a", True)
+    cache.put(1, "b", "path")
+    assert cache.get(1, "b") == "path"
+    cache.put(1, "c", True)
+
+    assert cache.get(1, "a") is None
+    assert cache.get(1, "c") is True
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (2, 1, 1, 2)
+    assert stats["hit_ratio"] == 2 / 3
+
+
+def test_frequently_hit_decision_survives_eviction():
+    """
+    Test that a hit refreshes an entry, so a hot decision outlives a stream of new keys.
+    """
+    cache = DecisionCache(max_entries=3)
+    cache.put(1, "hot", True)
+    for n in range(10):
+        assert cache.get(1, "hot") is True
+        cache.put(1, f"cold-{n}", True)
+
+    assert cache.get(1, "hot") is True
+    assert cache.get(1, "cold-0") is None
+    assert cache.stats()["evictions"] == 8
+
+
+def test_new_snapshot_invalidates_and_stale_writes_are_dropped():
+    """
+    Test that decisions are scoped to the snapshot version that made them.
+    """
+    cache = DecisionCache()
+    cache.put(1, "a", True)
+
+    assert cache.get(2, "a") is None
+    cache.put(2, "b", "path")
+    assert cache.get(1, "a") is None and len(cache) == 1
+    # A check that started under version 1 finishes after the reload
+    cache.put(1, "a", True)
+    assert cache.get(2, "a") is None
+    assert cache.stats()["invalidations"] == 1
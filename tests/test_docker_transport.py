@@ -0,0 +1,271 @@
+# test_docker_transport.py
+
+import asyncio
+import subprocess
+import pytest
+from unittest.mock import patch, MagicMock
+from sdk.docker_transport import CLITransport, EngineAPITransport, create_transport
+from sdk.errors import ContainerError, TaskTimeoutError
+from sdk.file_transfer import extract_tar_stream, tar_stream
+
+
+@patch("sdk.docker_transport.subprocess.check_output")
+def test_cli_run_container(mock_check_output):
+    """
+    Test that the CLI backend starts a detached container and returns its ID.
+    """
+    mock_check_output.return_value = b"container_id_123\n"
+
+    container_id = CLITransport().run_container("python:3.8-slim", "host", ["sleep", "infinity"])
+
+    mock_check_output.assert_called_once_with(
+        ["docker", "run", "-d", "--network", "host", "python:3.8-slim", "sleep", "infinity"]
+    )
+    assert container_id == "container_id_123"
+
+
+@patch("sdk.docker_transport.subprocess.check_output")
+def test_cli_run_container_with_limits(mock_check_output):
+    """
+    Test that CPU and memory limits are passed to `docker run`.
+    """
+    mock_check_output.return_value = b"container_id_123\n"
+
+    CLITransport().run_container("python:3.8-slim", "host", ["sleep", "infinity"], cpus=1.5, memory_mb=512)
+
+    args = mock_check_output.call_args.args[0]
+    assert args[args.index("--cpus") + 1] == "1.5"
+    assert args[args.index("--memory") + 1] == "512m"
+
+
+@patch("sdk.docker_transport.subprocess.run")
+def test_cli_exec_command_returns_exit_code(mock_run):
+    """
+    Test that the CLI backend reports the exit code and output of an exec.
+    """
+    mock_run.return_value = subprocess.CompletedProcess([], 3, stdout=b"out", stderr=b"err")
+
+    result = CLITransport(docker_host="tcp://127.0.0.1:2375").exec_command("container_id_123", ["ls"])
+
+    assert mock_run.call_args.args[0] == ["docker", "-H", "tcp://127.0.0.1:2375", "exec", "container_id_123", "ls"]
+    assert (result.exit_code, result.stdout, result.stderr) == (3, b"out", b"err")
+
+
+@patch("sdk.docker_transport.subprocess.check_output")
+def test_cli_remove_container_error(mock_check_output):
+    """
+    Test that a failed removal raises ContainerError.
+    """
+    mock_check_output.side_effect = subprocess.CalledProcessError(1, "docker")
+
+    with pytest.raises(ContainerError):
+        CLITransport().remove_container("container_id_123")
+
+
+@pytest.fixture
+def fake_docker_cli(tmp_path):
+    """
+    Fixture providing a docker CLI stand-in whose 'exec <id> cmd...' runs cmd locally.
+    """
+    script = tmp_path / "docker"
+    script.write_text('#!/bin/sh\nshift 2\nexec "$@"\n')
+    script.chmod(0o755)
+    return str(script)
+
+
+def test_cli_exec_stream_yields_output_and_exit_code(fake_docker_cli):
+    """
+    Test that the CLI backend streams stdout and stderr and reports the exit code at the end.
+    """
+    stream = CLITransport(docker_binary=fake_docker_cli).exec_stream(
+        "container_id_123", ["sh", "-c", "echo out; echo err >&2; exit 3"]
+    )
+
+    result = stream.read_all()
+
+    assert result.exit_code == 3
+    assert result.stdout == b"out\n"
+    assert result.stderr == b"err\n"
+
+
+def test_cli_exec_command_times_out(fake_docker_cli):
+    """
+    Test that an exec outliving its timeout is killed and reported as TaskTimeoutError.
+    """
+    with pytest.raises(TaskTimeoutError):
+        CLITransport(docker_binary=fake_docker_cli).exec_command("container_id_123", ["sleep", "5"], timeout=0.2)
+
+
+def test_cli_exec_command_async_times_out(fake_docker_cli):
+    """
+    Test that the async exec honours its timeout as well.
+    """
+    transport = CLITransport(docker_binary=fake_docker_cli)
+
+    with pytest.raises(TaskTimeoutError):
+        asyncio.run(transport.exec_command_async("container_id_123", ["sleep", "5"], timeout=0.2))
+
+
+def test_cli_exec_stream_close_stops_command(fake_docker_cli):
+    """
+    Test that closing a stream early stops the running command.
+    """
+    closed = []
+    stream = CLITransport(docker_binary=fake_docker_cli).exec_stream(
+        "container_id_123", ["sh", "-c", "echo first; sleep 30"]
+    )
+    stream.on_close = closed.append
+
+    assert next(stream).data == b"first\n"
+    stream.close()
+
+    assert closed == [False]
+    assert stream.exit_code is None
+
+
+def test_cli_exec_command_async(fake_docker_cli):
+    """
+    Test that the CLI backend's async exec uses a non-blocking subprocess.
+    """
+    transport = CLITransport(docker_binary=fake_docker_cli)
+
+    result = asyncio.run(transport.exec_command_async("container_id_123", ["sh", "-c", "echo out; exit 2"]))
+
+    assert (result.exit_code, result.stdout) == (2, b"out\n")
+
+
+def test_api_exec_command_uses_engine_api():
+    """
+    Test that the Engine API backend runs an exec without spawning the CLI.
+    """
+    with patch("sdk.docker_transport.docker.APIClient") as mock_client_class:
+        client = mock_client_class.return_value
+        client.exec_create.return_value = {"Id": "exec_1"}
+        client.exec_start.return_value = (b"hello", None)
+        client.exec_inspect.return_value = {"ExitCode": 0}
+
+        result = EngineAPITransport().exec_command("container_id_123", ["echo", "hello"])
+
+    client.exec_start.assert_called_once_with("exec_1", demux=True)
+    assert (result.exit_code, result.stdout, result.stderr) == (0, b"hello", b"")
+
+
+def test_api_async_client_is_replaced_per_event_loop():
+    """
+    Test that the async client of a finished event loop is closed when a new loop takes over.
+    """
+    with patch("sdk.docker_transport.docker.APIClient"), \
+            patch("sdk.docker_transport.AsyncEngineClient") as mock_async_client_class:
+        mock_async_client_class.side_effect = lambda *args: MagicMock()
+        transport = EngineAPITransport()
+
+        async def get_client():
+            return transport._get_async_client()
+
+        first = asyncio.run(get_client())
+        second = asyncio.run(get_client())
+
+    assert first is not second
+    first.close_nowait.assert_called_once_with()
+    second.close_nowait.assert_not_called()
+
+
+def test_create_transport_falls_back_to_cli():
+    """
+    Test that 'auto' falls back to the CLI when the Engine API is unreachable.
+    """
+    with patch("sdk.docker_transport.EngineAPITransport", side_effect=ContainerError("transport", "refused")):
+        transport = create_transport("auto")
+
+    assert isinstance(transport, CLITransport)
+
+
+def test_create_transport_api_does_not_fall_back():
+    """
+    Test that an explicit 'api' backend surfaces connection errors.
+    """
+    with patch("sdk.docker_transport.EngineAPITransport", side_effect=ContainerError("transport", "refused")):
+        with pytest.raises(ContainerError):
+            create_transport("api")
+
+
+def test_create_transport_rejects_unknown_backend():
+    """
+    Test that an unknown backend name is rejected.
+    """
+    with pytest.raises(ValueError):
+        create_transport("podman")
+
+
+@pytest.fixture
+def fake_docker_cp(tmp_path):
+    """
+    Fixture providing a docker CLI stand-in whose 'cp' copies tar streams to and from a local directory.
+    """
+    root = tmp_path / "container"
+    root.mkdir()
+    script = tmp_path / "docker"
+    script.write_text(
+        '#!/bin/sh\n'
+        f'root={root}\n'
+        'if [ "$2" = "-" ]; then exec tar -x -C "$root/${3#*:}"; fi\n'
+        'path="$root/${2#*:}"\n'
+        'exec tar -c -C "$(dirname "$path")" "$(basename "$path")"\n'
+    )
+    script.chmod(0o755)
+    return str(script), root
+
+
+def test_cli_archive_round_trip(fake_docker_cp, tmp_path):
+    """
+    Test that put_archive and get_archive stream tar data through 'docker cp'.
+    """
+    docker_binary, root = fake_docker_cp
+    (root / "data").mkdir()
+    transport = CLITransport(docker_binary=docker_binary)
+
+    transport.put_archive("container_id_123", "/data", tar_stream({"in.txt": b"payload"}))
+    extracted = extract_tar_stream(transport.get_archive("container_id_123", "/data"), str(tmp_path / "out"))
+
+    assert (root / "data" / "in.txt").read_bytes() == b"payload"
+    assert extracted == ["data/in.txt"]
+
+
+def test_cli_get_archive_missing_path_raises(fake_docker_cp):
+    """
+    Test that a failing 'docker cp' surfaces as a ContainerError once the stream is consumed.
+    """
+    docker_binary, _ = fake_docker_cp
+
+    chunks = CLITransport(docker_binary=docker_binary).get_archive("container_id_123", "/missing")
+
+    with pytest.raises(ContainerError):
+        b"".join(chunks)
+
+
+def test_read_exec_socket_demuxes_until_close():
+    """
+    Test that the bounded exec reader splits multiplexed frames into stdout and stderr.
+    """
+    import socket
+    import struct
+    from sdk.docker_transport import _read_exec_socket
+
+    ours, theirs = socket.socketpair()
+    theirs.sendall(struct.pack('>BxxxL', 1, 3) + b"out" + struct.pack('>BxxxL', 2, 3) + b"err")
+    theirs.close()
+
+    assert _read_exec_socket(ours, "container_id_123", 1) == (b"out", b"err")
+
+
+def test_read_exec_socket_times_out():
+    """
+    Test that the bounded exec reader gives up with TaskTimeoutError when the exec stays silent.
+    """
+    import socket
+    from sdk.docker_transport import _read_exec_socket
+
+    ours, theirs = socket.socketpair()
+    with pytest.raises(TaskTimeoutError):
+        _read_exec_socket(ours, "container_id_123", 0.1)
+    theirs.close()
@@ -0,0 +1,144 @@
+# test_durable_queue.py
+
+import json
+import multiprocessing
+import pytest
+from unittest.mock import MagicMock, patch
+from sdk.durable_queue import DurableQueue
+from sdk.orchestrator import SudoOrchestrator
+from sdk.policy_engine import PolicyEngine
+from sdk.worker import QueueWorker
+
+
+@pytest.fixture
+def durable_queue(tmp_path):
+    """
+    Fixture providing a queue in a temporary database.
+    """
+    durable_queue = DurableQueue(str(tmp_path / "tasks.db"), lease_timeout=60, max_attempts=2, backoff_base=10)
+    yield durable_queue
+    durable_queue.close()
+
+
+def test_jobs_survive_reopening_and_lease_by_priority(durable_queue):
+    """
+    Test that enqueued jobs are on disk and leased in priority order.
+    """
+    durable_queue.enqueue("low", {"n": 1}, "$SUDO-token", priority=10)
+    high_id = durable_queue.enqueue("high", {"n": 2}, "$SUDO-token", priority=0, resources={"cpus": 1}, timeout=5)
+    reopened = DurableQueue(durable_queue.path)
+
+    job = reopened.lease("worker-a")
+
+    assert (job.id, job.task_name, job.task_params, job.resources, job.timeout) == (high_id, "high", {"n": 2},
+                                                                                    {"cpus": 1}, 5)
+    assert reopened.ack(job, "worker-a", "done")
+    assert reopened.get(high_id)["result"] == "done"
+    assert reopened.stats() == {"queued": 1, "leased": 0, "done": 1, "dead": 0}
+    reopened.close()
+
+
+def test_expired_lease_is_recovered_by_another_worker(durable_queue):
+    """
+    Test that a job held by a crashed worker is leased again and the stale ack is rejected.
+    """
+    job_id = durable_queue.enqueue("task", {}, "$SUDO-token")
+    stale = durable_queue.lease("crashed", lease_timeout=0)
+
+    recovered = durable_queue.lease("worker-b")
+
+    assert recovered.id == job_id and recovered.attempts == 2
+    assert not durable_queue.ack(stale, "crashed", "late")
+    assert durable_queue.ack(recovered, "worker-b", "ok")
+
+
+def test_failures_back_off_then_dead_letter(durable_queue):
+    """
+    Test that a failed job is delayed by the backoff and dead-lettered when out of attempts.
+    """
+    job_id = durable_queue.enqueue("flaky", {}, "$SUDO-token")
+    durable_queue.nack(durable_queue.lease("w"), "w", "first failure")
+
+    assert durable_queue.lease("w") is None
+    with patch("sdk.durable_queue.time.time", return_value=1e12):
+        job = durable_queue.lease("w")
+        durable_queue.nack(job, "w", "second failure")
+
+    assert durable_queue.get(job_id)["status"] == "dead"
+    assert durable_queue.dead_letters()[0]["last_error"] == "second failure"
+    assert durable_queue.requeue(job_id)
+    assert durable_queue.lease("w").attempts == 1
+
+
+def test_worker_retries_errors_but_not_denials(durable_queue):
+    """
+    Test that the worker acks results and denials and nacks other error results.
+    """
+    orchestrator = MagicMock()
+    orchestrator.execute_task.side_effect = [
+        "output",
+        {"error": "User does not have permission to execute task: rm", "denied": True},
+        {"error": "An unexpected error occurred."},
+    ]
+    ids = [durable_queue.enqueue(name, {}, "$SUDO-token") for name in ("ls", "rm", "build")]
+    worker = QueueWorker(durable_queue, orchestrator, worker_id="w")
+
+    while worker.run_once():
+        pass
+
+    assert [durable_queue.get(job_id)["status"] for job_id in ids] == ["done", "done", "queued"]
+    orchestrator.execute_task.assert_any_call("ls", {}, "$SUDO-token", resources=None, timeout=None)
+
+
+def test_worker_runs_jobs_through_a_real_policy_engine(durable_queue, tmp_path):
+    """
+    Test that the worker's orchestrator checks permissions with PolicyEngine itself: allowed
+    tasks run, undefined tasks and malformed tokens are denied without retries.
+    """
+    policy_file = tmp_path / "policies.json"
+    policy_file.write_text(json.dumps({"ls": {"restricted_parameters": []}}))
+    policy_engine = PolicyEngine(str(policy_file), watch=False)
+    container_manager = MagicMock()
+    container_manager.execute_in_container.return_value = "listing"
+    orchestrator = SudoOrchestrator(policy_engine, container_manager, coalesce=False)
+    ids = [durable_queue.enqueue("ls", {}, "$SUDO-token"), durable_queue.enqueue("rm", {}, "$SUDO-token"),
+           durable_queue.enqueue("ls", {}, "not-a-token")]
+    worker = QueueWorker(durable_queue, orchestrator, worker_id="w")
+
+    while worker.run_once():
+        pass
+    jobs = [durable_queue.get(job_id) for job_id in ids]
+
+    assert [job["status"] for job in jobs] == ["done", "done", "done"]
+    assert jobs[0]["result"] == "listing"
+    assert jobs[1]["result"]["denied"] and jobs[2]["result"]["denied"]
+    assert container_manager.execute_in_container.call_count == 1
+
+
+def _lease_all(path, worker_id, results):
+    durable_queue = DurableQueue(path)
+    while True:
+        job = durable_queue.lease(worker_id)
+        if job is None:
+            break
+        durable_queue.ack(job, worker_id, worker_id)
+        results.put(job.id)
+    durable_queue.close()
+
+
+def test_processes_never_lease_the_same_job(durable_queue):
+    """
+    Test that concurrent worker processes each get distinct jobs.
+    """
+    ids = {durable_queue.enqueue("task", {"n": n}, "$SUDO-token") for n in range(40)}
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_lease_all, args=(durable_queue.path, f"w{i}", results))
+                 for i in range(3)]
+    for process in processes:
+        process.start()
+    leased = [results.get(timeout=10) for _ in range(40)]
+    for process in processes:
+        process.join(10)
+
+    assert sorted(leased) == sorted(ids)
+    assert durable_queue.stats()["done"] == 40
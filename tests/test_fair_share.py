@@ -0,0 +1,130 @@
+# test_fair_share.py
+
+import queue
+import threading
+import time
+import pytest
+from sdk.fair_share import FairShareExecutor, TokenBucket
+
+
+def _run_in_order(executor, submissions):
+    """
+    Holds the single worker until everything is queued, then returns the order in which tenants ran.
+    """
+    order = []
+    gate = threading.Event()
+    blocker = executor.submit("setup", gate.wait, 5)
+    futures = [executor.submit(tenant, order.append, tenant) for tenant in submissions]
+    gate.set()
+    blocker.result(timeout=5)
+    for future in futures:
+        future.result(timeout=5)
+    return order
+
+
+def test_bursting_tenant_does_not_starve_others():
+    """
+    Test that queued work from a quiet tenant is interleaved with a tenant that submitted a burst.
+    """
+    executor = FairShareExecutor(workers=1)
+
+    order = _run_in_order(executor, ["burst"] * 6 + ["quiet"] * 2)
+
+    assert order[:4] == ["burst", "quiet", "burst", "quiet"]
+    executor.shutdown()
+
+
+def test_weights_share_workers_proportionally():
+    """
+    Test that a tenant with twice the weight gets two turns per round.
+    """
+    executor = FairShareExecutor(workers=1, weights={"gold": 2.0, "bronze": 0.5})
+
+    order = _run_in_order(executor, ["gold"] * 6 + ["silver"] * 3 + ["bronze"] * 2)
+
+    assert order[:5] == ["gold", "gold", "silver", "gold", "gold"]
+    assert order.index("bronze") > order.index("silver")
+    assert sorted(order) == sorted(["gold"] * 6 + ["silver"] * 3 + ["bronze"] * 2)
+    executor.shutdown()
+
+
+def test_concurrency_cap_and_queue_limit_per_tenant():
+    """
+    Test that a tenant never runs more than its cap at once and cannot queue beyond its limit.
+    """
+    executor = FairShareExecutor(workers=4, max_concurrent_per_tenant=1, max_queued_per_tenant=3)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    futures = [executor.submit("user", work) for _ in range(3)]
+    with pytest.raises(queue.Full):
+        for _ in range(3):
+            futures.append(executor.submit("user", work, block=False))
+    other = executor.submit("other", lambda: "ran")
+
+    assert other.result(timeout=5) == "ran"
+    for future in futures:
+        future.result(timeout=5)
+    assert peak[0] == 1
+    assert executor.stats()["rejected"] == 1
+    executor.shutdown()
+
+
+def test_rate_limit_delays_excess_submissions():
+    """
+    Test that a tenant beyond its burst waits for new tokens while other tenants are not delayed.
+    """
+    executor = FairShareExecutor(workers=2, rate=20.0, burst=2)
+    started = time.monotonic()
+
+    limited = [executor.submit("limited", time.monotonic) for _ in range(4)]
+    other = executor.submit("other", time.monotonic)
+
+    assert other.result(timeout=5) - started < 0.05
+    times = sorted(future.result(timeout=5) - started for future in limited)
+    assert times[1] < 0.05
+    assert times[3] >= 0.09
+    executor.shutdown()
+
+
+def test_token_bucket_refills_at_rate():
+    """
+    Test the token bucket arithmetic.
+    """
+    bucket = TokenBucket(rate=2.0, burst=1)
+    now = bucket.updated
+
+    assert bucket.ready(now)
+    bucket.take()
+    assert not bucket.ready(now)
+    assert bucket.wait_time(now) == pytest.approx(0.5)
+    assert bucket.ready(now + 0.5)
+
+
+def test_idle_tenants_are_forgotten_but_keep_their_rate_limit():
+    """
+    Test that idle tenants leave no state behind once their bucket has refilled, and that a
+    tenant returning before then is still rate limited.
+    """
+    executor = FairShareExecutor(workers=2, rate=20.0, burst=1)
+
+    for n in range(50):
+        executor.submit(f"tenant-{n}", time.monotonic).result(timeout=5)
+    assert executor._tenants == {}
+    assert len(executor._refilling) <= 50
+
+    started = time.monotonic()
+    executor.submit("tenant-49", time.monotonic).result(timeout=5)
+    assert time.monotonic() - started >= 0.03
+
+    time.sleep(0.06)
+    executor.submit("tenant-0", time.monotonic).result(timeout=5)
+    assert "tenant-1" not in executor._refilling
+    executor.shutdown()
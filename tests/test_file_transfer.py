@@ -0,0 +1,91 @@
+# test_file_transfer.py
+
+import io
+import tarfile
+import pytest
+from sdk.file_transfer import ChunkReader, extract_tar_stream, tar_stream
+
+
+def test_tar_stream_is_a_valid_archive(tmp_path):
+    """
+    Test that the generated stream can be read by tarfile and keeps file contents.
+    """
+    host_file = tmp_path / "data.bin"
+    host_file.write_bytes(b"x" * 1000)
+
+    archive = b"".join(tar_stream({
+        "a.txt": b"hello",
+        "dir/data.bin": str(host_file),
+        "gen.txt": (6, iter([b"abc", b"def"])),
+    }))
+
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        assert tar.getnames() == ["a.txt", "dir/data.bin", "gen.txt"]
+        assert tar.extractfile("a.txt").read() == b"hello"
+        assert tar.extractfile("dir/data.bin").read() == b"x" * 1000
+        assert tar.extractfile("gen.txt").read() == b"abcdef"
+
+
+def test_tar_stream_rejects_wrong_size_and_unsafe_names():
+    """
+    Test that declared sizes are enforced and names cannot escape the destination.
+    """
+    with pytest.raises(ValueError):
+        b"".join(tar_stream({"gen.txt": (10, iter([b"short"]))}))
+    with pytest.raises(ValueError):
+        b"".join(tar_stream({"../etc/passwd": b"x"}))
+
+
+def test_tar_stream_does_not_buffer_files():
+    """
+    Test that content chunks pass through one at a time instead of being collected first.
+    """
+    consumed = []
+
+    def chunks():
+        for index in range(4):
+            consumed.append(index)
+            yield b"\0" * 1024
+
+    stream = tar_stream({"big.bin": (4096, chunks())})
+    next(stream)  # header
+    next(stream)
+
+    assert consumed == [0]
+
+
+def test_extract_tar_stream_round_trip(tmp_path):
+    """
+    Test that a chunked archive is extracted member by member into the destination.
+    """
+    archive = tar_stream({"a.txt": b"hello", "sub/b.txt": b"world"})
+
+    extracted = extract_tar_stream(archive, str(tmp_path / "out"))
+
+    assert extracted == ["a.txt", "sub/b.txt"]
+    assert (tmp_path / "out" / "sub" / "b.txt").read_bytes() == b"world"
+
+
+def test_extract_tar_stream_rejects_traversal(tmp_path):
+    """
+    Test that members pointing outside the destination are refused.
+    """
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        info = tarfile.TarInfo("../evil.txt")
+        info.size = 1
+        tar.addfile(info, io.BytesIO(b"x"))
+
+    with pytest.raises(ValueError):
+        extract_tar_stream([buffer.getvalue()], str(tmp_path / "out"))
+    assert not (tmp_path / "evil.txt").exists()
+
+
+def test_chunk_reader_reads_across_chunks():
+    """
+    Test that reads walk through all chunks, skipping empty ones, and end with b"".
+    """
+    reader = ChunkReader([b"ab", b"", b"cde", b"f"])
+
+    assert b"".join(iter(lambda: reader.read(2), b"")) == b"abcdef"
+    assert reader.read(2) == b""
@@ -0,0 +1,97 @@
+# test_metrics.py
+
+import urllib.request
+import pytest
+from unittest.mock import MagicMock
+from sdk.blockchain_integration import BlockchainIntegration
+from sdk.metrics import Metrics, metrics, start_metrics_server
+from sdk.orchestrator import SudoOrchestrator
+
+
+def test_disabled_metrics_record_nothing():
+    """
+    Test that spans are shared no-ops while metrics are disabled.
+    """
+    registry = Metrics(enabled=False)
+
+    with registry.span("exec"):
+        pass
+    registry.increment("tasks", outcome="completed")
+
+    assert registry.span("exec") is registry.span("policy_check")
+    assert registry.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_spans_fill_histograms_and_error_counts():
+    """
+    Test that span durations land in the stage histogram and raising spans are counted as errors.
+    """
+    registry = Metrics(enabled=True, buckets=(0.01, 0.1))
+    registry.observe("exec", 0.005)
+    registry.observe("exec", 0.05)
+    with pytest.raises(RuntimeError):
+        with registry.span("exec"):
+            raise RuntimeError("boom")
+
+    stage = registry.snapshot()["stages"]["exec"]
+
+    assert stage["count"] == 3 and stage["errors"] == 1
+    assert stage["p50"] == 0.01
+
+
+def test_prometheus_exposition_over_http():
+    """
+    Test the text format served by the exporter.
+    """
+    registry = Metrics(buckets=(0.01, 0.1))
+    server = start_metrics_server(port=0, registry=registry)
+    registry.observe("policy_check", 0.02)
+    registry.increment("tasks", outcome="denied")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode("utf-8")
+    finally:
+        server.shutdown()
+
+    assert server.server_address[0] == "127.0.0.1"
+    assert 'sudo_stage_duration_seconds_bucket{stage="policy_check",le="0.01"} 0' in body
+    assert 'sudo_stage_duration_seconds_bucket{stage="policy_check",le="0.1"} 1' in body
+    assert 'sudo_stage_duration_seconds_count{stage="policy_check"} 1' in body
+    assert 'sudo_tasks_total{outcome="denied"} 1' in body
+
+
+def test_orchestrator_records_stages(monkeypatch):
+    """
+    Test that a task run records the policy check and its outcome on the shared registry.
+    """
+    monkeypatch.setattr(metrics, "enabled", True)
+    metrics.reset()
+    policy_engine = MagicMock()
+    policy_engine.check_permission.return_value = True
+    container_manager = MagicMock()
+    container_manager.execute_in_container.return_value = "done"
+
+    SudoOrchestrator(policy_engine, container_manager, coalesce=False).execute_task("ls", {}, "$SUDO-token")
+    snapshot = metrics.snapshot()
+    metrics.reset()
+
+    assert snapshot["stages"]["policy_check"]["count"] == 1
+    assert snapshot["counters"][("tasks", (("outcome", "completed"),))] == 1
+
+
+def test_blockchain_failures_are_counted(monkeypatch):
+    """
+    Test that blockchain spans record errors even though the calls catch them and return an error.
+    """
+    monkeypatch.setattr(metrics, "enabled", True)
+    metrics.reset()
+    blockchain = BlockchainIntegration("http://localhost:8545", "0xToken")
+    monkeypatch.setattr(blockchain, "_send_raw_transaction", MagicMock(side_effect=ConnectionError("node down")))
+
+    result = blockchain.log_event({"event": "task_completed"})
+    stages = metrics.snapshot()["stages"]
+    metrics.reset()
+
+    assert "error" in result
+    assert stages["blockchain_transaction"]["errors"] == 1
+    assert stages["blockchain_log"]["errors"] == 1
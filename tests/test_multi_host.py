@@ -0,0 +1,237 @@
+# test_multi_host.py
+
+import itertools
+import time
+import pytest
+from unittest.mock import MagicMock
+from sdk.docker_transport import DockerTransport, ExecResult
+from sdk.errors import ContainerError
+from sdk.multi_host import MultiHostTransport
+
+
+def make_host(name):
+    """
+    Returns a fake single-daemon transport whose containers are named after the host.
+    """
+    counter = itertools.count(1)
+    transport = MagicMock(spec=DockerTransport)
+    transport.run_container.side_effect = lambda *args, **kwargs: f"{name}_{next(counter)}"
+    transport.exec_command.return_value = ExecResult(0, name.encode(), b"")
+    transport.ping.return_value = True
+    transport.list_containers.return_value = []
+    return transport
+
+
+@pytest.fixture
+def hosts():
+    """
+    Fixture providing three fake Docker hosts.
+    """
+    return {"tcp://a:2375": make_host("a"), "tcp://b:2375": make_host("b"), "tcp://c:2375": make_host("c")}
+
+
+def test_containers_are_spread_over_hosts(hosts):
+    """
+    Test that new containers go to the least-loaded host.
+    """
+    transport = MultiHostTransport(hosts)
+
+    started = [transport.run_container("python:3.8-slim", "host", ["sleep", "infinity"]) for _ in range(6)]
+
+    assert sorted(name[0] for name in started) == ["a", "a", "b", "b", "c", "c"]
+
+
+def test_slow_host_gets_fewer_containers(hosts):
+    """
+    Test that recent latency counts towards a host's load.
+    """
+    transport = MultiHostTransport(hosts)
+    transport.endpoints[0].latency = 1.0
+    transport.endpoints[1].latency = 0.01
+    transport.endpoints[2].latency = 0.01
+
+    started = [transport.run_container("python:3.8-slim", "host", ["sleep", "infinity"]) for _ in range(4)]
+
+    assert not any(name.startswith("a") for name in started)
+
+
+def test_operations_are_routed_to_the_owning_host(hosts):
+    """
+    Test that execs and removals go to the host the container was placed on.
+    """
+    transport = MultiHostTransport(hosts)
+    container_id = transport.run_container("python:3.8-slim", "host", ["sleep", "infinity"])
+    owner = hosts[f"tcp://{container_id[0]}:2375"]
+
+    result = transport.exec_command(container_id, ["ls"])
+    transport.remove_containers([container_id])
+
+    assert result.stdout == container_id[0].encode()
+    owner.exec_command.assert_called_once_with(container_id, ["ls"], timeout=None)
+    owner.remove_containers.assert_called_once_with([container_id])
+    with pytest.raises(ContainerError):
+        transport.exec_command(container_id, ["ls"])
+
+
+def test_failing_host_is_drained_and_start_fails_over(hosts):
+    """
+    Test that a host failing repeatedly gets no new containers and that a failed start is retried elsewhere.
+    """
+    hosts["tcp://a:2375"].run_container.side_effect = ContainerError("python:3.8-slim", "connection refused")
+    transport = MultiHostTransport(hosts, failure_threshold=2, drain_interval=60)
+
+    started = [transport.run_container("python:3.8-slim", "host", ["sleep", "infinity"]) for _ in range(6)]
+
+    assert not any(name.startswith("a") for name in started)
+    assert hosts["tcp://a:2375"].run_container.call_count == 2
+    assert [s["healthy"] for s in transport.stats()] == [False, True, True]
+
+
+def test_drained_host_returns_after_successful_ping(hosts):
+    """
+    Test that a drained host is probed after the drain interval and used again once it answers.
+    """
+    hosts["tcp://a:2375"].run_container.side_effect = ContainerError("python:3.8-slim", "connection refused")
+    transport = MultiHostTransport({"tcp://a:2375": hosts["tcp://a:2375"], "tcp://b:2375": hosts["tcp://b:2375"]},
+                                   failure_threshold=1, drain_interval=0)
+    transport.run_container("python:3.8-slim", "host", ["sleep", "infinity"])
+    hosts["tcp://a:2375"].run_container.side_effect = lambda *args, **kwargs: "a_1"
+
+    transport.endpoints[1].containers.update({"b_x", "b_y"})
+    container_id = transport.run_container("python:3.8-slim", "host", ["sleep", "infinity"])
+
+    assert container_id == "a_1"
+    hosts["tcp://a:2375"].ping.assert_called()
+
+
+def test_no_healthy_host_raises(hosts):
+    """
+    Test that starting a container fails when every host is down.
+    """
+    for host in hosts.values():
+        host.run_container.side_effect = ContainerError("python:3.8-slim", "connection refused")
+    transport = MultiHostTransport(hosts)
+
+    with pytest.raises(ContainerError):
+        transport.run_container("python:3.8-slim", "host", ["sleep", "infinity"])
+
+
+def test_container_is_started_on_requested_host(hosts):
+    """
+    Test that a container is pinned to the host named in the request, unless that host is drained.
+    """
+    transport = MultiHostTransport(hosts, failure_threshold=1, drain_interval=60)
+
+    started = [transport.run_container("python:3.8-slim", "host", ["sleep", "infinity"], host="tcp://b:2375")
+               for _ in range(3)]
+    assert [name[0] for name in started] == ["b", "b", "b"]
+
+    hosts["tcp://b:2375"].run_container.side_effect = ContainerError("python:3.8-slim", "connection refused")
+    container_id = transport.run_container("python:3.8-slim", "host", ["sleep", "infinity"], host="tcp://b:2375")
+    assert not container_id.startswith("b")
+
+
+def test_container_manager_reserves_capacity_per_host(hosts):
+    """
+    Test that ContainerManager gives each Docker host its own capacity and starts containers where it reserved it.
+    """
+    from sdk.container_manager import ContainerManager
+    from sdk.resource_scheduler import ResourceRequest
+
+    for host in hosts.values():
+        host.is_running.return_value = True
+    transport = MultiHostTransport(hosts)
+    container_manager = ContainerManager("python:3.8-slim", transport=transport,
+                                         default_resources=ResourceRequest(1, 256))
+
+    assert container_manager.scheduler.hosts == list(hosts)
+    leases = [container_manager.lease_for_task({"name": "task", "params": i}) for i in range(3)]
+    for lease in leases:
+        host = lease.reservation.host
+        assert lease.container_id.startswith(host[len("tcp://")])
+        assert hosts[host].run_container.call_args.kwargs["cpus"] == 1
+        lease.release()
+
+
+def test_container_manager_skips_drained_hosts(hosts, monkeypatch):
+    """
+    Test that capacity is only reserved on hosts the transport reports healthy, so a drained
+    host's share is not handed to tasks that would then overcommit another host.
+    """
+    from sdk.config import Config
+    from sdk.container_manager import ContainerManager
+    from sdk.resource_scheduler import ResourceRequest
+
+    monkeypatch.setattr(Config, "HOST_CPUS", 2)
+    for host in hosts.values():
+        host.is_running.return_value = True
+    transport = MultiHostTransport(hosts, drain_interval=60)
+    transport.endpoints[0].drained_until = time.monotonic() + 60
+    container_manager = ContainerManager("python:3.8-slim", transport=transport,
+                                         default_resources=ResourceRequest(1, 256))
+
+    leases = [container_manager.lease_for_task({"name": "task", "params": i, "timeout": 0.05}) for i in range(5)]
+    placed = [lease for lease in leases if lease.error is None]
+
+    assert len(placed) == 4
+    assert "tcp://a:2375" not in {lease.reservation.host for lease in placed}
+    assert all(lease.container_id[0] == lease.reservation.host[len("tcp://")] for lease in placed)
+    assert container_manager.scheduler.stats()["hosts"]["tcp://a:2375"]["cpus_used"] == 0
+    for lease in leases:
+        lease.release()
+
+
+def test_container_manager_places_by_transport_load(hosts, monkeypatch):
+    """
+    Test that the latency-aware ranking decides where capacity is reserved, so pinned starts
+    land on the hosts the transport itself would have chosen.
+    """
+    from sdk.config import Config
+    from sdk.container_manager import ContainerManager
+    from sdk.resource_scheduler import ResourceRequest
+
+    monkeypatch.setattr(Config, "HOST_CPUS", 8)
+    for host in hosts.values():
+        host.is_running.return_value = True
+    transport = MultiHostTransport(hosts)
+    transport.endpoints[0].latency = 1.0
+    transport.endpoints[1].latency = 0.01
+    transport.endpoints[2].latency = 0.01
+    container_manager = ContainerManager("python:3.8-slim", transport=transport,
+                                         default_resources=ResourceRequest(1, 256))
+
+    leases = [container_manager.lease_for_task({"name": "task", "params": i}) for i in range(4)]
+
+    assert "tcp://a:2375" not in {lease.reservation.host for lease in leases}
+    assert all(lease.container_id[0] == lease.reservation.host[len("tcp://")] for lease in leases)
+    hosts["tcp://a:2375"].run_container.assert_not_called()
+    for lease in leases:
+        lease.release()
+
+
+def test_container_manager_follows_start_fallback(hosts):
+    """
+    Test that when the reserved host fails to start the container, the reservation and the
+    pooled container move to the host it was started on.
+    """
+    from sdk.container_manager import ContainerManager
+    from sdk.resource_scheduler import ResourceRequest, ResourceScheduler
+
+    for host in hosts.values():
+        host.is_running.return_value = True
+    hosts["tcp://a:2375"].run_container.side_effect = ContainerError("python:3.8-slim", "connection refused")
+    transport = MultiHostTransport(hosts, failure_threshold=3)
+    scheduler = ResourceScheduler(4, 4096, hosts=list(hosts), host_loads=lambda: {"tcp://a:2375": 0,
+                                                                                   "tcp://b:2375": 1})
+    container_manager = ContainerManager("python:3.8-slim", transport=transport, scheduler=scheduler,
+                                         default_resources=ResourceRequest(1, 256))
+
+    lease = container_manager.lease_for_task({"name": "task", "params": {}})
+
+    assert lease.container_id.startswith("b")
+    assert lease.reservation.host == "tcp://b:2375"
+    assert scheduler.stats()["hosts"]["tcp://a:2375"]["cpus_used"] == 0
+    assert scheduler.stats()["hosts"]["tcp://b:2375"]["cpus_used"] == 1
+    pool = container_manager.pool.stats()
+    assert [key[2].host for key, counts in pool.items() if counts["total"]] == ["tcp://b:2375"]
+    lease.release()
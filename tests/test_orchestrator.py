@@ -1,7 +1,8 @@
 # test_orchestrator.py
 
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, AsyncMock, patch
 from sdk.orchestrator import SudoOrchestrator
 from sdk.errors import PolicyViolationError
 
@@ -126,3 +127,188 @@ def test_orchestrator_logging(mock_orchestrator):
         mock_logging.info.assert_called_with("Executing action on container: container_id_123 with command: echo 'Log Test'")
 
 
+
+
+def test_stream_task_checks_permission():
+    """
+    Test that stream_task enforces permissions before any container work starts.
+    """
+    policy_engine = MagicMock()
+    container_manager = MagicMock()
+    policy_engine.check_permission.return_value = False
+    orchestrator = SudoOrchestrator(policy_engine, container_manager)
+
+    with pytest.raises(PermissionError):
+        orchestrator.stream_task("create_file", {"path": "/tmp/x"}, "$SUDO-token")
+
+    container_manager.stream_task.assert_not_called()
+
+
+def test_execute_task_async():
+    """
+    Test that execute_task_async checks permissions and awaits the container manager.
+    """
+    policy_engine = MagicMock()
+    container_manager = MagicMock()
+    policy_engine.check_permission.return_value = True
+    container_manager.execute_in_container_async = AsyncMock(return_value="done")
+    orchestrator = SudoOrchestrator(policy_engine, container_manager)
+
+    result = asyncio.run(orchestrator.execute_task_async("create_file", {"path": "/tmp/x"}, "$SUDO-token"))
+
+    assert result == "done"
+    container_manager.execute_in_container_async.assert_awaited_once_with(
+        {"name": "create_file", "params": {"path": "/tmp/x"}}
+    )
+
+
+def test_execute_tasks_checks_each_permission():
+    """
+    Test that execute_tasks rejects denied tasks individually and batches the rest in order.
+    """
+    policy_engine = MagicMock()
+    container_manager = MagicMock()
+    policy_engine.check_permission.side_effect = lambda task_name, token: task_name != "rm_rf"
+    container_manager.execute_batch.return_value = ["listed", "read"]
+    orchestrator = SudoOrchestrator(policy_engine, container_manager)
+
+    results = orchestrator.execute_tasks([("ls", {}), ("rm_rf", {}), ("cat", {})], "$SUDO-token")
+
+    assert results[0] == "listed"
+    assert "permission" in results[1]["error"]
+    assert results[2] == "read"
+    container_manager.execute_batch.assert_called_once_with(
+        [{"name": "ls", "params": {}}, {"name": "cat", "params": {}}]
+    )
+
+
+def test_execute_task_passes_timeout_to_container():
+    """
+    Test that a per-task timeout travels with the task and a timeout result is returned as is.
+    """
+    policy_engine = MagicMock()
+    container_manager = MagicMock()
+    policy_engine.check_permission.return_value = True
+    container_manager.execute_in_container.return_value = {"error": "Task 'ls' exceeded its deadline of 5s",
+                                                           "timed_out": True}
+    orchestrator = SudoOrchestrator(policy_engine, container_manager)
+
+    result = orchestrator.execute_task("ls", {}, "$SUDO-token", timeout=5)
+
+    assert result["timed_out"] is True
+    container_manager.execute_in_container.assert_called_once_with({"name": "ls", "params": {}, "timeout": 5})
+
+
+def test_submit_runs_tasks_on_worker_pool():
+    """
+    Test that submit() returns futures resolving to execute_task results and exposes queue stats.
+    """
+    policy_engine = MagicMock()
+    container_manager = MagicMock()
+    policy_engine.check_permission.return_value = True
+    container_manager.execute_in_container.side_effect = lambda task: f"ran {task['params']['n']}"
+    orchestrator = SudoOrchestrator(policy_engine, container_manager, workers=3, max_queue_size=10)
+
+    futures = [orchestrator.submit("ls", {"n": n}, "$SUDO-token") for n in range(6)]
+
+    assert [future.result(timeout=5) for future in futures] == [f"ran {n}" for n in range(6)]
+    assert orchestrator.executor_stats()["completed"] == 6
+    orchestrator.shutdown()
+
+
+def test_result_cache_skips_repeated_container_runs():
+    """
+    Test that cached results are reused only after the permission check passes.
+    """
+    from sdk.result_cache import ResultCache
+
+    policy_engine = MagicMock()
+    container_manager = MagicMock()
+    container_manager.container_image = "python:3.9-slim"
+    policy_engine.check_permission.return_value = True
+    container_manager.execute_in_container.return_value = "42"
+    orchestrator = SudoOrchestrator(policy_engine, container_manager, result_cache=ResultCache(ttls={"answer": 60}))
+
+    assert orchestrator.execute_task("answer", {"q": 1}, "$SUDO-token") == "42"
+    assert orchestrator.execute_task("answer", {"q": 1}, "$SUDO-token") == "42"
+    policy_engine.check_permission.return_value = False
+    assert "error" in orchestrator.execute_task("answer", {"q": 1}, "$SUDO-other")
+
+    container_manager.execute_in_container.assert_called_once()
+    assert orchestrator.cache_stats()["hits"] == 1
+
+
+def test_identical_in_flight_tasks_are_coalesced():
+    """
+    Test that concurrent identical tasks run once while permissions are checked per caller.
+    """
+    import threading
+
+    policy_engine = MagicMock()
+    container_manager = MagicMock()
+    container_manager.container_image = "python:3.9-slim"
+    policy_engine.check_permission.side_effect = lambda task_name, token: token != "$SUDO-denied"
+    release = threading.Event()
+    container_manager.execute_in_container.side_effect = lambda task: release.wait(5) and "done"
+    orchestrator = SudoOrchestrator(policy_engine, container_manager, workers=4, coalesce=True)
+
+    futures = [orchestrator.submit("build", {"target": "app"}, token)
+               for token in ("$SUDO-a", "$SUDO-b", "$SUDO-denied", "$SUDO-c")]
+    while orchestrator.in_flight.stats()["coalesced"] < 2:
+        pass
+    release.set()
+    results = [future.result(timeout=5) for future in futures]
+
+    assert results[:2] == ["done", "done"] and results[3] == "done"
+    assert "permission" in results[2]["error"]
+    container_manager.execute_in_container.assert_called_once()
+    assert policy_engine.check_permission.call_count == 4
+    orchestrator.shutdown()
+
+
+def test_coalesced_caller_waits_no_longer_than_its_own_deadline():
+    """
+    Test that a caller joining a slow identical task times out at its own deadline.
+    """
+    import threading
+
+    policy_engine = MagicMock()
+    container_manager = MagicMock()
+    container_manager.container_image = "python:3.9-slim"
+    started, release = threading.Event(), threading.Event()
+    container_manager.execute_in_container.side_effect = lambda task: started.set() or release.wait(5) and "done"
+    orchestrator = SudoOrchestrator(policy_engine, container_manager, workers=2, coalesce=True)
+
+    leader = orchestrator.submit("build", {"target": "app"}, "$SUDO-a", timeout=60)
+    started.wait(5)
+    result = orchestrator.execute_task("build", {"target": "app"}, "$SUDO-b", timeout=0.05)
+    release.set()
+
+    assert result["timed_out"] is True
+    assert leader.result(timeout=5) == "done"
+    container_manager.execute_in_container.assert_called_once()
+    orchestrator.shutdown()
+
+
+def test_pipelined_execution_releases_container_when_denied():
+    """
+    Test that the container acquired during the permission check only runs tasks that pass it.
+    """
+    policy_engine = MagicMock()
+    container_manager = MagicMock()
+    policy_engine.check_permission.side_effect = lambda task_name, token: token == "$SUDO-allowed"
+    container_manager.execute_leased.return_value = "done"
+    orchestrator = SudoOrchestrator(policy_engine, container_manager, pipelined=True, coalesce=False)
+
+    assert orchestrator.execute_task("ls", {}, "$SUDO-allowed") == "done"
+    allowed_lease = container_manager.lease_for_task.return_value
+    container_manager.execute_leased.assert_called_once_with(allowed_lease)
+
+    container_manager.lease_for_task.return_value = MagicMock()
+    denied = orchestrator.execute_task("rm", {}, "$SUDO-denied")
+    orchestrator.shutdown()
+
+    assert "permission" in denied["error"]
+    container_manager.execute_leased.assert_called_once()
+    container_manager.lease_for_task.return_value.release.assert_called_once()
+    container_manager.lease_for_task.assert_called_with({"name": "rm", "params": {}})
@@ -0,0 +1,73 @@
+# test_pattern_matcher.py
+
+import pytest
+from sdk.pattern_matcher import AhoCorasick, PatternMatcher, PrefixTrie
+
+
+def test_aho_corasick_finds_overlapping_substrings():
+    """
+    Test that the automaton finds patterns that only occur through a failure transition.
+    """
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+
+    assert automaton.match("ushers") in ("she", "he")
+    assert automaton.match("ahishe") == "his"
+    assert automaton.match("hx") is None
+    assert AhoCorasick(["abcd", "bc"]).match("xabcx") == "bc"
+
+
+def test_prefix_trie_returns_shortest_prefix():
+    """
+    Test that the trie stops at the first banned prefix along the value.
+    """
+    trie = PrefixTrie(["/etc/", "/etc/ssh/", "/proc/"])
+
+    assert trie.match("/etc/ssh/sshd_config") == "/etc/"
+    assert trie.match("/proc") is None
+    assert trie.match("/srv/etc/") is None
+
+
+def test_pattern_matcher_combines_every_rule_kind():
+    """
+    Test that globs match whole values while regexes and substrings match anywhere.
+    """
+    matcher = PatternMatcher.from_policy({"glob": "*.key", "regex": [r"\d{3}-\d{4}"], "substring": ["token="]})
+
+    assert matcher.matches("server.key")
+    assert not matcher.matches("server.key.bak")
+    assert matcher.matches("call 555-1234 now")
+    assert matcher.matches("https://host/?token=abc")
+    assert not matcher.matches("plain value")
+
+
+def test_pattern_matcher_rejects_non_string_patterns():
+    """
+    Test that patterns must be strings.
+    """
+    with pytest.raises(ValueError):
+        PatternMatcher.from_policy({"prefix": [1]})
+
+
+def test_regex_with_inline_global_flag_loads_and_applies():
+    """
+    Test that a rule starting with an inline flag such as (?i) keeps its meaning.
+    """
+    matcher = PatternMatcher(regex=[r"(?i)rm\s+-rf", r"mkfs"])
+
+    assert matcher.matches("sudo RM -RF /")
+    assert matcher.matches("mkfs.ext4 /dev/sda")
+    assert not matcher.matches("MKFS.ext4 /dev/sda")
+
+
+def test_regex_backreferences_are_not_renumbered():
+    """
+    Test that backreferences in one rule still refer to that rule's own groups.
+    """
+    matcher = PatternMatcher(regex=[r"(a)\1", r"(b)\1", r"(?P<q>['\"]).*(?P=q)"])
+
+    assert matcher.matches("xaax")
+    assert matcher.matches("bb")
+    assert matcher.matches("say 'hi'")
+    assert not matcher.matches("ab")
+    with pytest.raises(ValueError, match="Invalid regex rule"):
+        PatternMatcher(regex=["x(?i)y"])
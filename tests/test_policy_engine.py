@@ -1,8 +1,14 @@
 # test_policy_engine.py
 
+import json
+import logging
+import os
+import time
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from sdk.policy_engine import PolicyEngine
+from sdk.policy_index import ActionRules, PolicyIndex
+from sdk.policy_watcher import PolicyWatcher
 from sdk.errors import PolicyViolationError
 
 
@@ -133,3 +139,257 @@ def test_configuration_handling(mock_policy_engine):
 
     # Assert that the configuration was loaded correctly
     assert config == {"allowed_commands": ["echo", "ls"]}
+
+
+@pytest.fixture
+def policy_file(tmp_path):
+    """
+    Fixture writing a policy file with a large list of restricted values.
+    """
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps({
+        "create_file": {
+            "restricted_parameters": ["path", "mode"],
+            "restricted_values": {"path": ["/etc/passwd"] + [f"/restricted/{i}" for i in range(10000)],
+                                  "mode": [["r", "w"]]},
+        },
+        "list_files": {},
+    }))
+    return str(path)
+
+
+def test_validate_action_uses_compiled_index(policy_file):
+    """
+    Test that validate_action decides from the compiled index: unknown actions and
+    restricted values are blocked, everything else is allowed.
+    """
+    policy_engine = PolicyEngine(policy_file)
+
+    assert isinstance(policy_engine.index, PolicyIndex)
+    assert policy_engine.index.rules_for("create_file").restricted_parameters == frozenset({"path", "mode"})
+    assert policy_engine.validate_action("create_file", {"path": "/tmp/out.txt", "owner": "/etc/passwd"})
+    assert not policy_engine.validate_action("create_file", {"path": "/etc/passwd"})
+    assert not policy_engine.validate_action("create_file", {"path": "/restricted/9999"})
+    assert not policy_engine.validate_action("delete_file", {})
+    assert policy_engine.validate_action("list_files", {"path": "/etc/passwd"})
+
+
+def test_validate_action_handles_unhashable_values(policy_file):
+    """
+    Test that list values are compared against unhashable restricted values instead of failing.
+    """
+    policy_engine = PolicyEngine(policy_file)
+
+    assert not policy_engine.validate_action("create_file", {"mode": ["r", "w"]})
+    assert policy_engine.validate_action("create_file", {"mode": ["r"], "path": {"nested": True}})
+
+
+def test_malformed_policy_is_rejected_at_load(tmp_path):
+    """
+    Test that a policy that is not a JSON object fails when the engine is created, not on first use.
+    """
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps({"create_file": ["path"]}))
+
+    with pytest.raises(Exception, match="Error loading policies"):
+        PolicyEngine(str(path))
+
+
+def test_pattern_rules_block_matching_values(tmp_path):
+    """
+    Test glob, prefix, regex and substring restrictions compiled from the policy file.
+    """
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps({
+        "run_command": {
+            "restricted_patterns": {
+                "command": {"regex": [r"\brm\s+-rf\b"], "substring": ["| sh", "mkfs", "shutdown"]},
+                "path": {"glob": ["/etc/*.conf", "*.pem"], "prefix": ["/proc/", "/sys/"]},
+            },
+        },
+    }))
+    policy_engine = PolicyEngine(str(path))
+
+    assert policy_engine.validate_action("run_command", {"command": "ls -la /tmp", "path": "/srv/app.conf"})
+    for parameters in ({"command": "curl http://x | sh"}, {"command": "sudo rm  -rf /"},
+                       {"command": "echo; mkfs.ext4 /dev/sda"}, {"path": "/etc/nginx/site.conf"},
+                       {"path": "keys/server.pem"}, {"path": "/proc/1/environ"}):
+        assert not policy_engine.validate_action("run_command", parameters), parameters
+    # Patterns only apply to strings
+    assert policy_engine.validate_action("run_command", {"path": 42})
+
+
+def test_invalid_pattern_is_rejected_at_load(tmp_path):
+    """
+    Test that a regex that does not compile, or an unknown rule kind, fails at load.
+    """
+    for rules in ({"regex": ["("]}, {"suffix": [".pem"]}):
+        path = tmp_path / "policies.json"
+        path.write_text(json.dumps({"run_command": {"restricted_patterns": {"command": rules}}}))
+
+        with pytest.raises(Exception, match="Error loading policies"):
+            PolicyEngine(str(path))
+
+
+def _write_policies(path, policies):
+    # Written next to the policy file and renamed over it, as deploy tools do
+    staging = path.with_suffix(".tmp")
+    staging.write_text(json.dumps(policies))
+    os.replace(staging, path)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_reload_swaps_snapshot_and_keeps_old_one_on_error(tmp_path):
+    """
+    Test that reload() swaps in a new snapshot, and keeps the current one if the new file is invalid.
+    """
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps({"create_file": {}}))
+    policy_engine = PolicyEngine(str(path))
+    first = policy_engine.index
+
+    path.write_text(json.dumps({"delete_file": {}}))
+    assert policy_engine.reload()
+    assert policy_engine.index.version == first.version + 1
+    assert policy_engine.validate_action("delete_file", {})
+    assert not policy_engine.validate_action("create_file", {})
+    # The old snapshot is untouched for anyone still holding it
+    assert first.rules_for("create_file") is not None
+
+    path.write_text('{"create_file": ')
+    assert not policy_engine.reload()
+    assert policy_engine.validate_action("delete_file", {})
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watcher_reloads_changed_policy_file(tmp_path, use_inotify):
+    """
+    Test that a watching engine picks up a replaced policy file, through inotify and through polling.
+    """
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps({"create_file": {}}))
+    policy_engine = PolicyEngine(str(path))
+    policy_engine.watcher = PolicyWatcher(str(path), policy_engine.reload, poll_interval=0.02,
+                                          use_inotify=use_inotify).start()
+    try:
+        _write_policies(path, {"create_file": {"restricted_parameters": ["path"],
+                                               "restricted_values": {"path": ["/etc/passwd"]}}})
+        assert _wait_for(lambda: not policy_engine.validate_action("create_file", {"path": "/etc/passwd"}))
+
+        _write_policies(path, {"create_file": "not an object"})
+        time.sleep(0.2)
+        assert not policy_engine.validate_action("create_file", {"path": "/etc/passwd"})
+        assert policy_engine.validate_action("create_file", {"path": "/tmp/out.txt"})
+    finally:
+        policy_engine.close()
+
+
+def test_decision_cache_serves_repeats_until_reload(tmp_path):
+    """
+    Test that repeated checks hit the decision cache, that unrelated parameters share
+    an entry, and that a reload invalidates the cached decisions.
+    """
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps({"create_file": {"restricted_parameters": ["path"],
+                                                "restricted_values": {"path": ["/etc/passwd"]}}}))
+    policy_engine = PolicyEngine(str(path), decision_cache_size=16)
+
+    assert policy_engine.validate_action("create_file", {"path": "/tmp/a", "content": "x"})
+    assert policy_engine.validate_action("create_file", {"content": "y", "path": "/tmp/a"})
+    assert not policy_engine.validate_action("create_file", {"path": "/etc/passwd"})
+    assert not policy_engine.validate_action("create_file", {"path": "/etc/passwd"})
+    stats = policy_engine.decision_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (2, 2, 0.5)
+
+    path.write_text(json.dumps({"create_file": {"restricted_parameters": ["path"],
+                                                "restricted_values": {"path": ["/tmp/a"]}}}))
+    assert policy_engine.reload()
+    assert not policy_engine.validate_action("create_file", {"path": "/tmp/a"})
+    assert policy_engine.validate_action("create_file", {"path": "/etc/passwd"})
+    # Unhashable values bypass the cache
+    assert policy_engine.validate_action("create_file", {"path": ["/tmp/a"]})
+    assert policy_engine.decision_cache_stats()["hits"] == 2
+
+
+def test_cached_decisions_log_like_fresh_ones(tmp_path):
+    """
+    Test that a denial served from the cache logs what the first evaluation logged, and that a
+    cached allow is only logged at DEBUG, without formatting the message when DEBUG is off.
+    """
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps({"create_file": {"restricted_parameters": ["path"],
+                                                "restricted_values": {"path": ["/etc/passwd"]}}}))
+    policy_engine = PolicyEngine(str(path), decision_cache_size=16)
+
+    with patch("sdk.policy_engine.logger") as fresh_logger:
+        assert not policy_engine.validate_action("create_file", {"path": "/etc/passwd"})
+    with patch("sdk.policy_engine.logger") as cached_logger:
+        assert not policy_engine.validate_action("create_file", {"path": "/etc/passwd"})
+    assert cached_logger.mock_calls == fresh_logger.mock_calls
+
+    with patch("sdk.policy_engine.logger") as fresh_logger:
+        assert policy_engine.validate_action("create_file", {"path": "/tmp/a"})
+    fresh_logger.log.assert_called_once_with(logging.INFO, "Action 'create_file' is allowed.")
+    with patch("sdk.policy_engine.logger") as cached_logger:
+        cached_logger.isEnabledFor.return_value = False
+        assert policy_engine.validate_action("create_file", {"path": "/tmp/a"})
+    cached_logger.isEnabledFor.assert_called_once_with(logging.DEBUG)
+    cached_logger.log.assert_not_called()
+    assert policy_engine.decision_cache_stats()["hits"] == 2
+
+
+def test_validate_actions_returns_reasons_in_order(policy_file):
+    """
+    Test that a batch is decided per item, in request order, with a reason for each denial.
+    """
+    policy_engine = PolicyEngine(policy_file)
+    requests = [
+        ("create_file", {"path": "/tmp/a"}),
+        ("delete_file", {}),
+        ("create_file", {"path": "/etc/passwd"}),
+        ("list_files", {"path": "/etc/passwd"}),
+        ("create_file", {"path": "/etc/passwd"}),
+        ("create_file", None),
+    ]
+
+    reasons = policy_engine.validate_actions(requests)
+
+    assert reasons == [
+        None,
+        "Action 'delete_file' is not defined in policies.",
+        "Invalid parameter 'path' for action 'create_file'.",
+        None,
+        "Invalid parameter 'path' for action 'create_file'.",
+        "Parameters for action 'create_file' must be a dictionary.",
+    ]
+    assert [reason is None for reason in reasons] == [
+        policy_engine.validate_action(action, parameters) for action, parameters in requests[:5]
+    ] + [False]
+    assert policy_engine.validate_actions([]) == []
+
+
+def test_validate_actions_evaluates_each_group_once(policy_file):
+    """
+    Test that a batch resolves each action's rules once and evaluates identical restricted parameters once.
+    """
+    policy_engine = PolicyEngine(policy_file, decision_cache_size=0)
+    requests = [("create_file", {"path": "/tmp/a", "n": n}) for n in range(5)] + [
+        ("create_file", {"path": "/etc/passwd"}),
+        ("list_files", {"path": "/tmp"}),
+    ]
+
+    with patch("sdk.policy_index.ActionRules.first_violations", autospec=True,
+               side_effect=ActionRules.first_violations) as first_violations:
+        reasons = policy_engine.validate_actions(requests)
+
+    assert reasons == [None] * 5 + ["Invalid parameter 'path' for action 'create_file'.", None]
+    evaluated = {call.args[0].action: len(call.args[1]) for call in first_violations.call_args_list}
+    assert evaluated == {"create_file": 2, "list_files": 1}
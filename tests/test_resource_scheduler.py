@@ -0,0 +1,166 @@
+# test_resource_scheduler.py
+
+import asyncio
+import threading
+import pytest
+from sdk.errors import ContainerError
+from sdk.resource_scheduler import ResourceRequest, ResourceScheduler, parse_resources
+
+
+def test_requests_that_fit_are_admitted_immediately():
+    """
+    Test that requests are admitted while they fit and the usage is tracked.
+    """
+    scheduler = ResourceScheduler(cpus=4, memory_mb=4096)
+
+    first = scheduler.acquire(ResourceRequest(2, 1024))
+    second = scheduler.acquire(ResourceRequest(2, 1024))
+
+    stats = scheduler.stats()
+    assert stats["cpus_used"] == 4
+    assert stats["memory_used_mb"] == 2048
+    first.release()
+    second.release()
+    assert scheduler.stats()["cpus_used"] == 0
+
+
+def test_acquire_times_out_when_host_is_full():
+    """
+    Test that a request waiting on a full host fails after its timeout and leaves the queue.
+    """
+    scheduler = ResourceScheduler(cpus=1, memory_mb=1024)
+    scheduler.acquire(ResourceRequest(1, 512))
+
+    with pytest.raises(ContainerError):
+        scheduler.acquire(ResourceRequest(1, 512), timeout=0.05)
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_request_larger_than_host_is_rejected():
+    """
+    Test that a request that can never fit is rejected instead of waiting forever.
+    """
+    scheduler = ResourceScheduler(cpus=2, memory_mb=1024)
+
+    with pytest.raises(ContainerError):
+        scheduler.acquire(ResourceRequest(1, 2048))
+
+
+def test_small_requests_backfill_behind_a_large_one():
+    """
+    Test that small waiting tasks fill free capacity while a large task is still queued.
+    """
+    scheduler = ResourceScheduler(cpus=4, memory_mb=4096, backfill_window=60)
+    running = scheduler.acquire(ResourceRequest(3, 1024))
+    large_granted = threading.Event()
+
+    def wait_large():
+        scheduler.acquire(ResourceRequest(4, 1024))
+        large_granted.set()
+
+    thread = threading.Thread(target=wait_large)
+    thread.start()
+    while scheduler.stats()["queued"] == 0:
+        pass
+
+    small = scheduler.acquire(ResourceRequest(1, 256), timeout=1)
+
+    assert not large_granted.is_set()
+    running.release()
+    small.release()
+    thread.join(timeout=1)
+    assert large_granted.is_set()
+
+
+def test_waiter_past_backfill_window_cannot_be_overtaken():
+    """
+    Test that once the oldest waiter is past the backfill window, smaller tasks queue behind it.
+    """
+    scheduler = ResourceScheduler(cpus=4, memory_mb=4096, backfill_window=0)
+    running = scheduler.acquire(ResourceRequest(3, 1024))
+    threading.Thread(target=scheduler.acquire, args=(ResourceRequest(4, 1024),), daemon=True).start()
+    while scheduler.stats()["queued"] == 0:
+        pass
+
+    with pytest.raises(ContainerError):
+        scheduler.acquire(ResourceRequest(1, 256), timeout=0.05)
+    running.release()
+
+
+def test_acquire_async_waits_for_release():
+    """
+    Test that the async acquire completes once capacity is released.
+    """
+    scheduler = ResourceScheduler(cpus=1, memory_mb=1024)
+
+    async def scenario():
+        first = await scheduler.acquire_async(ResourceRequest(1, 512))
+        waiting = asyncio.ensure_future(scheduler.acquire_async(ResourceRequest(1, 512)))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        first.release()
+        second = await asyncio.wait_for(waiting, timeout=1)
+        second.release()
+
+    asyncio.run(scenario())
+    assert scheduler.stats()["cpus_used"] == 0
+
+
+def test_parse_resources_fills_defaults():
+    """
+    Test that missing values come from the default request and invalid ones are rejected.
+    """
+    default = ResourceRequest(0.5, 256)
+
+    assert parse_resources(None, default) == default
+    assert parse_resources({"cpus": 2}, default) == ResourceRequest(2.0, 256)
+    with pytest.raises(ValueError):
+        parse_resources({"memory_mb": 0}, default)
+
+
+def test_capacity_is_tracked_per_host():
+    """
+    Test that with several hosts a request must fit on one of them and is spread over the hosts.
+    """
+    scheduler = ResourceScheduler(cpus=4, memory_mb=4096, hosts=["tcp://a:2375", "tcp://b:2375"])
+
+    first = scheduler.acquire(ResourceRequest(3, 1024))
+    second = scheduler.acquire(ResourceRequest(3, 1024))
+    assert {first.host, second.host} == {"tcp://a:2375", "tcp://b:2375"}
+    assert second.placement == (3, 1024, second.host)
+
+    # 2 CPUs are free overall, but only 1 on each host
+    with pytest.raises(ContainerError):
+        scheduler.acquire(ResourceRequest(2, 512), timeout=0.05)
+    with pytest.raises(ContainerError):
+        scheduler.acquire(ResourceRequest(6, 1024))
+
+    stats = scheduler.stats()
+    assert (stats["cpus_total"], stats["cpus_used"]) == (8, 6)
+    assert stats["hosts"]["tcp://a:2375"]["cpus_used"] == 3
+    first.release()
+    assert scheduler.acquire(ResourceRequest(2, 512), timeout=0.05).host == first.host
+
+
+def test_placement_follows_host_loads():
+    """
+    Test that only the hosts reported by host_loads get tasks, lowest load first, and that a
+    relocated reservation frees its old host.
+    """
+    loads = {"tcp://b:2375": 0.5, "tcp://c:2375": 0.1}
+    scheduler = ResourceScheduler(cpus=2, memory_mb=4096, hosts=["tcp://a:2375", "tcp://b:2375", "tcp://c:2375"],
+                                  host_loads=lambda: loads)
+
+    placed = [scheduler.acquire(ResourceRequest(1, 256)).host for _ in range(4)]
+    assert placed == ["tcp://c:2375", "tcp://c:2375", "tcp://b:2375", "tcp://b:2375"]
+    with pytest.raises(ContainerError):
+        scheduler.acquire(ResourceRequest(1, 256), timeout=0.05)
+
+    loads.clear()
+    reservation = scheduler.acquire(ResourceRequest(1, 256), timeout=0.05)
+    assert reservation.host == "tcp://a:2375"
+    scheduler.relocate(reservation, "tcp://b:2375")
+    stats = scheduler.stats()["hosts"]
+    assert (stats["tcp://a:2375"]["cpus_used"], stats["tcp://b:2375"]["cpus_used"]) == (0, 3)
+    reservation.release()
+    assert scheduler.stats()["hosts"]["tcp://b:2375"]["cpus_used"] == 2
@@ -0,0 +1,83 @@
+# test_result_cache.py
+
+import pytest
+from unittest.mock import patch
+from sdk.result_cache import (MemoryCacheBackend, ResultCache, SQLiteCacheBackend, create_result_cache,
+                              task_fingerprint)
+
+
+def test_fingerprint_is_canonical():
+    """
+    Test that parameter order does not matter while name, parameters and image do.
+    """
+    task = {"name": "hash", "params": {"path": "/a", "algo": "sha256"}}
+    reordered = {"name": "hash", "params": {"algo": "sha256", "path": "/a"}, "timeout": 5}
+
+    assert task_fingerprint(task, "img") == task_fingerprint(reordered, "img")
+    assert task_fingerprint(task, "img") != task_fingerprint(task, "other-img")
+    assert task_fingerprint({"name": "hash", "params": {"path": "/b"}}, "img") != task_fingerprint(task, "img")
+    assert task_fingerprint({"name": "up", "params": {}, "files": {"a": b"x"}}, "img") is None
+    assert task_fingerprint({"name": "odd", "params": {"x": object()}}, "img") is None
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_cache_hits_misses_and_lru_eviction(backend, tmp_path):
+    """
+    Test both backends: results are served until evicted, and counters are kept.
+    """
+    cache = create_result_cache(backend, str(tmp_path / "results.db"), max_entries=2, default_ttl=300)
+    tasks = [{"name": "t", "params": {"n": n}} for n in range(3)]
+
+    assert cache.get(tasks[0], "img") == (False, None)
+    cache.put(tasks[0], "img", "zero")
+    cache.put(tasks[1], "img", "one")
+    assert cache.get(tasks[0], "img") == (True, "zero")   # tasks[1] is now least recently used
+    cache.put(tasks[2], "img", "two")
+
+    assert cache.get(tasks[1], "img") == (False, None)
+    assert cache.get(tasks[0], "img") == (True, "zero")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (2, 2, 1, 2)
+
+
+def test_per_task_ttls_and_errors():
+    """
+    Test that entries expire per task TTL, a TTL of 0 disables caching and error results are not stored.
+    """
+    cache = ResultCache(MemoryCacheBackend(), default_ttl=0, ttls={"slow": 10})
+    slow, fast = {"name": "slow", "params": {}}, {"name": "fast", "params": {}}
+
+    with patch("sdk.result_cache.time.time", return_value=1000.0):
+        cache.put(slow, "img", "done")
+        cache.put(fast, "img", "done")
+        cache.put({"name": "slow", "params": {"bad": 1}}, "img", {"error": "boom"})
+        assert cache.get(slow, "img") == (True, "done")
+        assert cache.get(fast, "img") == (False, None)
+        assert cache.get({"name": "slow", "params": {"bad": 1}}, "img") == (False, None)
+    with patch("sdk.result_cache.time.time", return_value=1011.0):
+        assert cache.get(slow, "img") == (False, None)
+
+
+def test_only_listed_tasks_are_cached_by_default():
+    """
+    Test that without a default TTL a task is cached only if it has a TTL of its own.
+    """
+    cache = ResultCache(ttls={"hash_file": 60})
+    listed, unlisted = {"name": "hash_file", "params": {}}, {"name": "run_script", "params": {}}
+    cache.put(listed, "img", "digest")
+    cache.put(unlisted, "img", "output")
+    assert cache.get(listed, "img") == (True, "digest")
+    assert cache.get(unlisted, "img") == (False, None)
+
+
+def test_sqlite_backend_persists(tmp_path):
+    """
+    Test that the on-disk backend keeps results across instances.
+    """
+    path = str(tmp_path / "cache" / "results.db")
+    task = {"name": "t", "params": {"n": 1}}
+    first = ResultCache(SQLiteCacheBackend(path), ttls={"t": 60})
+    first.put(task, "img", {"lines": ["a", "b"]})
+    first.backend.close()
+
+    assert ResultCache(SQLiteCacheBackend(path), ttls={"t": 60}).get(task, "img") == (True, {"lines": ["a", "b"]})
@@ -0,0 +1,97 @@
+# test_single_flight.py
+
+import asyncio
+import threading
+import pytest
+from sdk.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """
+    Test that callers arriving while a call runs get its result without running it again.
+    """
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", work)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", work))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flight.stats()["coalesced"] < 3:
+        pass
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "coalesced": 3}
+    # Once finished, the next call runs again
+    assert flight.do("key", lambda: "fresh") == "fresh"
+
+
+def test_errors_reach_every_waiter():
+    """
+    Test that the shared call's exception is raised to the leader and to the followers.
+    """
+    flight = SingleFlight()
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def fail():
+            await gate.wait()
+            raise RuntimeError("boom")
+
+        callers = [asyncio.ensure_future(flight.do_async("key", fail)) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    errors = asyncio.run(main())
+
+    assert [str(e) for e in errors] == ["boom"] * 3
+    assert flight.stats()["coalesced"] == 2
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: (_ for _ in ()).throw(ValueError("sync")))
+
+
+def test_follower_wait_is_bounded_and_result_is_copied():
+    """
+    Test that a follower gives up after its own timeout while the shared call keeps
+    running, and that followers get their own copy of the result.
+    """
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+        return {"items": [1]}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", work)))
+    leader.start()
+    started.wait(5)
+    with pytest.raises(TimeoutError):
+        flight.do("key", work, follower_timeout=0.05)
+    follower = threading.Thread(target=lambda: results.append(flight.do("key", work)))
+    follower.start()
+    while flight.stats()["coalesced"] < 2:
+        pass
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert results == [{"items": [1]}, {"items": [1]}]
+    assert results[0] is not results[1] and results[0]["items"] is not results[1]["items"]
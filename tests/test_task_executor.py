@@ -0,0 +1,115 @@
+# test_task_executor.py
+
+import queue
+import threading
+import pytest
+from sdk.task_executor import PRIORITY_HIGH, PRIORITY_LOW, TaskExecutor
+
+
+def test_submit_returns_futures_with_results():
+    """
+    Test that submitted callables run on the workers and resolve their futures.
+    """
+    executor = TaskExecutor(workers=2)
+
+    futures = [executor.submit(lambda x: x * 2, i) for i in range(5)]
+
+    assert [future.result(timeout=5) for future in futures] == [0, 2, 4, 6, 8]
+    executor.shutdown()
+
+
+def test_exceptions_are_set_on_the_future():
+    """
+    Test that an exception raised by the callable is delivered through the future.
+    """
+    executor = TaskExecutor(workers=1)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        executor.submit(fail).result(timeout=5)
+    executor.shutdown()
+
+
+def test_higher_priority_runs_first():
+    """
+    Test that queued work is picked by priority, then by arrival order.
+    """
+    executor = TaskExecutor(workers=1)
+    gate = threading.Event()
+    order = []
+    executor.submit(gate.wait)
+
+    futures = [
+        executor.submit(order.append, "low", priority=PRIORITY_LOW),
+        executor.submit(order.append, "normal-1"),
+        executor.submit(order.append, "high", priority=PRIORITY_HIGH),
+        executor.submit(order.append, "normal-2"),
+    ]
+    gate.set()
+    for future in futures:
+        future.result(timeout=5)
+
+    assert order == ["high", "normal-1", "normal-2", "low"]
+    executor.shutdown()
+
+
+def test_full_queue_applies_backpressure():
+    """
+    Test that a full queue rejects non-blocking submissions and times out blocking ones.
+    """
+    executor = TaskExecutor(workers=1, max_queue_size=1)
+    gate = threading.Event()
+    executor.submit(gate.wait)
+    while executor.stats()["busy"] == 0:
+        pass
+    executor.submit(gate.wait)
+
+    with pytest.raises(queue.Full):
+        executor.submit(gate.wait, block=False)
+    with pytest.raises(queue.Full):
+        executor.submit(gate.wait, queue_timeout=0.05)
+    assert executor.stats()["rejected"] == 2
+    gate.set()
+    executor.shutdown()
+
+
+def test_stats_report_queue_depth_and_wait_time():
+    """
+    Test that stats expose the queue depth and how long work waited for a worker.
+    """
+    executor = TaskExecutor(workers=1)
+    gate = threading.Event()
+    executor.submit(gate.wait)
+    queued = executor.submit(lambda: None)
+
+    stats = executor.stats()
+    assert stats["queue_depth"] >= 1
+    gate.wait(0.05)
+    gate.set()
+    queued.result(timeout=5)
+
+    stats = executor.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["wait_time_max"] >= 0.05
+    assert stats["completed"] == 2
+    executor.shutdown()
+
+
+def test_shutdown_can_cancel_pending_work():
+    """
+    Test that shutdown(cancel_pending=True) cancels work that has not started.
+    """
+    executor = TaskExecutor(workers=1)
+    gate = threading.Event()
+    running = executor.submit(gate.wait)
+    pending = executor.submit(lambda: "never")
+
+    threading.Timer(0.05, gate.set).start()
+    executor.shutdown(cancel_pending=True)
+
+    assert running.result(timeout=5) is True
+    assert pending.cancelled()
+    with pytest.raises(RuntimeError):
+        executor.submit(lambda: None)
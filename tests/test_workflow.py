@@ -0,0 +1,126 @@
+# test_workflow.py
+
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from sdk.errors import ValidationError
+from sdk.workflow import Workflow, WorkflowRun
+
+
+def test_outputs_flow_along_dependencies():
+    """
+    Test that each step receives the outputs of the steps it depends on.
+    """
+    workflow = Workflow("numbers")
+    workflow.step("a", lambda inputs: 2)
+    workflow.step("b", lambda inputs: inputs["a"] * 10, depends_on=["a"])
+    workflow.step("c", lambda inputs: inputs["a"] + inputs["b"], depends_on=["a", "b"])
+
+    run = workflow.run()
+
+    assert run.succeeded
+    assert run.outputs == {"a": 2, "b": 20, "c": 22}
+
+
+def test_independent_branches_run_concurrently():
+    """
+    Test that steps without a dependency between them overlap in time.
+    """
+    barrier = threading.Barrier(3, timeout=5)
+    workflow = Workflow("fan-out", max_parallel=3)
+    for name in ("x", "y", "z"):
+        workflow.step(name, lambda inputs: barrier.wait() is not None)
+    workflow.step("join", lambda inputs: sorted(inputs), depends_on=["x", "y", "z"])
+
+    run = workflow.run()
+
+    assert run.succeeded
+    assert run.outputs["join"] == ["x", "y", "z"]
+
+
+def test_failed_workflow_resumes_from_completed_steps(tmp_path):
+    """
+    Test that a failed run can be resumed without repeating completed steps, also from a state file.
+    """
+    calls = []
+    attempts = {"flaky": 0}
+
+    def flaky(inputs):
+        attempts["flaky"] += 1
+        if attempts["flaky"] == 1:
+            raise RuntimeError("transient")
+        return inputs["first"] + 1
+
+    workflow = Workflow("resume")
+    workflow.step("first", lambda inputs: calls.append("first") or 1)
+    workflow.step("flaky", flaky, depends_on=["first"])
+    workflow.step("last", lambda inputs: inputs["flaky"] * 2, depends_on=["flaky"])
+    state_file = str(tmp_path / "state.json")
+
+    failed = workflow.run(state_file=state_file)
+    assert failed.status == "failed"
+    assert failed.errors == {"flaky": "transient"}
+    assert failed.skipped == ["last"]
+
+    resumed = workflow.run(state_file=state_file)
+
+    assert resumed.succeeded
+    assert resumed.outputs == {"first": 1, "flaky": 2, "last": 4}
+    assert calls == ["first"]
+    assert WorkflowRun.load(state_file).outputs == resumed.outputs
+
+
+def test_fail_fast_false_keeps_independent_branches_running():
+    """
+    Test that with fail_fast disabled, branches unrelated to the failure still complete.
+    """
+    def fail(inputs):
+        raise RuntimeError("broken")
+
+    workflow = Workflow("branches", fail_fast=False)
+    workflow.step("bad", fail)
+    workflow.step("after_bad", lambda inputs: "never", depends_on=["bad"])
+    workflow.step("slow", lambda inputs: time.sleep(0.05) or "slow")
+    workflow.step("after_slow", lambda inputs: inputs["slow"] + "!", depends_on=["slow"])
+
+    run = workflow.run()
+
+    assert run.outputs == {"slow": "slow", "after_slow": "slow!"}
+    assert run.skipped == ["after_bad"]
+
+
+def test_task_steps_use_the_orchestrator():
+    """
+    Test that task steps go through execute_task and that error results fail the step.
+    """
+    orchestrator = MagicMock()
+    orchestrator.execute_task.side_effect = lambda name, params, token, **kwargs: (
+        {"error": "denied"} if name == "deploy" else f"{name}:{params}"
+    )
+    workflow = Workflow("tasks", orchestrator)
+    workflow.task("build", "build", {"target": "app"})
+    workflow.task("deploy", "deploy", lambda inputs: {"artifact": inputs["build"]}, depends_on=["build"])
+
+    run = workflow.run(user_token="$SUDO-token")
+
+    assert run.outputs == {"build": "build:{'target': 'app'}"}
+    assert run.errors == {"deploy": "denied"}
+    orchestrator.execute_task.assert_any_call("deploy", {"artifact": "build:{'target': 'app'}"}, "$SUDO-token",
+                                              resources=None, timeout=None)
+
+
+def test_invalid_graphs_are_rejected():
+    """
+    Test that unknown dependencies and cycles are reported before anything runs.
+    """
+    unknown = Workflow("unknown")
+    unknown.step("a", lambda inputs: 1, depends_on=["missing"])
+    with pytest.raises(ValidationError):
+        unknown.run()
+
+    cyclic = Workflow("cyclic")
+    cyclic.step("a", lambda inputs: 1, depends_on=["b"])
+    cyclic.step("b", lambda inputs: 1, depends_on=["a"])
+    with pytest.raises(ValidationError):
+        cyclic.run()